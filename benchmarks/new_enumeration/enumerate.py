@@ -1,9 +1,10 @@
 import sys
 sys.path.append('../')
+sys.path.append('../../')
 
 from timer import Timer
 
-from hplattice.Config import Config
+from hplattice import LatticeFactory
 from hplattice.Enumerator import Enumerator
 
 
@@ -18,23 +19,25 @@ HP_STRING_SET = \
 )
 
 
-def load_configuration(hp_string, initial_vec):
+def load_configuration(lattice_factory, hp_string, initial_vec):
     configfile = 'enumerate.conf'
-    config = Config( filename=configfile )
+    config = lattice_factory.make_configuration( filename=configfile )
     config.HPSTRING = hp_string
     config.INITIALVEC = initial_vec
     config.RESTRAINED_STATE = []
     return config
 
 def main():
+    lattice_factory = LatticeFactory()
     timing_data = []
     for N, hp_string_list in HP_STRING_SET:
         for this_hp_string in hp_string_list:
             print N, this_hp_string
             initial_vec = [0] * (N - 1)
             with Timer() as t:
-                config = load_configuration(this_hp_string, initial_vec)
-                en = Enumerator(config)
+                config = load_configuration(lattice_factory, this_hp_string,
+                                            initial_vec)
+                en = Enumerator(lattice_factory, config)
                 en.enumerate_states()
             time_elapsed = t.interval
             this_data = (N, time_elapsed, this_hp_string)
@@ -1,8 +1,9 @@
+import sys
+sys.path.append('../../')
 import cProfile
 import pstats
-from os.path import join
 
-from hplattice.Config import Config
+from hplattice import LatticeFactory
 from hplattice.Enumerator import Enumerator
 
 
@@ -10,9 +11,9 @@ from hplattice.Enumerator import Enumerator
 HP_STRING_SET = (14, 'HHHPHHPHHHHPPH')
 
 
-def load_configuration(hp_string, initial_vec):
+def load_configuration(lattice_factory, hp_string, initial_vec):
     configfile = 'enumerate.conf'
-    config = Config( filename=configfile )
+    config = lattice_factory.make_configuration( filename=configfile )
     config.HPSTRING = hp_string
     config.INITIALVEC = initial_vec
     config.RESTRAINED_STATE = []
@@ -21,8 +22,9 @@ def load_configuration(hp_string, initial_vec):
 def main():
     N, hp_string = HP_STRING_SET
     initial_vec = [0] * (N - 1)
-    config = load_configuration(hp_string, initial_vec)
-    en = Enumerator(config, verbose=False)
+    lattice_factory = LatticeFactory()
+    config = load_configuration(lattice_factory, hp_string, initial_vec)
+    en = Enumerator(lattice_factory, config)
     en.enumerate_states()
 
 if __name__ == '__main__':
@@ -2,48 +2,46 @@
 
 import sys
 sys.path.append('../')
-from os.path import join
-from random import Random
-from math import exp
+sys.path.append('../../')
 
 from timer import Timer
-from hplattice.Config import Config
+from hplattice import LatticeFactory
 from hplattice.MCSampler import MCSampler
 
 
-CLIST_PATH = '/Users/grollins/work_code/HP_lattice/sequences/clist'
+# mcrex.conf sets STOPATNATIVE to 0, so no native contact lists are needed.
+# See ../suite.py for benchmarks that generate them.
 HP_STRING_SET = \
-    ((4, ['HPPH', 'HHPH', 'HPHH', 'HHHH'], join(CLIST_PATH, 'hp04')),
-     (6, ['HHPPHH', 'HPPHPH', 'HHPHPH', 'HPPHHH'], join(CLIST_PATH, 'hp06')),
-     (10, ['HHPPHPPHPH', 'HPHPPHPPHH', 'PHPPHHPPHP', 'HPPHPPHPPH'], join(CLIST_PATH, 'hp10')),
-     # (12, ['HPHPPHPHPHPH', 'PHPPHPPHPPHP', 'HHHHHPHHPHPH'], join(CLIST_PATH, 'hp12')),
-     # (14, ['HHHPHHPHHHHPPH', 'HPPPPHPPHPPHPH', 'HHPPHHPHPHHHHH'], join(CLIST_PATH, 'hp14')),
+    ((4, ['HPPH', 'HHPH', 'HPHH', 'HHHH']),
+     (6, ['HHPPHH', 'HPPHPH', 'HHPHPH', 'HPPHHH']),
+     (10, ['HHPPHPPHPH', 'HPHPPHPPHH', 'PHPPHHPPHP', 'HPPHPPHPPH']),
+     # (12, ['HPHPPHPHPHPH', 'PHPPHPPHPPHP', 'HHHHHPHHPHPH']),
+     # (14, ['HHHPHHPHHHHPPH', 'HPPPPHPPHPPHPH', 'HHPPHHPHPHHHHH']),
      # (20, ['PHHHPPHHHPPPPPHHPPHP', 'HHHHPPHHHHPHHPHPPHHH',
      # 'HHHPPPPHPPHPPPPHPPHP', 'HHHHPPHHPHHHHHPPHPHH'])
 )
-VERBOSE = False
 
 
-def load_configuration(hp_string, initial_vec, clist_dir):
+def load_configuration(lattice_factory, hp_string, initial_vec):
     # load in config file
     configfile = 'mcrex.conf'
-    config = Config( filename=configfile )
+    config = lattice_factory.make_configuration( filename=configfile )
     config.HPSTRING = hp_string
     config.INITIALVEC = initial_vec
     config.RESTRAINED_STATE = []
-    config.NATIVEDIR = clist_dir
     return config
 
 def main():
+    lattice_factory = LatticeFactory()
     timing_data = []
-    for N, hp_string_list, clist_dir in HP_STRING_SET:
+    for N, hp_string_list in HP_STRING_SET:
         for this_hp_string in hp_string_list:
-            print N, this_hp_string, clist_dir
+            print N, this_hp_string
             initial_vec = [0] * (N - 1)
             with Timer() as t:
-                config = load_configuration(this_hp_string, initial_vec,
-                                            clist_dir)
-                s = MCSampler(config, VERBOSE)
+                config = load_configuration(lattice_factory, this_hp_string,
+                                            initial_vec)
+                s = MCSampler(lattice_factory, config)
                 s.do_mc_sampling()
             time_elapsed = t.interval
             this_data = (N, time_elapsed, this_hp_string)
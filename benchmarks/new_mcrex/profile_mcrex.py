@@ -1,31 +1,33 @@
+import sys
+sys.path.append('../../')
 import cProfile
 import pstats
-from os.path import join
 
-from hplattice.Config import Config
+from hplattice import LatticeFactory
 from hplattice.MCSampler import MCSampler
 
 
-CLIST_PATH = '/Users/grollins/work_code/HP_lattice/sequences/clist'
-HP_STRING_SET = (10, 'HHPPHPPHPH', join(CLIST_PATH, 'hp10'))
+# For a lower-overhead breakdown of the time per phase of each monte carlo
+# step, set PROFILE to 1 in mcrex.conf instead of using cProfile.
+HP_STRING_SET = (10, 'HHPPHPPHPH')
 
 
-def load_configuration(hp_string, initial_vec, clist_dir):
+def load_configuration(lattice_factory, hp_string, initial_vec):
     # load in config file
     configfile = 'mcrex.conf'
-    config = Config( filename=configfile )
+    config = lattice_factory.make_configuration( filename=configfile )
     config.HPSTRING = hp_string
     config.INITIALVEC = initial_vec
     config.RESTRAINED_STATE = []
-    config.NATIVEDIR = clist_dir
     return config
 
 def main():
-    N, hp_string, clist_dir = HP_STRING_SET
-    print N, hp_string, clist_dir
+    N, hp_string = HP_STRING_SET
+    print N, hp_string
     initial_vec = [0] * (N - 1)
-    config = load_configuration(hp_string, initial_vec, clist_dir)
-    s = MCSampler(config)
+    lattice_factory = LatticeFactory()
+    config = load_configuration(lattice_factory, hp_string, initial_vec)
+    s = MCSampler(lattice_factory, config)
     s.do_mc_sampling()
 
 if __name__ == '__main__':
@@ -0,0 +1,327 @@
+#! /usr/bin/python
+"""
+Reproducible benchmark suite for hplattice.
+
+Runs offline: the native contact lists needed by the monte carlo benchmarks
+are generated by enumeration. Results are saved as JSON, and can be compared
+against a recorded baseline::
+
+    python suite.py --output results.json
+    python suite.py --output new.json --baseline results.json --threshold 0.2
+
+The comparison exits with status 1 if any benchmark is more than
+``threshold`` (a fraction) slower than the baseline.
+"""
+import os
+import sys
+import json
+import random
+import platform
+import tempfile
+from os.path import join, dirname, abspath
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from time import strftime
+
+sys.path.insert(0, join(dirname(abspath(__file__)), '..'))
+
+import numpy
+from timer import Timer
+from hplattice import LatticeFactory, Trajectory, BufferedTrajectory
+from hplattice.Enumerator import Enumerator
+from hplattice.MCSampler import MCSampler
+from hplattice.Scoring import score_conformations
+from hplattice import util
+
+
+ENUMERATION_SEQUENCES = \
+    ((4, 'HPPH'), (6, 'HHPPHH'), (8, 'HPHPPHPH'), (10, 'HHPPHPPHPH'),
+     (12, 'HPHPPHPHPHPH'))
+MC_SEQUENCES = \
+    ((10, 'HHPPHPPHPH'), (14, 'HHHPHHPHHHHPPH'), (20, 'PHHHPPHHHPPPPPHHPPHP'))
+NATIVE_SEQUENCES = ((10, 'HHPPHPPHPH'), (11, 'PHPPHPHPPHH'))
+MOVESETS = ('MS1', 'MS2', 'MS3')
+KERNEL_LENGTHS = (10, 20, 40, 100)
+SEED = 345
+
+
+@contextmanager
+def quiet():
+    ### silence the status output of the enumerator and sampler
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+def best_of(fcn, repeats):
+    ### run fcn several times, return the shortest time and the last result
+    best = None
+    for i in range(repeats):
+        random.seed(SEED)
+        with Timer() as t:
+            result = fcn()
+        if best is None or t.interval < best:
+            best = t.interval
+    return best, result
+
+def make_config(lattice_factory, hp_string, **params):
+    config = lattice_factory.make_configuration()
+    defaults = {'HPSTRING': hp_string,
+                'INITIALVEC': [0] * (len(hp_string) - 1),
+                'RESTRAINED_STATE': [], 'STOPATNATIVE': False}
+    defaults.update(params)
+    config.update(**defaults)
+    return config
+
+def random_walks(n, num_walks):
+    ### self-avoiding conformations from short monte carlo runs
+    lattice_factory = LatticeFactory()
+    config = make_config(lattice_factory, 'H' * n, NREPLICAS=1,
+                         REPLICATEMPS=[1000.0], MCSTEPS=20 * n,
+                         SWAPEVERY=10 ** 9, PRINTEVERY=10 ** 9,
+                         TRJEVERY=10 ** 9, ENEEVERY=10 ** 9)
+    walks = []
+    with quiet():
+        s = MCSampler(lattice_factory, config)
+        for i in range(num_walks):
+            s.do_mc_sampling()
+            walks.append(s.replicas[0].chain.vec.as_npy_array().copy())
+    return walks
+
+def write_native_clists(sequences, clist_root):
+    """
+    Enumerate each sequence and write its native contact list to
+    ``<clist_root>/hpNN/<sequence>.clist``, the layout that
+    :class:`hplattice.MCSampler.MCSampler` reads. Sequences without a unique
+    ground state contact list are skipped.
+
+    :return: the sequences that have a native contact list
+    :rtype: list
+    """
+    lattice_factory = LatticeFactory()
+    written = []
+    for n, hp_string in sequences:
+        config = make_config(lattice_factory, hp_string)
+        with quiet():
+            results = Enumerator(lattice_factory, config).enumerate_states()
+        max_contacts = max(results['contacts'].keys())
+        ground_states = [state for state in results['contact_states']
+                         if len(eval(state)) == max_contacts]
+        if len(ground_states) != 1:
+            continue
+        clist_dir = join(clist_root, 'hp%02d' % n)
+        if not os.path.isdir(clist_dir):
+            os.makedirs(clist_dir)
+        with open(join(clist_dir, hp_string + '.clist'), 'w') as f:
+            f.write(ground_states[0] + '\n')
+        written.append((n, hp_string))
+    return written
+
+def bench_enumeration(repeats, quick):
+    results = {}
+    lattice_factory = LatticeFactory()
+    for n, hp_string in ENUMERATION_SEQUENCES:
+        if quick and n > 10:
+            continue
+        config = make_config(lattice_factory, hp_string)
+        def run():
+            with quiet():
+                return Enumerator(lattice_factory, config).enumerate_states()
+        seconds, dos = best_of(run, repeats)
+        results['enumerate/N=%02d/nodes_per_s' % n] = \
+            (dos['nodes'] / seconds, 'nodes/s')
+    return results
+
+def bench_mc(repeats, quick):
+    results = {}
+    lattice_factory = LatticeFactory()
+    num_steps = 2000 if quick else 20000
+    for n, hp_string in MC_SEQUENCES:
+        for moveset in MOVESETS:
+            config = make_config(lattice_factory, hp_string, MOVESET=moveset,
+                                 NREPLICAS=4,
+                                 REPLICATEMPS=[275.0, 325.0, 400.0, 500.0],
+                                 MCSTEPS=num_steps, SWAPEVERY=100,
+                                 PRINTEVERY=1000, TRJEVERY=num_steps,
+                                 ENEEVERY=num_steps)
+            def run():
+                with quiet():
+                    MCSampler(lattice_factory, config).do_mc_sampling()
+            seconds, result = best_of(run, repeats)
+            results['mc/N=%02d/%s/steps_per_s_per_replica' % (n, moveset)] = \
+                (num_steps / seconds, 'steps/s')
+    return results
+
+def bench_mc_to_native(clist_root, sequences, quick):
+    ### throughput with the native check on; runs stop at the native state
+    ### or after max_steps, whichever comes first
+    results = {}
+    max_steps = 2000 if quick else 20000
+    lattice_factory = LatticeFactory()
+    for n, hp_string in sequences:
+        config = make_config(lattice_factory, hp_string, STOPATNATIVE=True,
+                             NATIVEDIR=join(clist_root, 'hp%02d' % n),
+                             MCSTEPS=max_steps, SWAPEVERY=100,
+                             PRINTEVERY=1000, TRJEVERY=max_steps,
+                             ENEEVERY=max_steps)
+        def run():
+            with quiet():
+                s = MCSampler(lattice_factory, config)
+                s.do_mc_sampling()
+            return s.last_step + 1
+        seconds, num_steps = best_of(run, 1)
+        results['mc_native/N=%02d/steps_per_s_per_replica' % n] = \
+            (num_steps / seconds, 'steps/s')
+    return results
+
+def bench_kernels(repeats, quick):
+    ### every kernel backend that is available here
+    results = {}
+    num_calls = 2000 if quick else 20000
+    default_backend = util.get_backend()
+    for n in KERNEL_LENGTHS:
+        walks = random_walks(n, 20)
+        coords = [util.vec2coords(w, numpy.zeros((n, 2), numpy.int32))
+                  for w in walks]
+        H_inds = numpy.arange(n, dtype=numpy.int32)
+        contacts = numpy.zeros((4 * n, 2), numpy.int32)
+        kernels = (
+            ('vec2coords', lambda i: util.vec2coords(walks[i], coords[i])),
+            ('viability', lambda i: util.check_viability(coords[i])),
+            ('find_contacts',
+             lambda i: util.find_contacts(coords[i], H_inds, contacts)),
+            ('energy', lambda i: util.compute_energy(-1.0, coords[i], H_inds)))
+        for backend in util.available_backends():
+            util.set_backend(backend)
+            for name, kernel in kernels:
+                # the first call compiles the numba kernels
+                kernel(0)
+                def run():
+                    for j in xrange(num_calls):
+                        kernel(j % len(walks))
+                seconds, result = best_of(run, repeats)
+                results['kernel/%s/%s/N=%02d/calls_per_s' % \
+                        (backend, name, n)] = (num_calls / seconds, 'calls/s')
+    util.set_backend(default_backend)
+    return results
+
+def bench_scoring(repeats, quick):
+    ### batch scoring of random conformations, viable or not
+    results = {}
+    num_confs = 20000 if quick else 200000
+    rng = numpy.random.RandomState(SEED)
+    for n, hp_string in MC_SEQUENCES:
+        vecs = rng.randint(0, 4, size=(num_confs, n - 1)).astype(numpy.int32)
+        def run():
+            return score_conformations(hp_string, vecs=vecs)
+        seconds, result = best_of(run, repeats)
+        results['scoring/N=%02d/confs_per_s' % n] = (num_confs / seconds,
+                                                     'confs/s')
+    return results
+
+def bench_trajectory_io(repeats, quick):
+    results = {}
+    num_frames = 2000 if quick else 20000
+    lattice_factory = LatticeFactory()
+    with quiet():
+        chain = lattice_factory.make_chain('H' * 20, [0] * 19)
+    tmpdir = tempfile.mkdtemp()
+    for name, traj_cls in (('Trajectory', Trajectory),
+                           ('BufferedTrajectory', BufferedTrajectory)):
+        filename = join(tmpdir, 'bench.xyz')
+        def run():
+            traj = traj_cls(True, filename)
+            for j in xrange(num_frames):
+                traj.snapshot(chain)
+            traj.finalize()
+        seconds, result = best_of(run, repeats)
+        os.remove(filename)
+        results['io/%s/frames_per_s' % name] = (num_frames / seconds,
+                                                'frames/s')
+    os.rmdir(tmpdir)
+    return results
+
+def run_suite(repeats=3, quick=False):
+    """
+    Run every benchmark.
+
+    :return: ``{'meta': {...}, 'results': {name: {'value':, 'unit':}}}``.
+             Every value is a throughput, so higher is better.
+    :rtype: dict
+    """
+    clist_root = tempfile.mkdtemp()
+    native_sequences = write_native_clists(NATIVE_SEQUENCES, clist_root)
+    results = {}
+    results.update(bench_enumeration(repeats, quick))
+    results.update(bench_mc(repeats, quick))
+    results.update(bench_mc_to_native(clist_root, native_sequences, quick))
+    results.update(bench_kernels(repeats, quick))
+    results.update(bench_scoring(repeats, quick))
+    results.update(bench_trajectory_io(repeats, quick))
+    meta = {'date': strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'backend': util.get_backend(),
+            'platform': platform.platform(),
+            'quick': quick, 'repeats': repeats, 'seed': SEED}
+    return {'meta': meta,
+            'results': dict((name, {'value': value, 'unit': unit})
+                            for name, (value, unit) in results.iteritems())}
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline.
+
+    :param float threshold: a benchmark regresses when its throughput is
+                            below ``(1 - threshold)`` times the baseline.
+    :return: names of the benchmarks that regressed
+    :rtype: list
+    """
+    regressions = []
+    print '%-50s %-14s %-14s %-8s' % ('benchmark', 'baseline', 'current',
+                                      'ratio')
+    for name in sorted(results['results']):
+        if name not in baseline['results']:
+            continue
+        current = results['results'][name]['value']
+        base = baseline['results'][name]['value']
+        ratio = current / base
+        flag = ''
+        if ratio < 1.0 - threshold:
+            regressions.append(name)
+            flag = 'REGRESSION'
+        print '%-50s %-14.4g %-14.4g %-8.3f %s' % \
+            (name, base, current, ratio, flag)
+    return regressions
+
+def main():
+    parser = ArgumentParser(description='Run the hplattice benchmarks.')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='save results as JSON to this path')
+    parser.add_argument('--baseline', default=None,
+                        help='compare against results saved at this path')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fractional slowdown that counts as a regression')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer steps and shorter chains')
+    args = parser.parse_args()
+
+    results = run_suite(args.repeats, args.quick)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    for name in sorted(results['results']):
+        r = results['results'][name]
+        print '%-50s %-14.4g %s' % (name, r['value'], r['unit'])
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
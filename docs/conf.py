@@ -16,7 +16,9 @@ import sys
 import os
 
 import mock
-MOCK_MODULES = ['hplattice.util', 'numpy', 'scipy']
+MOCK_MODULES = ['hplattice.util', 'numpy', 'numpy.random', 'numpy.linalg',
+                'scipy', 'scipy.sparse', 'scipy.sparse.linalg',
+                'scipy.sparse.csgraph']
 for mod_name in MOCK_MODULES:
     sys.modules[mod_name] = mock.Mock()
 
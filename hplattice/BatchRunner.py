@@ -0,0 +1,215 @@
+import random
+from copy import deepcopy
+from os.path import join
+from time import time
+from multiprocessing import Pool
+from argparse import ArgumentParser
+
+from . import LatticeFactory
+from .MCSampler import MCSampler
+from .Enumerator import Enumerator
+
+
+MCREX_COLUMNS = ['hpstring', 'n', 'seed', 'steps', 'found_native',
+                 'mc_acceptance', 'swap_acceptance', 'min_energy',
+                 'wall_time']
+ENUMERATE_COLUMNS = ['hpstring', 'n', 'seed', 'nconfs', 'max_contacts',
+                     'ground_state_degeneracy', 'wall_time']
+
+
+class BatchRunner(object):
+    """
+    *BatchRunner* objects run an independent replica exchange simulation
+    or enumeration for each sequence in a list, spreading the runs over a
+    local pool of processes. Every run starts from a copy of the same base
+    configuration, with the sequence, a straight initial chain and any
+    parameter overrides applied, and seeds the random number generator with
+    ``config.randseed`` plus the index of the run, so a batch is
+    reproducible regardless of the number of processes.
+
+    :param lattice_factory: factory object that knows how to create
+                            configurations, replicas and chains.
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: base configuration for every run
+    :type config: :class:`hplattice.Config.Config`
+    :param str mode: ``'mcrex'`` for replica exchange monte carlo or
+                     ``'enumerate'`` for enumeration.
+    :param int num_processes: optional, number of worker processes. Runs
+                              are done in this process when ``1``.
+    :param str clist_root: optional, directory containing ``hpNN``
+                           directories of native contact lists. When given,
+                           *NATIVEDIR* of each run is set to the directory
+                           that matches the sequence length.
+    """
+    def __init__(self, lattice_factory, config, mode='mcrex',
+                 num_processes=1, clist_root=None):
+        if mode not in ('mcrex', 'enumerate'):
+            raise ValueError("Unknown batch mode %s" % mode)
+        self.lattice_factory = lattice_factory
+        self.config = config
+        self.mode = mode
+        self.num_processes = num_processes
+        self.clist_root = clist_root
+
+    def make_jobs(self, hp_strings, overrides=None):
+        """
+        Build one job per sequence.
+
+        :param list hp_strings: sequences, example ``['HPPH', 'HHPPHH']``
+        :param dict overrides: optional, configuration parameters to apply
+                               to every run, example
+                               ``{'eps': -3.0, 'MOVESET': 'MS3'}``
+        :return: list of ``(mode, lattice_factory, config, seed)`` tuples
+        :rtype: list
+        """
+        if overrides is None:
+            overrides = {}
+        jobs = []
+        for idx, hp_string in enumerate(hp_strings):
+            hp_string = hp_string.strip()
+            n = len(hp_string)
+            params = {'HPSTRING': hp_string, 'INITIALVEC': [0] * (n - 1)}
+            if self.clist_root is not None:
+                params['NATIVEDIR'] = join(self.clist_root, 'hp%02d' % n)
+            params.update(overrides)
+            config = deepcopy(self.config)
+            config.update(**params)
+            seed = self.config.randseed + idx
+            jobs.append((self.mode, self.lattice_factory, config, seed))
+        return jobs
+
+    def run(self, hp_strings, overrides=None):
+        """
+        Run every sequence and collect the results.
+
+        :param list hp_strings: sequences, example ``['HPPH', 'HHPPHH']``
+        :param dict overrides: optional, configuration parameters to apply
+                               to every run
+        :return: one row (dict) per sequence, in the order of *hp_strings*.
+                 The keys of each row are listed in :data:`MCREX_COLUMNS`
+                 or :data:`ENUMERATE_COLUMNS`.
+        :rtype: list
+        """
+        jobs = self.make_jobs(hp_strings, overrides)
+        if self.num_processes == 1:
+            rows = map(run_job, jobs)
+        else:
+            pool = Pool(processes=self.num_processes)
+            try:
+                rows = pool.map(run_job, jobs, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        return rows
+
+    def get_columns(self):
+        """
+        :return: the names of the columns of the result table
+        :rtype: list
+        """
+        if self.mode == 'mcrex':
+            return MCREX_COLUMNS
+        else:
+            return ENUMERATE_COLUMNS
+
+
+def run_job(job):
+    """
+    Run a single job built by :meth:`BatchRunner.make_jobs`. This is a
+    module-level function so that it can be sent to worker processes.
+
+    :param tuple job: ``(mode, lattice_factory, config, seed)``
+    :return: one row of the result table
+    :rtype: dict
+    """
+    mode, lattice_factory, config, seed = job
+    random.seed(seed)
+    start = time()
+    if mode == 'mcrex':
+        s = MCSampler(lattice_factory, config)
+        s.do_mc_sampling()
+        row = s.get_results()
+    else:
+        en = Enumerator(lattice_factory, config)
+        results = en.enumerate_states()
+        max_contacts = max(results['contacts'].keys())
+        row = {'nconfs': results['nconfs'],
+               'max_contacts': max_contacts,
+               'ground_state_degeneracy': results['contacts'][max_contacts]}
+    row['wall_time'] = time() - start
+    row['hpstring'] = config.HPSTRING
+    row['n'] = len(config.HPSTRING)
+    row['seed'] = seed
+    return row
+
+def write_table(rows, columns, filename):
+    """
+    Write batch results to a tab-separated text file with a header row.
+
+    :param list rows: result rows from :meth:`BatchRunner.run`
+    :param list columns: column names, in output order
+    :param str filename: write table to this path
+    """
+    with open(filename, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        for row in rows:
+            f.write('\t'.join([str(row[c]) for c in columns]) + '\n')
+
+def read_sequences(filename):
+    """
+    Read sequences from a text file, one per line. Blank lines and lines
+    starting with ``#`` are skipped.
+
+    :param str filename: path to sequence file
+    :return: list of sequences
+    :rtype: list
+    """
+    hp_strings = []
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                hp_strings.append(line)
+    return hp_strings
+
+def main(argv=None):
+    """
+    Command line interface. Example::
+
+        python -m hplattice.BatchRunner mcrex.conf sequences.txt results.tsv \\
+            --processes 8 --set eps=-3.0 --set MOVESET=MS3
+    """
+    parser = ArgumentParser(description='Run HP lattice calculations for '
+                                        'many sequences.')
+    parser.add_argument('config', help='path to configuration file')
+    parser.add_argument('sequences', help='file with one sequence per line')
+    parser.add_argument('output', help='write result table to this path')
+    parser.add_argument('--mode', default='mcrex',
+                        choices=['mcrex', 'enumerate'])
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--clist-root', default=None,
+                        help='directory containing hpNN native contact '
+                             'list directories')
+    parser.add_argument('--set', action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='override a configuration parameter')
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for assignment in args.set:
+        name, value = assignment.split('=', 1)
+        try:
+            overrides[name] = eval(value)
+        except (NameError, SyntaxError):
+            overrides[name] = value
+
+    lattice_factory = LatticeFactory()
+    config = lattice_factory.make_configuration(filename=args.config)
+    runner = BatchRunner(lattice_factory, config, mode=args.mode,
+                         num_processes=args.processes,
+                         clist_root=args.clist_root)
+    rows = runner.run(read_sequences(args.sequences), overrides)
+    write_table(rows, runner.get_columns(), args.output)
+
+if __name__ == '__main__':
+    main()
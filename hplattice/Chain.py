@@ -1,6 +1,5 @@
 from numpy import array, zeros, int32, r_, append, sqrt, sum
-from .util import vec2coords, check_viability, compute_energy, is_nonsym, \
-                  do_shift
+from . import util
 
 
 DTYPE = int32
@@ -180,8 +179,8 @@ class Chain(object):
             :param vec: convert these vectors into a set of coordinates
             :type vec: :class:`Vectors`
             """
-            # delegate to faster Cython implementation
-            self.coords = vec2coords(vec.as_npy_array(), self.coords)
+            # delegate to the active kernel backend
+            self.coords = util.vec2coords(vec.as_npy_array(), self.coords)
 
         def as_npy_array(self):
             """
@@ -200,7 +199,7 @@ class Chain(object):
             :return: ``True`` if no problems are found with the chain.
             :rtype: bool
             """
-            return check_viability(self.coords)
+            return util.check_viability(self.coords)
 
         def distance_between_pts(self, idx1, idx2):
             """
@@ -265,6 +264,8 @@ class Chain(object):
         
         H_inds = [idx for idx, bead in enumerate(self.hpstring) if bead == 'H']
         self.H_inds = array(H_inds, int32)
+        # preallocated buffer for the contacts found by util.find_contacts
+        self.contact_buffer = zeros((4 * len(H_inds), 2), int32)
 
         # an (n-1)-dimensional vector representation of the chain
         self.vec = Chain.Vectors(initial_vec)
@@ -279,6 +280,10 @@ class Chain(object):
         # Monte Carlo algorithms, e.g.
         self.nextvec = self.vec.copy()
         self.nextcoords = self.coords.copy()
+        # the range of vectors that differ between the current and the
+        # proposed conformation, [lo, hi)
+        self._touched_lo = len(self.vec)
+        self._touched_hi = 0
 
     def __len__(self):
         return self.n
@@ -349,11 +354,28 @@ class Chain(object):
         """
         Compute energy of chain, based on hydrophobic contacts.
 
+        :param float epsilon: the energy of one hydrophobic contact.
+        :return: the total energy of the chain and the list of
+                 ``(idx1,idx2)`` contacts (tuples).
+        :rtype: (float, list)
+        """
+        nc = util.find_contacts(self.coords.as_npy_array(), self.H_inds,
+                                self.contact_buffer)
+        contacts = [tuple(c) for c in self.contact_buffer[:nc].tolist()]
+        return nc * epsilon, contacts
+
+    def contact_energy(self, epsilon=0.):
+        """
+        Compute energy of chain, based on hydrophobic contacts, without
+        building the list of contacts.
+
         :param float epsilon: the energy of one hydrophobic contact.
         :return: the total energy of the chain.
         :rtype: float
         """
-        return compute_energy(epsilon, self.coords.as_npy_array(), self.H_inds)
+        nc = util.find_contacts(self.coords.as_npy_array(), self.H_inds,
+                                self.contact_buffer)
+        return nc * epsilon
 
     def grow(self):
         """
@@ -398,7 +420,7 @@ class Chain(object):
                 break
 
         is_done, vec, coords = \
-            do_shift(self.vec.as_npy_array(), self.coords.as_npy_array())
+            util.do_shift(self.vec.as_npy_array(), self.coords.as_npy_array())
         self.vec.set(vec)
         self.coords.set(coords)
         return is_done
@@ -412,8 +434,8 @@ class Chain(object):
         :return: ``1`` if the chain is non-symmetric, ``0`` otherwise.
         :rtype: int
         """
-        # delegate to the faster Cython implementation
-        return is_nonsym( self.vec.as_npy_array() )
+        # delegate to the active kernel backend
+        return util.is_nonsym( self.vec.as_npy_array() )
 
     def is_first_vec_one(self):
         """
@@ -448,6 +470,7 @@ class Chain(object):
         if tmp1 != tmp2:
             self.nextvec.set_idx(vecindex, tmp2)
             self.nextvec.set_idx(vecindex + 1, tmp1)
+            self._touch(vecindex, vecindex + 2)
 
     def do_crankshaft(self, vecindex):
         """
@@ -461,6 +484,7 @@ class Chain(object):
         if tmp1 != tmp2:
             self.nextvec.set_idx(vecindex, tmp2)
             self.nextvec.set_idx(vecindex + 2, tmp1)
+            self._touch(vecindex, vecindex + 3)
 
     def do_rigid_rot(self, vecindex, direction):
         """
@@ -480,14 +504,59 @@ class Chain(object):
         """
         self.nextvec.vec[vecindex:] = \
             (self.nextvec.vec[vecindex:] + direction) % 4
+        self._touch(vecindex, len(self.nextvec))
+
+    def do_segment_replace(self, vecindex, vecs):
+        """
+        Replace a run of consecutive chain vectors, for example with the
+        vectors of a regrown segment.
+
+        :param int vecindex: the index of the first vector to replace
+        :param list vecs: the new vectors
+        """
+        self.nextvec.vec[vecindex:vecindex + len(vecs)] = vecs
+        self._touch(vecindex, vecindex + len(vecs))
+
+    def _touch(self, lo, hi):
+        ### remember that vectors lo to hi-1 of the proposal were changed
+        self._touched_lo = min(self._touched_lo, lo)
+        self._touched_hi = max(self._touched_hi, hi)
+
+    def swap_buffers(self):
+        """
+        Exchange the current and the proposed conformation of the chain by
+        reference, without copying. Swapping twice restores the original
+        arrangement, so a proposal can be made current temporarily, for
+        example to compute its energy.
+        """
+        self.vec, self.nextvec = self.nextvec, self.vec
+        self.coords, self.nextcoords = self.nextcoords, self.coords
+
+    def reset_proposal(self):
+        """
+        Make the proposed conformation identical to the current conformation
+        again. Only the vectors and coordinates changed by moves since the
+        last reset are copied. This is called after every accepted, rejected
+        or non-viable monte carlo move, so that each move starts from the
+        current conformation.
+        """
+        lo = self._touched_lo
+        hi = self._touched_hi
+        if lo < hi:
+            self.nextvec.vec[lo:hi] = self.vec.vec[lo:hi]
+            # coordinates lo+1 to hi depend on vectors lo to hi-1
+            self.nextcoords.coords[lo+1:hi+1,:] = self.coords.coords[lo+1:hi+1,:]
+        self._touched_lo = len(self.vec)
+        self._touched_hi = 0
 
     def update_chain(self):
         """
         Accept recent chain move. This is usually called after a trial monte
-        carlo move to accept the chain perturbation.
+        carlo move to accept the chain perturbation. The proposed conformation
+        becomes current by swapping buffers, then the proposal is reset.
         """
-        self.vec.vec[:] = self.nextvec.vec[:]
-        self.coords.coords[:,:] = self.nextcoords.coords[:,:]
+        self.swap_buffers()
+        self.reset_proposal()
 
     def nextviable(self):
         """
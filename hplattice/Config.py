@@ -31,6 +31,14 @@ class Config(object):
         # D spring constant (in kcal/mol per D)
         self.KSPRING = 0.0 * self.k * self.T
 
+        # Hamiltonian replica exchange: a list of dicts, one per Hamiltonian,
+        # that override 'eps', 'KSPRING' and/or 'RESTRAINED_STATE', example
+        # [{'KSPRING': 0.0}, {'KSPRING': 0.5}]. Empty for a single
+        # Hamiltonian given by the parameters above. Replicas are laid out on
+        # a (Hamiltonian x temperature) grid, so NREPLICAS must equal
+        # len(HAMILTONIANS) * len(REPLICATEMPS).
+        self.HAMILTONIANS = []
+
         # Monte Carlo and Replica Exchange parameters
         self.NREPLICAS = 8
         # NOTE:  len(REPLICATEMPS) must equal NREPLICAS
@@ -41,19 +49,55 @@ class Config(object):
         # The frequency with which to attempt replica swaps
         self.SWAPEVERY = 500000
         # The method by which to select pairs of replicas for swaps
-        # options: 'random pair', and 'neighbors'
+        # options: 'random pair', 'neighbors', and 'even odd'
         self.SWAPMETHOD = 'random pair'
         # The type of Monte Carlo moveset
         # options: 'MS1', 'MS2', 'MS3', and 'MS4'
         self.MOVESET = 'MS2'
+        # The probability that a Monte Carlo step is a configurational-bias
+        # regrowth of a segment of at most REGROWLENGTH monomers, instead of
+        # a move of MOVESET
+        self.REGROWPROB = 0.0
+        self.REGROWLENGTH = 4
         # Frequency (in MC steps) to print status info to screen
         self.PRINTEVERY = 1000
         # Frequency (in MC steps) to write trajectory data to file
         self.TRJEVERY = 1000
         # Frequency (in MC steps) to write energy data to file
         self.ENEEVERY = 1000
+        # Frequency (in MC steps) to save a checkpoint of the simulation,
+        # 0 to only save a checkpoint at the end
+        self.CHECKPOINTEVERY = 0
+        # 1 to time each phase of the monte carlo steps and print a report
+        # at the end of the simulation, 0 if not.
+        self.PROFILE = False
+        # 1 to count the distinct conformations and contact states that each
+        # replica visits, 0 if not.
+        self.TRACKCOVERAGE = False
+        # The number of distinct conformations (and contact states) per
+        # replica to count exactly, before switching to an estimate
+        self.COVERAGECAP = 100000
+        # Population annealing: the number of chains in the population, and
+        # the number of monte carlo steps per chain at each temperature
+        self.POPULATION = 1000
+        self.ANNEALSTEPS = 10
+        # Markov state model: 'contacts' to count transitions between
+        # contact states, 'native' between numbers of native contacts, or
+        # None not to count transitions. Transitions are counted at a lag of
+        # MSMLAG steps.
+        self.MSMSTATES = None
+        self.MSMLAG = 10
         # 1 to stop the simulation as soon as the native is found, 0 if not.
         self.STOPATNATIVE = True
+        # Stop the simulation once it has sampled enough, checked every
+        # PRINTEVERY steps: when the replicas have made STOPROUNDTRIPS round
+        # trips, when the energy histograms of the first and second half of
+        # the run differ by less than STOPHISTTOL, and when the energy of
+        # every temperature has an effective sample size of at least STOPESS.
+        # 0 turns a rule off, and all rules that are on must be met.
+        self.STOPROUNDTRIPS = 0
+        self.STOPHISTTOL = 0.0
+        self.STOPESS = 0
 
         # Trajectory data directory pathnames
         self.EXPDIR = './'
@@ -66,6 +110,12 @@ class Config(object):
         # each belonging to a foldable sequence, and containing the native
         # contact list 
         self.NATIVEDIR = '../HP-sequences/sequences/clist/hp13'
+        # Native contact database, used instead of NATIVEDIR when set
+        self.NATIVEDB = None
+        # Directory of the cache of enumeration results, None for no cache,
+        # and the size limit of the cache in bytes
+        self.ENUMCACHEDIR = None
+        self.ENUMCACHESIZE = 2**30
         
         if filename != None:
             self.read_configfile( filename )
@@ -110,6 +160,9 @@ class Config(object):
         
                 if fields[0] == 'KSPRING':
                     self.KSPRING = eval(fields[1])
+
+                if fields[0] == 'HAMILTONIANS':
+                    self.HAMILTONIANS = eval(joinfields(fields[1:]))
         
                 if fields[0] == 'NREPLICAS':
                     self.NREPLICAS = eval(fields[1])
@@ -126,6 +179,12 @@ class Config(object):
                 if fields[0] == 'SWAPMETHOD':
                     self.SWAPMETHOD = joinfields(fields[1:])
                 
+                if fields[0] == 'REGROWPROB':
+                    self.REGROWPROB = eval(fields[1])
+
+                if fields[0] == 'REGROWLENGTH':
+                    self.REGROWLENGTH = eval(fields[1])
+
                 if fields[0] == 'MOVESET':
                     self.MOVESET = joinfields(fields[1:])
                 
@@ -141,11 +200,53 @@ class Config(object):
                 if fields[0] == 'ENEEVERY':
                     self.ENEEVERY = eval(fields[1])
 
+                if fields[0] == 'CHECKPOINTEVERY':
+                    self.CHECKPOINTEVERY = eval(fields[1])
+
+                if fields[0] == 'PROFILE':
+                    self.PROFILE = eval(fields[1])
+
+                if fields[0] == 'TRACKCOVERAGE':
+                    self.TRACKCOVERAGE = eval(fields[1])
+
+                if fields[0] == 'COVERAGECAP':
+                    self.COVERAGECAP = eval(fields[1])
+
+                if fields[0] == 'POPULATION':
+                    self.POPULATION = eval(fields[1])
+
+                if fields[0] == 'ANNEALSTEPS':
+                    self.ANNEALSTEPS = eval(fields[1])
+
+                if fields[0] == 'MSMSTATES':
+                    self.MSMSTATES = fields[1]
+
+                if fields[0] == 'MSMLAG':
+                    self.MSMLAG = eval(fields[1])
+
                 if fields[0] == 'NATIVEDIR':
                     self.NATIVEDIR = fields[1]
 
+                if fields[0] == 'NATIVEDB':
+                    self.NATIVEDB = fields[1]
+
+                if fields[0] == 'ENUMCACHEDIR':
+                    self.ENUMCACHEDIR = fields[1]
+
+                if fields[0] == 'ENUMCACHESIZE':
+                    self.ENUMCACHESIZE = eval(fields[1])
+
                 if fields[0] == 'STOPATNATIVE':
                     self.STOPATNATIVE = eval(fields[1])     
+
+                if fields[0] == 'STOPROUNDTRIPS':
+                    self.STOPROUNDTRIPS = eval(fields[1])
+
+                if fields[0] == 'STOPHISTTOL':
+                    self.STOPHISTTOL = eval(fields[1])
+
+                if fields[0] == 'STOPESS':
+                    self.STOPESS = eval(fields[1])
         # end of line-reading loop
         
         self.SETUPDIR = self.EXPDIR + '/setup'
@@ -154,6 +255,61 @@ class Config(object):
         
         self.epsilon = self.eps * self.k * self.T
 
+    def update(self, **params):
+        """
+        Override configuration parameters, then recompute the parameters
+        that are derived from them. Parameter names are the attribute names
+        of this object, for example::
+
+            config.update(eps=-3.0, MOVESET='MS3',
+                          REPLICATEMPS=[300.0, 350.0, 400.0])
+
+        If *REPLICATEMPS* or *HAMILTONIANS* is given without *NREPLICAS*,
+        *NREPLICAS* is set to the number of (Hamiltonian, temperature) pairs.
+
+        :param params: new values of configuration parameters
+        """
+        for name, value in params.iteritems():
+            if not hasattr(self, name):
+                raise AttributeError("Unknown configuration parameter %s" % name)
+            setattr(self, name, value)
+        if ('REPLICATEMPS' in params or 'HAMILTONIANS' in params) and \
+           'NREPLICAS' not in params:
+            self.NREPLICAS = \
+                len(self.REPLICATEMPS) * self.get_num_hamiltonians()
+        if 'EXPDIR' in params:
+            self.SETUPDIR = self.EXPDIR + '/setup'
+            self.ANALDIR = self.EXPDIR + '/anal'
+            self.DATADIR = self.EXPDIR + '/data'
+        self.epsilon = self.eps * self.k * self.T
+
+    def get_num_hamiltonians(self):
+        """
+        :return: the number of Hamiltonians, ``1`` if *HAMILTONIANS* is empty
+        :rtype: int
+        """
+        return max(1, len(self.HAMILTONIANS))
+
+    def get_hamiltonian(self, idx):
+        """
+        :param int idx: the index of a Hamiltonian in *HAMILTONIANS*
+        :return: ``'eps'``, ``'epsilon'``, ``'KSPRING'`` and
+                 ``'RESTRAINED_STATE'`` of the Hamiltonian. Parameters that
+                 it does not override are the parameters of this
+                 configuration.
+        :rtype: dict
+        """
+        params = {'eps': self.eps, 'KSPRING': self.KSPRING,
+                  'RESTRAINED_STATE': self.RESTRAINED_STATE}
+        if self.HAMILTONIANS:
+            overrides = self.HAMILTONIANS[idx]
+            for name in overrides:
+                if name not in params:
+                    raise ValueError("Unknown Hamiltonian parameter %s" % name)
+            params.update(overrides)
+        params['epsilon'] = params['eps'] * self.k * self.T
+        return params
+
     def print_config(self):
         """
         Output the values of the configuration variables.
@@ -164,15 +320,32 @@ class Config(object):
         print '%-30s %s' % ('EPS', repr(self.eps))
         print '%-30s %s' % ('RESTRAINED_STATE', repr(self.RESTRAINED_STATE))
         print '%-30s %s' % ('KSPRING', repr(self.KSPRING))
+        print '%-30s %s' % ('HAMILTONIANS', repr(self.HAMILTONIANS))
         print '%-30s %s' % ('NREPLICAS', repr(self.NREPLICAS))
         print '%-30s %s' % ('REPLICATEMPS', repr(self.REPLICATEMPS))
         print '%-30s %s' % ('MCSTEPS', repr(self.MCSTEPS))
         print '%-30s %s' % ('SWAPEVERY', repr(self.SWAPEVERY))
         print '%-30s %s' % ('SWAPMETHOD', repr(self.SWAPMETHOD))
         print '%-30s %s' % ('MOVESET', repr(self.MOVESET))
+        print '%-30s %s' % ('REGROWPROB', repr(self.REGROWPROB))
+        print '%-30s %s' % ('REGROWLENGTH', repr(self.REGROWLENGTH))
         print '%-30s %s' % ('EXPDIR', repr(self.EXPDIR))
         print '%-30s %s' % ('PRINTEVERY', repr(self.PRINTEVERY))
         print '%-30s %s' % ('TRJEVERY', repr(self.TRJEVERY))
         print '%-30s %s' % ('ENEEVERY', repr(self.ENEEVERY))
+        print '%-30s %s' % ('CHECKPOINTEVERY', repr(self.CHECKPOINTEVERY))
+        print '%-30s %s' % ('PROFILE', repr(self.PROFILE))
+        print '%-30s %s' % ('TRACKCOVERAGE', repr(self.TRACKCOVERAGE))
+        print '%-30s %s' % ('COVERAGECAP', repr(self.COVERAGECAP))
+        print '%-30s %s' % ('POPULATION', repr(self.POPULATION))
+        print '%-30s %s' % ('ANNEALSTEPS', repr(self.ANNEALSTEPS))
+        print '%-30s %s' % ('MSMSTATES', repr(self.MSMSTATES))
+        print '%-30s %s' % ('MSMLAG', repr(self.MSMLAG))
         print '%-30s %s' % ('NATIVEDIR', repr(self.NATIVEDIR))
+        print '%-30s %s' % ('NATIVEDB', repr(self.NATIVEDB))
+        print '%-30s %s' % ('ENUMCACHEDIR', repr(self.ENUMCACHEDIR))
+        print '%-30s %s' % ('ENUMCACHESIZE', repr(self.ENUMCACHESIZE))
         print '%-30s %s' % ('STOPATNATIVE', repr(self.STOPATNATIVE))
+        print '%-30s %s' % ('STOPROUNDTRIPS', repr(self.STOPROUNDTRIPS))
+        print '%-30s %s' % ('STOPHISTTOL', repr(self.STOPHISTTOL))
+        print '%-30s %s' % ('STOPESS', repr(self.STOPESS))
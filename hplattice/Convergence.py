@@ -0,0 +1,225 @@
+from numpy import array, zeros, abs, float64
+from numpy.fft import rfft, irfft
+
+
+def effective_sample_size(series):
+    """
+    Estimate the number of independent samples in a correlated time series,
+    :math:`N / \\tau` with the integrated autocorrelation time
+    :math:`\\tau = -1 + 2 \\sum_k (\\rho_{2k} + \\rho_{2k+1})`, summed over
+    Geyer's initial positive sequence of autocorrelations :math:`\\rho`. A
+    series that never changes says nothing about its fluctuations, so its
+    effective sample size is ``0``.
+
+    :param series: the time series, example the number of contacts at one
+                   temperature every *ENEEVERY* steps
+    :type series: list or :class:`numpy.ndarray`
+    :return: the effective sample size
+    :rtype: float
+    """
+    x = array(series, float64)
+    n = len(x)
+    if n < 2:
+        return 0.0
+    x = x - x.mean()
+    # autocovariance by FFT, zero padded to avoid wrapping around
+    size = 1
+    while size < 2 * n:
+        size *= 2
+    f = rfft(x, size)
+    acov = irfft(f * f.conjugate(), size)[:n]
+    if acov[0] <= 0.0:
+        return 0.0
+    rho = acov / acov[0]
+    tau = -1.0
+    for k in range(0, n - 1, 2):
+        pair = rho[k] + rho[k + 1]
+        if pair <= 0.0:
+            break
+        tau += 2.0 * pair
+    return n / max(tau, 1.0)
+
+def histogram_change(old, new):
+    """
+    :param old: earlier histograms, one row per temperature
+    :type old: :class:`numpy.ndarray`
+    :param new: later histograms of the same shape
+    :type new: :class:`numpy.ndarray`
+    :return: the total variation distance between the normalized earlier and
+             later histogram of each temperature, ``1`` for empty histograms
+    :rtype: :class:`numpy.ndarray`
+    """
+    change = zeros(len(new))
+    for t in range(len(new)):
+        old_total = old[t].sum()
+        new_total = new[t].sum()
+        if old_total == 0 or new_total == 0:
+            change[t] = 1.0
+        else:
+            change[t] = 0.5 * abs(old[t] / float(old_total) -
+                                  new[t] / float(new_total)).sum()
+    return change
+
+
+class BlockedSeries(object):
+    """
+    *BlockedSeries* objects hold a time series in bounded memory, for
+    :func:`effective_sample_size`. Values are averaged over blocks, and
+    when *max_blocks* blocks are full, neighbouring blocks are merged and
+    the block length doubles. Block averages of a correlated series are
+    less correlated than the values, and the effective sample size of the
+    values follows from that of the block averages and the variance of
+    the values, which is kept as they are added.
+
+    :param int max_blocks: optional, the largest number of blocks kept, an
+                           even number
+    """
+    def __init__(self, max_blocks=4096):
+        self.max_blocks = max_blocks
+        # the averages of the full blocks, and the length of a block
+        self.blocks = []
+        self.block_length = 1
+        # the sum and number of values of the block being filled
+        self.pending_sum = 0.0
+        self.pending_count = 0
+        # the number, mean and sum of squared deviations of all values
+        self.count = 0
+        self.mean = 0.0
+        self.sum_squares = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        """
+        :param value: the next value of the series
+        :type value: int or float
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / float(self.count)
+        self.sum_squares += delta * (value - self.mean)
+        self.pending_sum += value
+        self.pending_count += 1
+        if self.pending_count == self.block_length:
+            self.blocks.append(self.pending_sum / self.block_length)
+            self.pending_sum = 0.0
+            self.pending_count = 0
+            if len(self.blocks) >= self.max_blocks:
+                self.blocks = [0.5 * (self.blocks[k] + self.blocks[k + 1])
+                               for k in range(0, len(self.blocks) - 1, 2)]
+                self.block_length *= 2
+
+    def effective_sample_size(self):
+        """
+        :return: the effective sample size of the values added so far,
+                 ``0`` if they never changed
+        :rtype: float
+        """
+        if self.block_length == 1:
+            return effective_sample_size(self.blocks)
+        if self.count < 2 or self.sum_squares <= 0.0:
+            return 0.0
+        blocks = array(self.blocks, float64)
+        block_variance = blocks.var()
+        if block_variance <= 0.0:
+            return 0.0
+        # the variance of the mean is the variance of the block averages
+        # over their effective sample size
+        variance = self.sum_squares / self.count
+        ess = variance * effective_sample_size(blocks) / block_variance
+        return min(ess, float(self.count))
+
+
+class ConvergenceMonitor(object):
+    """
+    *ConvergenceMonitor* objects decide when a replica exchange simulation
+    has sampled enough to stop. Each rule is turned off by a value of ``0``,
+    and the simulation has converged when every rule that is on is met:
+
+    * the replicas have made at least *round_trips* round trips in total;
+    * the energy histogram of every temperature over the first half of the
+      samples differs by less than *histogram_tolerance* (total variation
+      distance) from that over the second half;
+    * the energy time series of every temperature has an effective sample
+      size of at least *min_ess*, see :func:`effective_sample_size`.
+
+    The halves are disjoint, so the histogram rule measures how far apart
+    two independent stretches of the simulation are rather than how little
+    one more stretch adds to the total. The first half ends at the check
+    closest to half of the samples, among up to *max_checks* earlier
+    checks. A temperature that never left one histogram bin has the same
+    histogram in both halves, so the rule is best used together with the
+    round trip or effective sample size rule.
+
+    :param int num_temps: the number of temperatures
+    :param int round_trips: optional, the target number of round trips
+    :param float histogram_tolerance: optional, the largest difference of
+                                      the histograms of the two halves
+    :param float min_ess: optional, the smallest effective sample size
+    :param int max_checks: optional, the number of earlier checks kept
+    """
+    def __init__(self, num_temps, round_trips=0, histogram_tolerance=0.0,
+                 min_ess=0.0, max_checks=64):
+        self.round_trips = round_trips
+        self.histogram_tolerance = histogram_tolerance
+        self.min_ess = min_ess
+        self.max_checks = max_checks
+        # the energy time series of each temperature
+        self.series = [BlockedSeries() for k in range(num_temps)]
+        # the histograms at earlier checks, oldest first
+        self.checked_histograms = []
+        # the latest value of each statistic
+        self.histogram_change = zeros(num_temps) + 1.0
+        self.ess = zeros(num_temps)
+
+    def record(self, temp_index, energy):
+        """
+        Append an energy to the time series of a temperature.
+
+        :param int temp_index: the position of the temperature in
+                               *REPLICATEMPS*
+        :param energy: the energy, or number of contacts
+        :type energy: int or float
+        """
+        self.series[temp_index].append(energy)
+
+    def _halves_change(self, energy_histograms):
+        ### compare the histograms of the first and second half of the samples
+        half = 0.5 * energy_histograms.sum()
+        first = None
+        for histograms in self.checked_histograms:
+            if first is None or \
+               abs(histograms.sum() - half) < abs(first.sum() - half):
+                first = histograms
+        self.checked_histograms.append(energy_histograms.copy())
+        if len(self.checked_histograms) > self.max_checks:
+            # keep every other check, and the latest
+            self.checked_histograms = self.checked_histograms[-1::-2][::-1]
+        if first is None:
+            return zeros(len(energy_histograms)) + 1.0
+        return histogram_change(first, energy_histograms - first)
+
+    def check(self, round_trips, energy_histograms):
+        """
+        Update the statistics and apply the stopping rules.
+
+        :param int round_trips: the total number of replica round trips
+        :param energy_histograms: the energy histogram of each temperature,
+                                  counted since the start of the simulation
+        :type energy_histograms: :class:`numpy.ndarray`
+        :return: ``True`` if every rule that is on is met
+        :rtype: bool
+        """
+        converged = True
+        if self.round_trips > 0 and round_trips < self.round_trips:
+            converged = False
+        if self.histogram_tolerance > 0:
+            self.histogram_change = self._halves_change(energy_histograms)
+            if (self.histogram_change >= self.histogram_tolerance).any():
+                converged = False
+        if self.min_ess > 0:
+            self.ess = array([s.effective_sample_size() for s in self.series])
+            if (self.ess < self.min_ess).any():
+                converged = False
+        return converged
@@ -0,0 +1,209 @@
+from numpy import asarray, zeros, int32, uint8, float64, log, exp
+
+# bits of the register index of the HyperLogLog sketch
+SKETCH_BITS = 14
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def canonical_vec(vec):
+    """
+    Rotate and reflect a conformation into the orientation that
+    :meth:`hplattice.Chain.Chain.nonsym` calls non-symmetric: the first vector
+    is ``0`` and the first vector that is not ``0`` is a ``1``. The eight
+    conformations related by rotations and reflections of the lattice have
+    the same canonical form.
+
+    :param vec: chain vectors
+    :type vec: :class:`numpy.ndarray`
+    :return: the canonical chain vectors
+    :rtype: :class:`numpy.ndarray`
+    """
+    vec = asarray(vec, int32)
+    if len(vec) == 0:
+        return vec.copy()
+    # rotate so that the first vector points up
+    canonical = (vec - vec[0]) % 4
+    turns = canonical.nonzero()[0]
+    if len(turns) > 0 and canonical[turns[0]] == 3:
+        # reflect left and right
+        canonical = (4 - canonical) % 4
+    return canonical
+
+def conformation_key(vec):
+    """
+    A compact key for a conformation that is the same for every rotation and
+    reflection of it: the vectors of :func:`canonical_vec` packed two bits
+    each.
+
+    :param vec: chain vectors
+    :type vec: :class:`numpy.ndarray`
+    :rtype: str
+    """
+    canonical = canonical_vec(vec).astype(uint8)
+    padded = zeros(4 * ((len(canonical) + 3) // 4), uint8)
+    padded[:len(canonical)] = canonical
+    packed = (padded[0::4] << 6) | (padded[1::4] << 4) | \
+             (padded[2::4] << 2) | padded[3::4]
+    return packed.tostring()
+
+def contact_state_key(state):
+    """
+    :param list state: contacts, as returned by
+                       :meth:`hplattice.Chain.Chain.energy`
+    :return: a hashable key for the contact state
+    :rtype: tuple
+    """
+    return tuple(state)
+
+def _mix64(x):
+    ### spread the bits of a hash value over all 64 bits (splitmix64)
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class VisitedSet(object):
+    """
+    *VisitedSet* objects count distinct hashable items, such as conformation
+    keys, in bounded memory. Items are kept in an exact set until there are
+    *max_exact* of them. After that the set is replaced by a HyperLogLog
+    sketch (Flajolet et al., 2007) of :data:`SKETCH_BITS` registers, whose
+    count has a relative standard error of about 1%.
+
+    :param int max_exact: optional, the number of distinct items to count
+                          exactly
+    """
+    def __init__(self, max_exact=100000):
+        self.max_exact = max_exact
+        self.items = set()
+        self.registers = None
+
+    def __len__(self):
+        return self.count()
+
+    def is_exact(self):
+        """
+        :return: ``True`` while the items are counted exactly
+        :rtype: bool
+        """
+        return self.registers is None
+
+    def add(self, item):
+        """
+        :param item: a hashable item
+        """
+        if self.registers is None:
+            self.items.add(item)
+            if len(self.items) > self.max_exact:
+                self._start_sketch()
+        else:
+            self._add_to_sketch(item)
+
+    def _start_sketch(self):
+        ### move the exact set into a sketch
+        self.registers = zeros(2**SKETCH_BITS, uint8)
+        for item in self.items:
+            self._add_to_sketch(item)
+        self.items = None
+
+    def _add_to_sketch(self, item):
+        ### record the rank of the first set bit in the item's register
+        h = _mix64(hash(item) & MASK64)
+        idx = h >> (64 - SKETCH_BITS)
+        rest = h & ((1 << (64 - SKETCH_BITS)) - 1)
+        rank = (64 - SKETCH_BITS) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def get_state(self):
+        """
+        :return: the exact set of items, or ``None`` once it was replaced by
+                 the sketch, and the registers of the sketch, or ``None``
+                 before it was started
+        :rtype: (set, :class:`numpy.ndarray`)
+        """
+        if self.registers is None:
+            return set(self.items), None
+        return None, self.registers.copy()
+
+    def set_state(self, state):
+        """
+        :param tuple state: a state returned by :meth:`get_state`
+        """
+        items, registers = state
+        if registers is None:
+            self.items = set(items)
+            self.registers = None
+        else:
+            self.items = None
+            self.registers = registers.copy()
+
+    def count(self):
+        """
+        :return: the number of distinct items added, estimated once the
+                 exact set is full
+        :rtype: int
+        """
+        if self.registers is None:
+            return len(self.items)
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        estimate = alpha * m * m / \
+                   exp(-self.registers.astype(float64) * log(2.0)).sum()
+        num_zero = (self.registers == 0).sum()
+        if estimate <= 2.5 * m and num_zero > 0:
+            # linear counting is more accurate for small counts
+            estimate = m * log(m / num_zero)
+        return int(round(estimate))
+
+
+class Coverage(object):
+    """
+    *Coverage* objects track how much of conformation space a replica has
+    explored: the number of distinct conformations, counted up to rotations
+    and reflections, and the number of distinct contact states it has
+    visited.
+
+    :param int max_exact: optional, count this many distinct conformations
+                          and contact states exactly, then estimate. See
+                          :class:`VisitedSet`.
+    """
+    def __init__(self, max_exact=100000):
+        self.conformations = VisitedSet(max_exact)
+        self.contact_states = VisitedSet(max_exact)
+
+    def record(self, chain):
+        """
+        Record the current conformation of a chain.
+
+        :param chain: a chain
+        :type chain: :class:`hplattice.Chain.Chain`
+        """
+        self.conformations.add(conformation_key(chain.vec.as_npy_array()))
+        E, state = chain.energy()
+        self.contact_states.add(contact_state_key(state))
+
+    def get_counts(self):
+        """
+        :return: the number of distinct conformations and contact states
+                 visited
+        :rtype: (int, int)
+        """
+        return self.conformations.count(), self.contact_states.count()
+
+    def get_state(self):
+        """
+        :return: the states of the conformation and contact state counts,
+                 see :meth:`VisitedSet.get_state`
+        :rtype: tuple
+        """
+        return self.conformations.get_state(), self.contact_states.get_state()
+
+    def set_state(self, state):
+        """
+        :param tuple state: a state returned by :meth:`get_state`
+        """
+        conformations, contact_states = state
+        self.conformations.set_state(conformations)
+        self.contact_states.set_state(contact_states)
@@ -0,0 +1,125 @@
+from numpy import dtype, zeros, fromfile, int8, int32, int64, float64
+
+
+ENERGY_LOG_DTYPE = dtype([('step', int64),
+                          ('replica', int32),
+                          ('temp_index', int32),
+                          ('ham_index', int32),
+                          ('energy', float64),
+                          ('ncontacts', int32),
+                          ('native', int8),
+                          ('restraint_D', float64)])
+
+
+def read_energy_log(filename):
+    """
+    Read an energy log written by :class:`EnergyLog`.
+
+    :param str filename: path to energy log
+    :return: one record per replica per logged step, with the fields of
+             :data:`ENERGY_LOG_DTYPE`. Columns are accessed by name, for
+             example ``log['energy'][log['temp_index'] == 0]``.
+    :rtype: :class:`numpy.ndarray`
+    """
+    return fromfile(filename, dtype=ENERGY_LOG_DTYPE)
+
+
+class EnergyLog(object):
+    """
+    *EnergyLog* objects record the energy and other observables of each
+    replica during a monte carlo simulation. Records are collected in a
+    preallocated array and appended to a binary file one block at a time, so
+    the file can be read back with :func:`read_energy_log` or directly with
+    ``numpy.fromfile(filename, dtype=ENERGY_LOG_DTYPE)``.
+
+    :param bool save_energies: ``True`` if energies should be saved to file.
+    :param str energy_filename: write energy log to this path
+    :param bool append: optional, ``True`` to append to an existing log
+    :param int block_size: optional, the number of records to collect before
+                           writing them to file.
+    """
+    def __init__(self, save_energies, energy_filename, append=False,
+                 block_size=4096):
+        self.save_energies = save_energies
+        self.energy_filename = energy_filename
+        if self.save_energies:
+            if append:
+                self.output_stream = open(self.energy_filename, 'ab')
+            else:
+                self.output_stream = open(self.energy_filename, 'wb')
+            self.buffer = zeros(block_size, dtype=ENERGY_LOG_DTYPE)
+        else:
+            self.output_stream = None
+            self.buffer = None
+        self.num_buffered = 0
+
+    def record(self, step, replica_num, replica, E, state):
+        """
+        Record the current state of a replica.
+
+        :param int step: monte carlo step
+        :param int replica_num: replica number
+        :param replica: record observables of this replica
+        :type replica: :class:`hplattice.Replica.Replica`
+        :param float E: contact energy of the replica's chain
+        :param list state: contacts of the replica's chain, as returned by
+                           :meth:`hplattice.Chain.Chain.energy`
+        """
+        if self.save_energies:
+            row = self.buffer[self.num_buffered]
+            row['step'] = step
+            row['replica'] = replica_num
+            row['temp_index'] = replica.mc.tempfromrep
+            row['ham_index'] = replica.mc.hamfromrep
+            row['energy'] = E
+            row['ncontacts'] = len(state)
+            row['native'] = (replica.nativeclist == state)
+            row['restraint_D'] = replica.mc.restraint.D(replica.chain)
+            self.num_buffered += 1
+            if self.num_buffered == len(self.buffer):
+                self.flush()
+        else:
+            pass
+
+    def flush(self):
+        """
+        Write all buffered records to file.
+        """
+        if self.save_energies and self.num_buffered > 0:
+            self.buffer[:self.num_buffered].tofile(self.output_stream)
+            self.num_buffered = 0
+
+    def get_position(self):
+        """
+        Write all buffered records and report the size of the log.
+
+        :return: the size of the log, in bytes
+        :rtype: int
+        """
+        if self.save_energies:
+            self.flush()
+            self.output_stream.flush()
+            return self.output_stream.tell()
+        else:
+            return 0
+
+    def set_position(self, byte_offset):
+        """
+        Discard any records written after a position reported by
+        :meth:`get_position`.
+
+        :param int byte_offset: truncate the log to this size
+        """
+        if self.save_energies:
+            self.output_stream.truncate(byte_offset)
+            self.output_stream.seek(0, 2)
+
+    def finalize(self):
+        """
+        Write all buffered records and close the file.
+        """
+        if self.output_stream:
+            self.flush()
+            self.output_stream.close()
+        else:
+            pass
@@ -0,0 +1,111 @@
+import os
+import fcntl
+import cPickle
+from hashlib import sha1
+from tempfile import mkstemp
+
+# Bump when a change to the enumeration changes its results, so that
+# results cached by older code are not used.
+CACHE_VERSION = 1
+
+
+class EnumerationCache(object):
+    """
+    *EnumerationCache* objects store the results of
+    :meth:`hplattice.Enumerator.Enumerator.enumerate_states` in a directory,
+    one pickle file per result, named by a hash of the sequence, the chain
+    length and :data:`CACHE_VERSION`. Several processes can share a cache:
+    results are written to a temporary file and renamed into place, so a
+    reader never sees a partial result, and eviction is serialized with a
+    lock file. When the files take more than *max_bytes*, the least recently
+    used results are removed.
+
+    :param str directory: path to the cache directory, created if needed
+    :param int max_bytes: optional, the size limit of the cache
+    """
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another process created it first
+                if not os.path.isdir(directory):
+                    raise
+
+    def get_key(self, hpstring):
+        """
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :return: the cache key of the sequence
+        :rtype: str
+        """
+        return sha1('%d:%d:%s' % (CACHE_VERSION, len(hpstring),
+                                  hpstring)).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, hpstring):
+        """
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :return: the cached result for the sequence, or ``None`` if there is
+                 none
+        :rtype: dict
+        """
+        path = self._path(self.get_key(hpstring))
+        try:
+            with open(path, 'rb') as f:
+                result = cPickle.load(f)
+        except (IOError, EOFError, cPickle.UnpicklingError):
+            return None
+        try:
+            # mark the result as recently used
+            os.utime(path, None)
+        except OSError:
+            pass
+        return result
+
+    def put(self, hpstring, result):
+        """
+        Store the result for a sequence, then evict old results if the
+        cache is too large.
+
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :param dict result: the result of
+                            :meth:`hplattice.Enumerator.Enumerator.enumerate_states`
+        """
+        fd, tmp_path = mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            cPickle.dump(result, f, cPickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, self._path(self.get_key(hpstring)))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache fits in
+        *max_bytes*.
+        """
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+                total += st.st_size
+            entries.sort()
+            for mtime, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
@@ -1,9 +1,13 @@
+from .EnumerationCache import EnumerationCache
+
 
 class Enumerator(object):
     """
     *Enumerator* objects are used to enumerate all conformations of
     an HP chain. The HP chain is defined in a configuration file, specified
-    by the *config* parameter.
+    by the *config* parameter. If *ENUMCACHEDIR* is set in the
+    configuration, results are looked up in and saved to an
+    :class:`hplattice.EnumerationCache.EnumerationCache` in that directory.
 
     :param lattice_factory: factory object that knows how to create chains and
                             trajectories
@@ -15,17 +19,73 @@ class Enumerator(object):
         self.config = config
         self.chain = lattice_factory.make_chain(self.config.HPSTRING,
                                                 self.config.INITIALVEC)
+        if self.config.ENUMCACHEDIR:
+            self.cache = EnumerationCache(self.config.ENUMCACHEDIR,
+                                          self.config.ENUMCACHESIZE)
+        else:
+            self.cache = None
+
+    def conformations(self):
+        """
+        Walk through all non-symmetric, viable conformations of the chain.
+        The walk grows the chain one vector at a time and backtracks with
+        :meth:`hplattice.Chain.Chain.shift`, so the conformations always
+        come in the same order, the enumeration order. The number of partial
+        and complete chains visited so far is kept in *nodes*.
+
+        NOTE: in order for this to work correctly, the initial starting
+        vector must be [0,0,0,....,0]
+
+        :return: generator of the enumerator's chain, set to each
+                 conformation in turn. Copy the vectors of the chain to keep
+                 a conformation.
+        :rtype: generator
+        """
+        self.nodes = 0
+        done = False
+        while not done:
+            self.nodes += 1
+            if len(self.chain.vec) == (self.chain.n - 1):
+                if self.chain.is_viable():
+                    if self.chain.nonsym():
+                        yield self.chain
+                done = self.chain.shift()
+
+            else:
+                if self.chain.is_viable():
+                    self.chain.grow()
+                else:
+                    done = self.chain.shift()
+
+            if self.chain.is_first_vec_one():
+                # skip the other symmetries
+                break
 
     def enumerate_states(self, save_trajectory=False,
                          trajectory_filename='traj.xyz'):
         """
         Enumerate all conformations of an HP chain.
-        Prints density of contact states to stdout.
+        Prints density of contact states to stdout. A cached result is
+        returned without enumerating, unless a trajectory is requested.
 
         :param bool save_trajectory: Generate an xyz coordinate trajectory
                                      when ``True``.
         :param str trajectory_filename: optional, save trajectory to this path
+        :return: the number of conformations (``'nconfs'``), the number of
+                 partial and complete chains visited (``'nodes'``), the density of
+                 states as ``{number of contacts: number of conformations}``
+                 (``'contacts'``), and the density of contact states as
+                 ``{repr(contact state): number of conformations}``
+                 (``'contact_states'``).
+        :rtype: dict
         """
+        if self.cache is not None and not save_trajectory:
+            result = self.cache.get(self.config.HPSTRING)
+            if result is not None:
+                self._print_density(result['contacts'],
+                                    result['contact_states'])
+                return result
+
         nconfs = 0
         # dictionary of {repr{contact state}: number of conformations}
         contact_states = {}
@@ -35,60 +95,38 @@ class Enumerator(object):
         traj = self.lattice_factory.make_trajectory(save_trajectory,
                                                     trajectory_filename)
 
-        #################
-        #
-        # This is a useful subroutine for enumerating all conformations
-        # of an HP chain
-        #
-        # NOTE: in order for this to work correctly, the initial starting
-        # vector must be [0,0,0,....,0]
-        # 
-        done = False
-        while not done:
-            # print self.chain
-            if len(self.chain.vec) == (self.chain.n - 1):
-                if self.chain.is_viable():
-                    if self.chain.nonsym():
-                        # tally the number of contacts
-                        # state = self.chain.contactstate()
-                        E, state = self.chain.energy()
-                        ncontacts = len(state)
-                        if contacts.has_key(ncontacts) == False:
-                            contacts[ncontacts] = 1
-                        else:
-                            contacts[ncontacts] = contacts[ncontacts] + 1
-
-                        # tally the contact state
-                        this_state_repr = repr(state)
-                        if contact_states.has_key(this_state_repr) == False:
-                            contact_states[this_state_repr] = 1
-                        else:
-                            contact_states[this_state_repr] = \
-                                contact_states[this_state_repr] + 1
-
-                        # tally the number of conformations
-                        nconfs = nconfs + 1
-                        # save configuration
-                        traj.snapshot(self.chain)
-
-                    done = self.chain.shift()
-
-                else:
-                    done = self.chain.shift()
+        for chain in self.conformations():
+            # tally the number of contacts
+            E, state = chain.energy()
+            ncontacts = len(state)
+            if contacts.has_key(ncontacts) == False:
+                contacts[ncontacts] = 1
+            else:
+                contacts[ncontacts] = contacts[ncontacts] + 1
 
+            # tally the contact state
+            this_state_repr = repr(state)
+            if contact_states.has_key(this_state_repr) == False:
+                contact_states[this_state_repr] = 1
             else:
-                if self.chain.is_viable():
-                    self.chain.grow()
-                else:
-                    done = self.chain.shift()
+                contact_states[this_state_repr] = \
+                    contact_states[this_state_repr] + 1
 
-            if self.chain.is_first_vec_one():
-                # skip the other symmetries
-                break        
-        #
-        #
-        #################    
+            # tally the number of conformations
+            nconfs = nconfs + 1
+            # save configuration
+            traj.snapshot(chain)
+        nodes = self.nodes
+        traj.finalize()
+
+        self._print_density(contacts, contact_states)
+        result = {'nconfs': nconfs, 'nodes': nodes, 'contacts': contacts,
+                  'contact_states': contact_states}
+        if self.cache is not None:
+            self.cache.put(self.config.HPSTRING, result)
+        return result
 
+    def _print_density(self, contacts, contact_states):
         # print out the density of contact states
         print
         print 'DENSITY of CONTACT STATES:'
@@ -107,5 +145,3 @@ class Enumerator(object):
                 (num_contacts, self.config.eps * num_contacts, num_confs)
         print
         print 'at T = %4.1f K' % self.config.T
-
-        traj.finalize()
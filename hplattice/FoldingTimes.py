@@ -0,0 +1,160 @@
+import random
+from copy import deepcopy
+from multiprocessing import Pool
+from numpy import array, median, sort, int64
+from numpy.random import RandomState
+
+from .NativeDatabase import load_native_contacts
+
+
+class FoldingTimes(object):
+    """
+    *FoldingTimes* objects measure how long an HP chain takes to fold. Many
+    independent, constant temperature monte carlo trajectories are started
+    from the initial conformation of the configuration, and each one runs
+    until its contacts match the native contact list (the first passage
+    time, in monte carlo steps) or until a maximum number of steps.
+    Trajectories are spread over a local pool of processes, and each one
+    seeds the random number generator with ``config.randseed`` plus its
+    index, so the results do not depend on the number of processes.
+
+    :param lattice_factory: factory object that knows how to create replicas
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    :param list native_contacts: optional, native contacts as a list of
+                                 tuples. Read with
+                                 :func:`hplattice.NativeDatabase.load_native_contacts`
+                                 by default.
+    :param int num_processes: optional, number of worker processes.
+                              Trajectories are run in this process when
+                              ``1``.
+    """
+    def __init__(self, lattice_factory, config, native_contacts=None,
+                 num_processes=1):
+        self.lattice_factory = lattice_factory
+        self.config = config
+        if native_contacts is None:
+            native_contacts = load_native_contacts(config)
+        self.native_contacts = native_contacts
+        self.num_processes = num_processes
+
+    def make_jobs(self, num_trajectories, temp=None, max_steps=None):
+        """
+        Build one job per trajectory.
+
+        :param int num_trajectories: the number of trajectories
+        :param float temp: optional, the temperature (K) of every trajectory,
+                           the first of *REPLICATEMPS* by default
+        :param int max_steps: optional, stop trajectories that have not
+                              folded after this many steps, *MCSTEPS* by
+                              default
+        :return: list of ``(lattice_factory, config, native_contacts,
+                 max_steps, seed)`` tuples
+        :rtype: list
+        """
+        if temp is None:
+            temp = self.config.REPLICATEMPS[0]
+        if max_steps is None:
+            max_steps = self.config.MCSTEPS
+        config = deepcopy(self.config)
+        config.update(REPLICATEMPS=[temp], HAMILTONIANS=[])
+        return [(self.lattice_factory, config, self.native_contacts,
+                 max_steps, self.config.randseed + idx)
+                for idx in range(num_trajectories)]
+
+    def run(self, num_trajectories, temp=None, max_steps=None,
+            confidence=0.95):
+        """
+        Run the trajectories and summarize their first passage times.
+
+        :param int num_trajectories: the number of trajectories
+        :param float temp: optional, see :meth:`make_jobs`
+        :param int max_steps: optional, see :meth:`make_jobs`
+        :param float confidence: optional, the confidence level of the
+                                 intervals
+        :return: see :func:`summarize_first_passage`
+        :rtype: dict
+        """
+        jobs = self.make_jobs(num_trajectories, temp, max_steps)
+        if self.num_processes == 1:
+            times = map(run_trajectory, jobs)
+        else:
+            pool = Pool(processes=self.num_processes)
+            try:
+                times = pool.map(run_trajectory, jobs, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        return summarize_first_passage(times, jobs[0][3], confidence,
+                                       self.config.randseed)
+
+
+def run_trajectory(job):
+    """
+    Run a single trajectory built by :meth:`FoldingTimes.make_jobs`. This is
+    a module-level function so that it can be sent to worker processes.
+
+    :param tuple job: ``(lattice_factory, config, native_contacts,
+                      max_steps, seed)``
+    :return: the first step at which the chain is native, or ``-1`` if it
+             did not fold within *max_steps* steps
+    :rtype: int
+    """
+    lattice_factory, config, native_contacts, max_steps, seed = job
+    random.seed(seed)
+    r = lattice_factory.make_replica(lattice_factory, config, 0,
+                                     native_contacts)
+    for step in xrange(max_steps):
+        if r.is_native():
+            return step
+        if r.propose_move():
+            r.metropolis_accept_move()
+    if r.is_native():
+        return max_steps
+    return -1
+
+def summarize_first_passage(times, max_steps, confidence=0.95, seed=0,
+                            num_bootstrap=1000):
+    """
+    Summarize first passage times. Trajectories that did not fold are
+    censored at *max_steps*: they are left out of the mean and median, but
+    are included in the maximum likelihood estimate of the mean for
+    exponentially distributed folding times,
+    :math:`(\\sum_{folded} t + N_{unfolded} t_{max}) / N_{folded}`.
+
+    :param list times: first passage times, ``-1`` for trajectories that did
+                       not fold
+    :param int max_steps: the length of trajectories that did not fold
+    :param float confidence: optional, the confidence level of the interval
+    :param int seed: optional, seed of the bootstrap resampling
+    :param int num_bootstrap: optional, the number of bootstrap samples
+    :return: the first passage times (``'first_passage'``), the fraction of
+             trajectories that folded (``'fraction_folded'``), the mean and
+             median first passage time of folded trajectories (``'mean'``,
+             ``'median'``), a bootstrap confidence interval of the mean
+             (``'ci'``), and the censored maximum likelihood estimate of the
+             mean (``'mle_mean'``). Statistics are ``None`` when no
+             trajectory folded.
+    :rtype: dict
+    """
+    times = array(times, int64)
+    folded = times[times >= 0]
+    results = {'first_passage': times,
+               'fraction_folded': float(len(folded)) / len(times),
+               'mean': None, 'median': None, 'ci': None, 'mle_mean': None}
+    if len(folded) == 0:
+        return results
+    results['mean'] = folded.mean()
+    results['median'] = float(median(folded))
+    # percentile bootstrap of the mean
+    rng = RandomState(seed)
+    samples = rng.randint(0, len(folded), size=(num_bootstrap, len(folded)))
+    means = sort(folded[samples].mean(axis=1))
+    tail = (1.0 - confidence) / 2.0
+    results['ci'] = (means[int(tail * (num_bootstrap - 1))],
+                     means[int(round((1.0 - tail) * (num_bootstrap - 1)))])
+    num_censored = len(times) - len(folded)
+    results['mle_mean'] = \
+        (folded.sum() + num_censored * float(max_steps)) / len(folded)
+    return results
@@ -1,5 +1,16 @@
-from numpy import zeros, nonzero
-from .Replica import attemptswap
+import os
+import random
+import cPickle
+from time import time
+from numpy import zeros, ones, nonzero, array, frombuffer, int32, int64, \
+                  uint8, savez_compressed, load, isnan, nan
+from .Replica import attemptswap, attempt_even_odd_swaps, \
+                     attempt_hamiltonian_swaps
+from .Profiler import PhaseProfiler
+from .Coverage import Coverage
+from .MSM import TransitionCounter, contact_state_mapper, native_count_mapper
+from .NativeDatabase import load_native_contacts
+from .Convergence import ConvergenceMonitor
 
 
 class MCSampler(object):
@@ -8,6 +19,9 @@ class MCSampler(object):
     of an HP chain. The HP chain is defined in a configuration file, specified
     by the *config* parameter. The configuration file also specifies the
     replica exchange parameters, such as the temperature of each replica.
+    When *HAMILTONIANS* is set, replicas are laid out on a grid of
+    Hamiltonians by temperatures, and exchange rounds attempt swaps along
+    both axes of the grid.
 
     :param lattice_factory: factory object that knows how to create replicas and
                             trajectories.
@@ -18,18 +32,30 @@ class MCSampler(object):
         self.lattice_factory = lattice_factory
         self.config = config
         self.native_contacts = self._load_native_contacts()
+        self._check_replica_grid()
         self.replicas = []
         for i in range(0, self.config.NREPLICAS):
             r = lattice_factory.make_replica(lattice_factory, self.config, i,
                                              self.native_contacts)
             self.replicas.append(r)
+        self.profiler = None
+
+    def _check_replica_grid(self):
+        ### one replica per (Hamiltonian, temperature) pair
+        num_temps = len(self.config.REPLICATEMPS)
+        num_hams = self.config.get_num_hamiltonians()
+        if num_hams > 1:
+            if self.config.NREPLICAS != num_temps * num_hams:
+                raise ValueError("NREPLICAS is %d, but there are %d "
+                                 "Hamiltonians and %d temperatures" % \
+                                 (self.config.NREPLICAS, num_hams, num_temps))
+            if self.config.SWAPMETHOD != 'even odd':
+                raise ValueError("Hamiltonian replica exchange requires "
+                                 "SWAPMETHOD 'even odd'")
 
     def _load_native_contacts(self):
-        if self.config.STOPATNATIVE == 1:
-            nativeclistfile = self.config.NATIVEDIR + '/' + self.config.HPSTRING + '.clist'
-            with open(nativeclistfile,'r') as fnative:
-                nativeclist_str = fnative.readline()
-                nativeclist = eval(nativeclist_str)
+        if self.config.STOPATNATIVE == 1 or self.config.MSMSTATES == 'native':
+            nativeclist = load_native_contacts(self.config)
         else:
             nativeclist = None
         return nativeclist
@@ -42,13 +68,77 @@ class MCSampler(object):
         self.viable_swaps = zeros(len(self.replicas))
         # the fraction of swaps that were accepted
         self.swap_acceptance = zeros(len(self.replicas))
+        # swap stats for each pair of temperatures, indexed by the positions
+        # of the temperatures in REPLICATEMPS
+        num_temps = len(self.config.REPLICATEMPS)
+        self.T_swaps = zeros((num_temps, num_temps))
+        self.T_viable_swaps = zeros((num_temps, num_temps))
+        self.T_swap_acceptance = zeros((num_temps, num_temps))
+        # swap stats for each pair of Hamiltonians, indexed by the positions
+        # of the Hamiltonians in HAMILTONIANS
+        num_hams = self.config.get_num_hamiltonians()
+        self.H_swaps = zeros((num_hams, num_hams))
+        self.H_viable_swaps = zeros((num_hams, num_hams))
+        self.H_swap_acceptance = zeros((num_hams, num_hams))
+        # the number of exchange rounds, used to alternate even/odd pairs
+        self.swap_rounds = 0
         # initialize replica-level stats
         for r in self.replicas:
             r.init_mc_stats()
-        # T-based stats
-        self.accepted_steps_at_T = {}
-        for T in self.config.REPLICATEMPS:
-            self.accepted_steps_at_T[T] = 0
+        # T-based stats, indexed by the position of the temperature in
+        # REPLICATEMPS
+        self.accepted_steps_at_T = zeros(num_temps, int64)
+        # histogram of the number of contacts at each temperature, recorded
+        # every ENEEVERY steps for the replicas with the first Hamiltonian
+        # (a chain of n monomers has fewer than n contacts)
+        self.energy_histograms = zeros((len(self.config.REPLICATEMPS),
+                                        len(self.config.HPSTRING) + 1), int64)
+        # replica round trips from the lowest temperature to the highest
+        # temperature and back, and the total number of steps they took
+        self.round_trips = zeros(len(self.replicas), int64)
+        self.round_trip_steps = zeros(len(self.replicas), int64)
+        # the end of the temperature ladder that each replica visited last:
+        # -1 for neither, 0 for the lowest and 1 for the highest temperature
+        self.last_extreme = -ones(len(self.replicas), int32)
+        self.trip_start_step = zeros(len(self.replicas), int64)
+        self._update_round_trips(0)
+        # distinct conformations and contact states visited by each replica
+        if self.config.TRACKCOVERAGE:
+            self.coverage = [Coverage(self.config.COVERAGECAP)
+                             for r in self.replicas]
+            for idx, r in enumerate(self.replicas):
+                self.coverage[idx].record(r.chain)
+        else:
+            self.coverage = None
+        # transition counts between discrete states
+        self.msm = self._make_transition_counter()
+        # stopping rules
+        self.convergence = self._make_convergence_monitor()
+        self.converged = False
+
+    def _make_transition_counter(self):
+        ### count transitions between the states chosen by MSMSTATES
+        if self.config.MSMSTATES is None:
+            return None
+        elif self.config.MSMSTATES == 'contacts':
+            mapper = contact_state_mapper(self.config.HPSTRING)
+        elif self.config.MSMSTATES == 'native':
+            mapper = native_count_mapper(self.native_contacts)
+        else:
+            raise ValueError("Unknown MSMSTATES %s" % self.config.MSMSTATES)
+        return TransitionCounter(len(self.replicas),
+                                 len(self.config.REPLICATEMPS),
+                                 self.config.MSMLAG, mapper)
+
+    def _make_convergence_monitor(self):
+        ### apply the stopping rules that are turned on
+        if not (self.config.STOPROUNDTRIPS or self.config.STOPHISTTOL or
+                self.config.STOPESS):
+            return None
+        return ConvergenceMonitor(len(self.config.REPLICATEMPS),
+                                  self.config.STOPROUNDTRIPS,
+                                  self.config.STOPHISTTOL,
+                                  self.config.STOPESS)
 
     def _update_swap_stats(self, i, j, swap_sucess):
         ### increment swap stats for replica i and replica j
@@ -57,12 +147,84 @@ class MCSampler(object):
         if swap_sucess:
             self.viable_swaps[i] += 1
             self.viable_swaps[j] += 1
+        ### increment swap stats for the pair of temperatures
+        ti = self.replicas[i].mc.tempfromrep
+        tj = self.replicas[j].mc.tempfromrep
+        self.T_swaps[ti, tj] += 1
+        self.T_swaps[tj, ti] += 1
+        if swap_sucess:
+            self.T_viable_swaps[ti, tj] += 1
+            self.T_viable_swaps[tj, ti] += 1
+
+    def _update_hamiltonian_swap_stats(self, i, j, swap_success):
+        ### increment swap stats for the pair of Hamiltonians; after a
+        ### successful swap, replica i holds the Hamiltonian of replica j
+        hi = self.replicas[i].mc.hamfromrep
+        hj = self.replicas[j].mc.hamfromrep
+        self.H_swaps[hi, hj] += 1
+        self.H_swaps[hj, hi] += 1
+        if swap_success:
+            self.H_viable_swaps[hi, hj] += 1
+            self.H_viable_swaps[hj, hi] += 1
+
+    def _update_round_trips(self, prodstep):
+        ### count replicas that made it back to the lowest temperature
+        ### after visiting the highest temperature
+        top = len(self.config.REPLICATEMPS) - 1
+        for idx, r in enumerate(self.replicas):
+            t = r.mc.tempfromrep
+            if t == 0 and self.last_extreme[idx] != 0:
+                if self.last_extreme[idx] == 1:
+                    self.round_trips[idx] += 1
+                    self.round_trip_steps[idx] += \
+                        prodstep - self.trip_start_step[idx]
+                self.trip_start_step[idx] = prodstep
+                self.last_extreme[idx] = 0
+            elif t == top and self.last_extreme[idx] == 0:
+                self.last_extreme[idx] = 1
+
+    def _attempt_swaps(self):
+        ### attempt one round of replica swaps
+        if len(self.replicas) < 2:
+            # nothing to swap with
+            return
+        H_swap_results = []
+        if self.config.SWAPMETHOD == 'even odd':
+            parity = self.swap_rounds % 2
+            swap_results = attempt_even_odd_swaps(self.replicas, parity)
+            if self.config.get_num_hamiltonians() > 1:
+                H_swap_results = \
+                    attempt_hamiltonian_swaps(self.replicas, parity)
+        else:
+            swap_results = \
+                [attemptswap(self.config.SWAPMETHOD, self.replicas)]
+        self.swap_rounds += 1
+        for this_result in swap_results:
+            self._update_swap_stats(*this_result)
+        for this_result in H_swap_results:
+            self._update_hamiltonian_swap_stats(*this_result)
 
     def _compute_swap_acceptance(self):
         ### compute the fraction of swaps that have been viable
         inds = nonzero(self.swaps)
         self.swap_acceptance[inds] = \
             (1.*self.viable_swaps[inds]) / self.swaps[inds]
+        inds = nonzero(self.T_swaps)
+        self.T_swap_acceptance[inds] = \
+            (1.*self.T_viable_swaps[inds]) / self.T_swaps[inds]
+        inds = nonzero(self.H_swaps)
+        self.H_swap_acceptance[inds] = \
+            (1.*self.H_viable_swaps[inds]) / self.H_swaps[inds]
+
+    def _record_energies(self, prodstep, energy_log):
+        ### update the energy histograms and the energy log
+        for idx, rep in enumerate(self.replicas):
+            E, state = rep.chain.energy(rep.mc.epsilon)
+            if rep.mc.hamfromrep == 0:
+                self.energy_histograms[rep.mc.tempfromrep, len(state)] += 1
+                if self.convergence is not None:
+                    self.convergence.record(rep.mc.tempfromrep, len(state))
+            energy_log.record(prodstep, idx, rep, E, state)
 
     def _output_stats(self, prodstep):
         ### Output the status of the simulation
@@ -76,16 +238,177 @@ class MCSampler(object):
                  '%1.3f' % rep.acceptance, self.swaps[idx],
                  self.viable_swaps[idx], '%1.3f' % self.swap_acceptance[idx],
                  rep.mc.tempfromrep, rep.mc.temp)
+        print '%-12s %-12s %-12s %-12s' % \
+              ('T pair', 'viableswaps', 'swaps', 'SWAPaccept')
+        for k in range(len(self.accepted_steps_at_T) - 1):
+            print '%-12s %-12d %-12d %-12s' % \
+                ('%d-%d' % (k, k + 1), self.T_viable_swaps[k, k + 1],
+                 self.T_swaps[k, k + 1],
+                 '%1.3f' % self.T_swap_acceptance[k, k + 1])
+        if len(self.H_swaps) > 1:
+            print '%-12s %-12s %-12s %-12s' % \
+                  ('H pair', 'viableswaps', 'swaps', 'SWAPaccept')
+            for k in range(len(self.H_swaps) - 1):
+                print '%-12s %-12d %-12d %-12s' % \
+                    ('%d-%d' % (k, k + 1), self.H_viable_swaps[k, k + 1],
+                     self.H_swaps[k, k + 1],
+                     '%1.3f' % self.H_swap_acceptance[k, k + 1])
         if self.config.STOPATNATIVE == 1:
             print 'NATIVE CLIST:', self.native_contacts
         print '%-8s %-12s %-12s' % \
             ('replica', 'foundnative', 'contact state') 
         for rep in self.replicas:
+            E, state = rep.chain.energy()
             print '%-8d %-12d %s %s' % \
-                (rep.repnum, rep.is_native(), rep.contactstate(), rep.get_vec())
-        print self.accepted_steps_at_T
+                (rep.repnum, rep.nativeclist == state, state, rep.get_vec())
+        print '%-12s %-12s' % ('T', 'MCaccepted')
+        for k, T in enumerate(self.config.REPLICATEMPS):
+            print '%-12.1f %-12d' % (T, self.accepted_steps_at_T[k])
+        print 'replica round trips:', self.round_trips.sum()
+        if self.convergence is not None:
+            print 'converged:', self.converged
+        if self.coverage is not None:
+            print '%-12s %-16s %-16s' % \
+                ('replica', 'conformations', 'contact states')
+            for idx, cov in enumerate(self.coverage):
+                nconfs, nstates = cov.get_counts()
+                print '%-12d %-16d %-16d' % (idx, nconfs, nstates)
+
+    def save_checkpoint(self, filename, next_step, trajectories,
+                        energy_log=None):
+        """
+        Save the complete state of the sampler to a compressed ``.npz`` file:
+        the chain vectors, temperatures and energies of the replicas, every
+        counter, the visited sets of *TRACKCOVERAGE*, the state of the random
+        number generator and the positions of the trajectory and energy
+        files. The file is written to a temporary path and
+        renamed, so an interruption never leaves a partial checkpoint.
+
+        :param str filename: save checkpoint to this path
+        :param int next_step: the first production step to run on restart
+        :param list trajectories: :class:`hplattice.Trajectory.Trajectory`
+                                  objects, one per replica
+        :param energy_log: optional, the energy log of the simulation
+        :type energy_log: :class:`hplattice.EnergyLog.EnergyLog`
+        """
+        rng_version, rng_internal, rng_gauss = random.getstate()
+        traj_positions = [t.get_position() for t in trajectories]
+        if energy_log is None:
+            energy_log_position = 0
+        else:
+            energy_log_position = energy_log.get_position()
+        state = {
+            'hpstring': array(self.config.HPSTRING),
+            'next_step': array(next_step),
+            'found_native': array(self.found_native),
+            'vec': array([r.chain.vec.as_npy_array() for r in self.replicas]),
+            'nextvec': array([r.chain.nextvec.as_npy_array()
+                              for r in self.replicas]),
+            'temp': array([r.mc.temp for r in self.replicas]),
+            'tempfromrep': array([r.mc.tempfromrep for r in self.replicas]),
+            'hamfromrep': array([r.mc.hamfromrep for r in self.replicas]),
+            'lastenergy': array([r.mc.lastenergy for r in self.replicas]),
+            'steps': array([r.steps for r in self.replicas]),
+            'viablesteps': array([r.viablesteps for r in self.replicas]),
+            'acceptedsteps': array([r.acceptedsteps for r in self.replicas]),
+            'swaps': self.swaps,
+            'viable_swaps': self.viable_swaps,
+            'T_swaps': self.T_swaps,
+            'T_viable_swaps': self.T_viable_swaps,
+            'H_swaps': self.H_swaps,
+            'H_viable_swaps': self.H_viable_swaps,
+            'swap_rounds': array(self.swap_rounds),
+            'energy_histograms': self.energy_histograms,
+            'accepted_steps_at_T': self.accepted_steps_at_T,
+            'round_trips': self.round_trips,
+            'round_trip_steps': self.round_trip_steps,
+            'last_extreme': self.last_extreme,
+            'trip_start_step': self.trip_start_step,
+            'rng_version': array(rng_version),
+            'rng_internal': array(rng_internal, int64),
+            'rng_gauss': array(nan if rng_gauss is None else rng_gauss),
+            'traj_positions': array(traj_positions, int64).reshape(-1, 2),
+            'energy_log_position': array(energy_log_position, int64)}
+        if self.coverage is not None:
+            # the visited sets hold arbitrary keys, so pickle them into bytes
+            coverage = [cov.get_state() for cov in self.coverage]
+            state['coverage'] = frombuffer(
+                cPickle.dumps(coverage, cPickle.HIGHEST_PROTOCOL), uint8)
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            savez_compressed(f, **state)
+        os.rename(tmp_filename, filename)
+
+    def load_checkpoint(self, filename):
+        """
+        Restore the state of the sampler from a file written by
+        :meth:`save_checkpoint`.
+
+        :param str filename: path to checkpoint file
+        :return: the first production step to run, the
+                 ``(frame_num, byte_offset)`` of each replica's trajectory,
+                 and the size of the energy log.
+        :rtype: (int, list, int)
+        """
+        with open(filename, 'rb') as f:
+            npz = load(f)
+            state = dict((k, npz[k]) for k in npz.files)
+        if str(state['hpstring']) != self.config.HPSTRING:
+            raise ValueError("Checkpoint %s is for sequence %s, not %s" % \
+                (filename, state['hpstring'], self.config.HPSTRING))
+        if len(state['temp']) != len(self.replicas):
+            raise ValueError("Checkpoint %s has %d replicas, not %d" % \
+                (filename, len(state['temp']), len(self.replicas)))
+
+        for idx, r in enumerate(self.replicas):
+            r.chain.vec.set(array(state['vec'][idx], int32))
+            r.chain.vec2coords()
+            r.chain.nextvec.set(array(state['nextvec'][idx], int32))
+            r.chain.nextcoords.vec2coords(r.chain.nextvec)
+            r.mc.temp = float(state['temp'][idx])
+            r.mc.tempfromrep = int(state['tempfromrep'][idx])
+            if 'hamfromrep' in state:
+                r.mc.set_hamiltonian(self.config,
+                                     int(state['hamfromrep'][idx]))
+            r.mc.lastenergy = float(state['lastenergy'][idx])
+            r.steps = int(state['steps'][idx])
+            r.viablesteps = int(state['viablesteps'][idx])
+            r.acceptedsteps = int(state['acceptedsteps'][idx])
+        self.swaps[:] = state['swaps']
+        self.viable_swaps[:] = state['viable_swaps']
+        self.T_swaps[:, :] = state['T_swaps']
+        self.T_viable_swaps[:, :] = state['T_viable_swaps']
+        if 'H_swaps' in state:
+            self.H_swaps[:, :] = state['H_swaps']
+            self.H_viable_swaps[:, :] = state['H_viable_swaps']
+        self.swap_rounds = int(state['swap_rounds'])
+        self.energy_histograms[:, :] = state['energy_histograms']
+        self.accepted_steps_at_T[:] = state['accepted_steps_at_T']
+        self.round_trips[:] = state['round_trips']
+        self.round_trip_steps[:] = state['round_trip_steps']
+        self.last_extreme[:] = state['last_extreme']
+        self.trip_start_step[:] = state['trip_start_step']
+        self.found_native = bool(state['found_native'])
+        if self.coverage is not None and 'coverage' in state:
+            coverage = cPickle.loads(state['coverage'].tostring())
+            for cov, cov_state in zip(self.coverage, coverage):
+                cov.set_state(cov_state)
 
-    def do_mc_sampling(self, save_trajectory=False, trajectory_filename='traj.xyz'):
+        rng_gauss = float(state['rng_gauss'])
+        if isnan(rng_gauss):
+            rng_gauss = None
+        random.setstate((int(state['rng_version']),
+                         tuple([int(x) for x in state['rng_internal']]),
+                         rng_gauss))
+        traj_positions = [(int(frame_num), int(byte_offset))
+                          for frame_num, byte_offset in state['traj_positions']]
+        return int(state['next_step']), traj_positions, \
+               int(state['energy_log_position'])
+
+    def do_mc_sampling(self, save_trajectory=False, trajectory_filename='traj.xyz',
+                       checkpoint_filename=None, restart=False,
+                       energy_filename=None, metrics_filename=None,
+                       metrics_format='jsonl', msm_filename=None):
         """
         Run replica exchange monte carlo of the HP chain.
 
@@ -94,52 +417,240 @@ class MCSampler(object):
                                      trajectory for each replica.
         :param str trajectory_filename: optional, save trajectory to this path.
                                         Replica numbers will be prepended to the
-                                        name specified here.
+                                        name specified here. Frames are saved
+                                        every *TRJEVERY* steps.
+        :param str checkpoint_filename: optional, save the state of the
+                                        simulation to this path every
+                                        *CHECKPOINTEVERY* steps and at the end
+                                        of the run.
+        :param bool restart: optional, ``True`` to continue from the state
+                             saved in *checkpoint_filename*. The trajectories
+                             are reopened in append mode and rewound to the
+                             checkpoint, so the output is identical to that
+                             of an uninterrupted run.
+        :param str energy_filename: optional, record the energy and other
+                                    observables of every replica to this
+                                    path every *ENEEVERY* steps. See
+                                    :class:`hplattice.EnergyLog.EnergyLog`.
+        :param str metrics_filename: optional, export the metrics returned by
+                                     :meth:`get_metrics` to this path every
+                                     *PRINTEVERY* steps.
+        :param str metrics_format: optional, ``'jsonl'`` to append one JSON
+                                   object per export, or ``'prometheus'`` to
+                                   rewrite the file in the Prometheus text
+                                   format. See
+                                   :class:`hplattice.Metrics.MetricsExporter`.
+        :param str msm_filename: optional, save the transition counts
+                                 collected when *MSMSTATES* is set to this
+                                 path at the end of the run. See
+                                 :meth:`hplattice.MSM.TransitionCounter.save`.
+                                 Counts are not saved in checkpoints, so a
+                                 restarted run counts transitions from the
+                                 restart on.
+
+        The run ends early at the step the native state is found, if
+        *STOPATNATIVE* is set, or at the first *PRINTEVERY* step at which the
+        stopping rules set by *STOPROUNDTRIPS*, *STOPHISTTOL* and *STOPESS*
+        are met. See :class:`hplattice.Convergence.ConvergenceMonitor`.
         """
-        traj_dict = {}
+        self._init_mc_stats()
+        self.found_native = False
+        start_step = 0
+        if restart:
+            start_step, traj_positions, energy_log_position = \
+                self.load_checkpoint(checkpoint_filename)
+
+        trajectories = []
         for i, r in enumerate(self.replicas):
             traj = self.lattice_factory.make_trajectory(save_trajectory,
-                    '%03d_%s' % (i, trajectory_filename))
-            traj_dict[r] = traj
+                    '%03d_%s' % (i, trajectory_filename), append=restart)
+            if restart:
+                traj.set_position(*traj_positions[i])
+            trajectories.append(traj)
+        energy_log = self.lattice_factory.make_energy_log(
+            energy_filename is not None, energy_filename, append=restart)
+        if restart:
+            energy_log.set_position(energy_log_position)
+        metrics_exporter = self.lattice_factory.make_metrics_exporter(
+            metrics_filename is not None, metrics_filename, metrics_format)
+        self.start_step = start_step
+        self.start_time = time()
+        if self.config.PROFILE:
+            self.profiler = PhaseProfiler()
+            self.profiler.instrument(self, trajectories, energy_log)
 
-        self._init_mc_stats()
-        found_native = False
+        found_native = self.found_native
+        checkpoint_every = self.config.CHECKPOINTEVERY
+        prodstep = start_step - 1
         
-        for prodstep in xrange(self.config.MCSTEPS):
-            # Run the replicas for a production cycle...
-            for r in self.replicas:
-                move_is_viable = r.propose_move()
-                if move_is_viable:
-                    move_is_accepted = r.metropolis_accept_move()
-                    if move_is_accepted:
-                        self.accepted_steps_at_T[r.get_T()] += 1
-                else:
-                    move_is_accepted = False
-                r.record_stats(move_is_viable, move_is_accepted)
-                if self.config.STOPATNATIVE == 1 and r.is_native():
-                    found_native = True
-
-            if self.config.STOPATNATIVE == 1 and found_native:
-                break
-
-            # After the production cycle,      
-            if (prodstep % self.config.SWAPEVERY) == 0:
-                ### ...after every production run, attempt a SWAP
-                swap_results = \
-                    attemptswap(self.config.SWAPMETHOD, self.replicas)
-                self._update_swap_stats(*swap_results)
-
-            # Print status
-            if (prodstep % self.config.PRINTEVERY) == 0:
-                # calc MC move acceptance
-                for r in self.replicas:
-                    r.compute_mc_acceptance()       
-                # calc replica swap acceptance
-                self._compute_swap_acceptance()
-                # self._output_stats(prodstep)
-                for rep, traj in traj_dict.iteritems():
-                    traj.snapshot(rep.chain)
+        coverage = self.coverage
+        msm = self.msm
+        convergence = self.convergence
+
+        try:
+            for prodstep in xrange(start_step, self.config.MCSTEPS):
+                # Run the replicas for a production cycle...
+                for idx, r in enumerate(self.replicas):
+                    move_is_viable = r.propose_move()
+                    if move_is_viable:
+                        move_is_accepted = r.metropolis_accept_move()
+                        if move_is_accepted:
+                            self.accepted_steps_at_T[r.mc.tempfromrep] += 1
+                            if coverage is not None:
+                                coverage[idx].record(r.chain)
+                    else:
+                        move_is_accepted = False
+                    r.record_stats(move_is_viable, move_is_accepted)
+                    if self.config.STOPATNATIVE == 1 and r.is_native():
+                        found_native = True
+
+                if self.config.STOPATNATIVE == 1 and found_native:
+                    break
+
+                # After the production cycle,      
+                if (prodstep % self.config.SWAPEVERY) == 0:
+                    ### ...after every production run, attempt a SWAP
+                    self._attempt_swaps()
+                    self._update_round_trips(prodstep)
+
+                if msm is not None:
+                    msm.record(prodstep, self.replicas)
+
+                # Print status
+                if (prodstep % self.config.PRINTEVERY) == 0:
+                    # calc MC move acceptance
+                    for r in self.replicas:
+                        r.compute_mc_acceptance()       
+                    # calc replica swap acceptance
+                    self._compute_swap_acceptance()
+                    # apply the stopping rules
+                    if convergence is not None:
+                        self.converged = convergence.check(
+                            self.round_trips.sum(), self.energy_histograms)
+                    # self._output_stats(prodstep)
+                    metrics_exporter.export(self.get_metrics(prodstep))
+                    if self.converged:
+                        break
+
+                # Save trajectory frames
+                if (prodstep % self.config.TRJEVERY) == 0:
+                    for rep, traj in zip(self.replicas, trajectories):
+                        traj.snapshot(rep.chain)
+
+                # Record energies
+                if (prodstep % self.config.ENEEVERY) == 0:
+                    self._record_energies(prodstep, energy_log)
 
+                # Save checkpoint
+                if checkpoint_filename and checkpoint_every > 0 and \
+                   ((prodstep + 1) % checkpoint_every) == 0:
+                    self.save_checkpoint(checkpoint_filename, prodstep + 1,
+                                         trajectories, energy_log)
+        finally:
+            # put the original methods back even if sampling was
+            # interrupted
+            if self.profiler is not None:
+                self.profiler.restore(prodstep + 1 - start_step)
+
+        self.last_step = prodstep
+        self.found_native = found_native
+        if checkpoint_filename:
+            self.save_checkpoint(checkpoint_filename, prodstep + 1,
+                                 trajectories, energy_log)
+        if msm is not None and msm_filename:
+            msm.save(msm_filename)
         self._output_stats(prodstep)
-        for traj in traj_dict.itervalues():
+        if self.profiler is not None:
+            print self.profiler.report()
+        for traj in trajectories:
             traj.finalize()
+        energy_log.finalize()
+        metrics_exporter.finalize()
+
+    def get_metrics(self, prodstep):
+        """
+        Collect the counters of the simulation. The acceptance ratios are
+        those computed at the most recent *PRINTEVERY* step.
+
+        :param int prodstep: the current production step
+        :return: ``'step'``, ``'hpstring'``, ``'steps_per_second'`` (since
+                 the start of this call to :meth:`do_mc_sampling`), and
+                 arrays: per replica ``'steps'``, ``'viable_steps'``,
+                 ``'accepted_steps'``, ``'move_viability'``,
+                 ``'move_acceptance'``, ``'temp_index'``, ``'ham_index'``,
+                 ``'round_trips'`` and ``'mean_round_trip_steps'``, and also
+                 ``'distinct_conformations'`` and
+                 ``'distinct_contact_states'`` if *TRACKCOVERAGE* is set;
+                 per temperature ``'temps'`` and ``'accepted_steps_at_T'``,
+                 and also ``'histogram_change'`` and ``'energy_ess'`` from
+                 the most recent check of the stopping rules, and
+                 ``'converged'``, if any stopping rule is on;
+                 per pair of temperatures ``'swap_attempts'``,
+                 ``'swaps_accepted'`` and ``'swap_acceptance'``; and per
+                 pair of Hamiltonians ``'ham_swap_attempts'``,
+                 ``'ham_swaps_accepted'`` and ``'ham_swap_acceptance'``.
+        :rtype: dict
+        """
+        elapsed = time() - self.start_time
+        if elapsed > 0:
+            steps_per_second = (prodstep + 1 - self.start_step) / elapsed
+        else:
+            steps_per_second = 0.0
+        mean_round_trip_steps = zeros(len(self.replicas))
+        inds = nonzero(self.round_trips)
+        mean_round_trip_steps[inds] = \
+            (1.*self.round_trip_steps[inds]) / self.round_trips[inds]
+        reps = self.replicas
+        metrics = {'step': prodstep,
+                   'hpstring': self.config.HPSTRING,
+                   'steps_per_second': steps_per_second,
+                   'steps': array([r.steps for r in reps]),
+                   'viable_steps': array([r.viablesteps for r in reps]),
+                   'accepted_steps': array([r.acceptedsteps for r in reps]),
+                   'move_viability': array([r.move_viability for r in reps]),
+                   'move_acceptance': array([r.acceptance for r in reps]),
+                   'temp_index': array([r.mc.tempfromrep for r in reps]),
+                   'ham_index': array([r.mc.hamfromrep for r in reps]),
+                   'round_trips': self.round_trips,
+                   'mean_round_trip_steps': mean_round_trip_steps,
+                   'temps': array(self.config.REPLICATEMPS),
+                   'accepted_steps_at_T': self.accepted_steps_at_T,
+                   'swap_attempts': self.T_swaps,
+                   'swaps_accepted': self.T_viable_swaps,
+                   'swap_acceptance': self.T_swap_acceptance,
+                   'ham_swap_attempts': self.H_swaps,
+                   'ham_swaps_accepted': self.H_viable_swaps,
+                   'ham_swap_acceptance': self.H_swap_acceptance}
+        if self.coverage is not None:
+            counts = array([cov.get_counts() for cov in self.coverage])
+            metrics['distinct_conformations'] = counts[:,0]
+            metrics['distinct_contact_states'] = counts[:,1]
+        if self.convergence is not None:
+            metrics['histogram_change'] = self.convergence.histogram_change
+            metrics['energy_ess'] = self.convergence.ess
+            metrics['converged'] = int(self.converged)
+        return metrics
+
+    def get_results(self):
+        """
+        Summarize the most recent call to :meth:`do_mc_sampling`.
+
+        :return: the last production step (``'steps'``), whether the native
+                 state was found (``'found_native'``), the mean monte carlo
+                 and swap acceptance over all replicas (``'mc_acceptance'``,
+                 ``'swap_acceptance'``), and the lowest final energy of any
+                 replica (``'min_energy'``), and whether the stopping rules
+                 were met (``'converged'``).
+        :rtype: dict
+        """
+        for r in self.replicas:
+            r.compute_mc_acceptance()
+        self._compute_swap_acceptance()
+        num_replicas = len(self.replicas)
+        mc_acceptance = sum([r.acceptance for r in self.replicas])
+        return {'steps': self.last_step,
+                'found_native': self.found_native,
+                'mc_acceptance': mc_acceptance / num_replicas,
+                'swap_acceptance': self.swap_acceptance.mean(),
+                'min_energy': min([r.energy() for r in self.replicas]),
+                'converged': self.converged}
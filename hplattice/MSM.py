@@ -0,0 +1,158 @@
+from collections import deque
+from numpy import array, savez_compressed, int32, int64
+
+from .Scoring import contact_pairs
+
+
+def contact_state_mapper(hpstring):
+    """
+    Map conformations to their contact state, as a bitmask with bit ``k``
+    set when contact ``k`` of :func:`hplattice.Scoring.contact_pairs` is
+    formed.
+
+    :param str hpstring: the sequence, example ``PHPPHP``
+    :return: function of a :class:`hplattice.Chain.Chain` that returns an
+             int
+    :rtype: callable
+    """
+    bits = dict((tuple(pair), 1 << k)
+                for k, pair in enumerate(contact_pairs(hpstring).tolist()))
+    def mapper(chain):
+        E, state = chain.energy()
+        return sum([bits[contact] for contact in state])
+    return mapper
+
+def native_count_mapper(native_contacts):
+    """
+    Map conformations to the number of native contacts they form.
+
+    :param list native_contacts: native contacts as a list of tuples,
+                                 example ``[(0, 4), (1, 6)]``
+    :return: function of a :class:`hplattice.Chain.Chain` that returns an
+             int
+    :rtype: callable
+    """
+    native = set(native_contacts)
+    def mapper(chain):
+        E, state = chain.energy()
+        return len(native.intersection(state))
+    return mapper
+
+
+class TransitionCounter(object):
+    """
+    *TransitionCounter* objects build the transition count matrix of a
+    Markov state model while a replica exchange simulation runs, without
+    storing trajectories. The conformation of every replica is mapped to a
+    discrete state at every step; states are numbered in the order they are
+    first seen. A transition from the state of a replica *lag* steps ago to
+    its current state is counted at the temperature of the replica, provided
+    that the replica stayed at that temperature and Hamiltonian for the whole
+    lag. Like the energy histograms of
+    :class:`hplattice.MCSampler.MCSampler`, only replicas with the first
+    Hamiltonian are counted. Counts are kept sparse, one dictionary of
+    ``{(i, j): count}`` per temperature.
+
+    :param int num_replicas: the number of replicas
+    :param int num_temps: the number of temperatures
+    :param int lag: the lag time, in monte carlo steps
+    :param callable mapper: function that maps a
+                            :class:`hplattice.Chain.Chain` to a hashable
+                            state key, for example from
+                            :func:`contact_state_mapper` or
+                            :func:`native_count_mapper`
+    """
+    def __init__(self, num_replicas, num_temps, lag, mapper):
+        self.lag = lag
+        self.mapper = mapper
+        # {state key: state index}
+        self.state_index = {}
+        # state keys in index order
+        self.state_keys = []
+        # {(i, j): count} for each temperature
+        self.counts = [{} for k in range(num_temps)]
+        # the states of each replica over the last lag steps
+        self.history = [deque(maxlen=lag + 1) for k in range(num_replicas)]
+        # the (Hamiltonian, temperature) of each replica, and the step it
+        # arrived there
+        self.last_grid_point = [None] * num_replicas
+        self.segment_start = [0] * num_replicas
+
+    def _get_state(self, chain):
+        ### the index of the state of a chain, new states are appended
+        key = self.mapper(chain)
+        idx = self.state_index.get(key)
+        if idx is None:
+            idx = len(self.state_keys)
+            self.state_index[key] = idx
+            self.state_keys.append(key)
+        return idx
+
+    def record(self, step, replicas):
+        """
+        Record the current state of every replica. Call this once per monte
+        carlo step, after replica swaps.
+
+        :param int step: monte carlo step
+        :param list replicas: list of :class:`hplattice.Replica.Replica`
+                              objects
+        """
+        for idx, r in enumerate(replicas):
+            s = self._get_state(r.chain)
+            t = r.mc.tempfromrep
+            grid_point = (r.mc.hamfromrep, t)
+            if grid_point != self.last_grid_point[idx]:
+                self.last_grid_point[idx] = grid_point
+                self.segment_start[idx] = step
+            history = self.history[idx]
+            history.append(s)
+            if r.mc.hamfromrep == 0 and len(history) > self.lag and \
+               step - self.lag >= self.segment_start[idx]:
+                pair = (history[0], s)
+                counts = self.counts[t]
+                counts[pair] = counts.get(pair, 0) + 1
+
+    def get_counts(self, temp_index):
+        """
+        :param int temp_index: the position of a temperature in
+                               *REPLICATEMPS*
+        :return: the nonzero transition counts at the temperature in
+                 coordinate form, ``(rows, cols, counts)``, ready for
+                 ``scipy.sparse.coo_matrix((counts, (rows, cols)))``
+        :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`,
+                :class:`numpy.ndarray`)
+        """
+        items = sorted(self.counts[temp_index].iteritems())
+        rows = array([i for (i, j), c in items], int32)
+        cols = array([j for (i, j), c in items], int32)
+        counts = array([c for (i, j), c in items], int64)
+        return rows, cols, counts
+
+    def save(self, filename):
+        """
+        Save the transition counts to a compressed ``.npz`` file, with
+        arrays ``rows``, ``cols``, ``counts`` and ``temp_index`` (one entry
+        per nonzero count), ``lag``, ``num_states`` and, when the state keys
+        are integers, ``state_keys``.
+
+        :param str filename: save counts to this path
+        """
+        rows, cols, counts, temp_index = [], [], [], []
+        for t in range(len(self.counts)):
+            r, c, n = self.get_counts(t)
+            rows.extend(r)
+            cols.extend(c)
+            counts.extend(n)
+            temp_index.extend([t] * len(n))
+        state = {'rows': array(rows, int32),
+                 'cols': array(cols, int32),
+                 'counts': array(counts, int64),
+                 'temp_index': array(temp_index, int32),
+                 'lag': array(self.lag),
+                 'num_states': array(len(self.state_keys))}
+        if all([isinstance(key, (int, long)) for key in self.state_keys]):
+            # contact bitmasks can be longer than 64 bits, so keep them as
+            # decimal strings
+            state['state_keys'] = array([str(key) for key in self.state_keys])
+        with open(filename, 'wb') as f:
+            savez_compressed(f, **state)
@@ -0,0 +1,202 @@
+from copy import deepcopy
+from math import exp
+from numpy import array, zeros, ones, sqrt, log, abs, argsort, ones_like, \
+                  int32, float64
+from numpy.linalg import eigvalsh
+from scipy.sparse import coo_matrix, identity, diags
+from scipy.sparse.linalg import spsolve, eigsh
+from scipy.sparse.csgraph import connected_components
+
+from .Enumerator import Enumerator
+from .Coverage import conformation_key
+from .Monty import enumerate_moves
+
+
+class MasterEquation(object):
+    """
+    *MasterEquation* objects describe the monte carlo dynamics of a short HP
+    chain exactly, as a Markov chain over all of its conformations. Every
+    conformation found by :meth:`hplattice.Enumerator.Enumerator.conformations`
+    is a state, and states are numbered in enumeration order. Each state
+    stands for the conformations related to it by rotations and
+    reflections, which the movesets treat alike. The transition matrix holds
+    the probability of each monte carlo step of the moveset of the
+    configuration: every move that :class:`hplattice.Monty.Monty` can
+    propose is applied to every state, and accepted with the Metropolis
+    criterion. Rejected and non-viable moves leave the chain where it is.
+    The moveset must connect every state to every other state, as some
+    movesets do not for some sequences, or there is no unique equilibrium.
+
+    :param lattice_factory: factory object that knows how to create
+                            replicas, chains and trajectories
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    :param float temp: optional, the temperature (K), the first of
+                       *REPLICATEMPS* by default
+    :raises ValueError: if the moveset does not connect all the states
+    """
+    def __init__(self, lattice_factory, config, temp=None):
+        if temp is None:
+            temp = config.REPLICATEMPS[0]
+        self.config = deepcopy(config)
+        n = len(config.HPSTRING)
+        self.config.update(REPLICATEMPS=[temp], HAMILTONIANS=[],
+                           INITIALVEC=[0] * (n - 1))
+        self.temp = temp
+        self.replica = lattice_factory.make_replica(lattice_factory,
+                                                    self.config, 0)
+        self._enumerate_states(lattice_factory)
+        self.transition_matrix = self._build_transition_matrix()
+
+    def _enumerate_states(self, lattice_factory):
+        ### list the states in enumeration order
+        enumerator = Enumerator(lattice_factory, self.config)
+        vecs = []
+        energies = []
+        contact_states = []
+        mc = self.replica.mc
+        for chain in enumerator.conformations():
+            vecs.append(chain.vec.as_npy_array().copy())
+            energies.append(mc.potential(chain))
+            contact_states.append(chain.contactstate())
+        # chain vectors of each state, shape (states, vectors)
+        self.vecs = array(vecs, int32)
+        # energy of each state
+        self.energies = array(energies, float64)
+        # contacts of each state, as returned by Chain.contactstate
+        self.contact_states = contact_states
+        # {conformation_key: state index}
+        self.index = dict((conformation_key(v), i)
+                          for i, v in enumerate(self.vecs))
+
+    def _build_transition_matrix(self):
+        ### apply every proposal to every state
+        chain = self.replica.chain
+        move = self.replica.mc_move_fcn
+        kT = self.replica.kT()
+        proposals = enumerate_moves(self.config.MOVESET, self.vecs.shape[1])
+        rows = []
+        cols = []
+        probs = []
+        for i in range(len(self.vecs)):
+            chain.vec.set(self.vecs[i].copy())
+            chain.vec2coords()
+            chain.nextvec.set(self.vecs[i].copy())
+            chain.nextcoords.vec2coords(chain.nextvec)
+            chain.reset_proposal()
+            stay = 1.0
+            for prob, kwargs in proposals:
+                move(chain, **kwargs)
+                if chain.nextviable():
+                    j = self.index[conformation_key(chain.nextvec.vec)]
+                    if j != i:
+                        dE = self.energies[j] - self.energies[i]
+                        p = prob * min(1.0, exp(-dE / kT))
+                        rows.append(i)
+                        cols.append(j)
+                        probs.append(p)
+                        stay -= p
+                chain.reset_proposal()
+            rows.append(i)
+            cols.append(i)
+            probs.append(stay)
+        num_states = len(self.vecs)
+        # duplicate entries are summed
+        P = coo_matrix((probs, (rows, cols)),
+                       shape=(num_states, num_states)).tocsr()
+        num_components, labels = connected_components(P, directed=True,
+                                                      connection='strong')
+        if num_components > 1:
+            raise ValueError("Moveset %s splits the %d states of %s into %d "
+                             "sets that cannot reach each other" % \
+                             (self.config.MOVESET.strip(), num_states,
+                              self.config.HPSTRING, num_components))
+        return P
+
+    def find_states(self, contact_state):
+        """
+        :param list contact_state: contacts as a list of tuples, example
+                                   ``[(0, 4), (1, 6)]``
+        :return: the indices of the states with these contacts
+        :rtype: list
+        """
+        return [i for i, state in enumerate(self.contact_states)
+                if state == contact_state]
+
+    def equilibrium_populations(self):
+        """
+        Solve for the stationary distribution of the transition matrix,
+        :math:`\\pi P = \\pi` with :math:`\\sum \\pi = 1`.
+
+        :return: the equilibrium population of each state
+        :rtype: :class:`numpy.ndarray`
+        """
+        num_states = self.transition_matrix.shape[0]
+        A = (self.transition_matrix.T - identity(num_states)).tolil()
+        # replace one equation with the normalization
+        A[0, :] = ones(num_states)
+        b = zeros(num_states)
+        b[0] = 1.0
+        return spsolve(A.tocsr(), b)
+
+    def relaxation_spectrum(self, num_eigenvalues=10):
+        """
+        Compute the largest eigenvalues of the transition matrix, which obeys
+        detailed balance, from its symmetrized form
+        :math:`D^{1/2} P D^{-1/2}`, with :math:`D` the diagonal matrix of
+        equilibrium populations.
+
+        :param int num_eigenvalues: optional, the number of eigenvalues
+        :return: the eigenvalues, in decreasing order starting at ``1``, and
+                 the relaxation times :math:`-1 / \\ln|\\lambda|` in monte
+                 carlo steps (infinite for the stationary eigenvalue).
+        :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        """
+        pi = self.equilibrium_populations()
+        d = sqrt(pi)
+        S = diags(d) * self.transition_matrix * diags(1.0 / d)
+        S = (S + S.T) * 0.5
+        num_states = S.shape[0]
+        k = min(num_eigenvalues, num_states - 1)
+        if num_states - 1 <= num_eigenvalues:
+            eigenvalues = eigvalsh(S.toarray())
+        else:
+            # shift-invert just above 1 finds the slowest relaxations
+            eigenvalues = eigsh(S.tocsc(), k=k, sigma=1.0 + 1e-6,
+                                which='LM', return_eigenvectors=False)
+        eigenvalues = eigenvalues[argsort(-eigenvalues)][:num_eigenvalues]
+        # the first eigenvalue belongs to the stationary distribution
+        times = ones_like(eigenvalues) * float('inf')
+        times[1:] = -1.0 / log(abs(eigenvalues[1:]))
+        return eigenvalues, times
+
+    def mean_first_passage_times(self, targets):
+        """
+        Solve for the mean number of monte carlo steps to reach a set of
+        states from every state, :math:`(I - P_{UU}) m = 1` over the states
+        :math:`U` outside the set.
+
+        :param list targets: indices of the target states, for example the
+                             native states from :meth:`find_states`
+        :return: the mean first passage time from each state, ``0`` for the
+                 targets
+        :rtype: :class:`numpy.ndarray`
+        """
+        num_states = self.transition_matrix.shape[0]
+        is_target = zeros(num_states, bool)
+        is_target[targets] = True
+        others = (~is_target).nonzero()[0]
+        P_UU = self.transition_matrix[others][:, others]
+        A = identity(len(others), format='csr') - P_UU
+        mfpt = zeros(num_states)
+        mfpt[others] = spsolve(A.tocsc(), ones(len(others)))
+        return mfpt
+
+    def get_state(self, vec):
+        """
+        :param list vec: chain vectors of any orientation of a conformation
+        :return: the index of the state of the conformation
+        :rtype: int
+        """
+        return self.index[conformation_key(vec)]
@@ -0,0 +1,114 @@
+import os
+import json
+from numpy import ndarray, ndindex
+
+
+class MetricsExporter(object):
+    """
+    *MetricsExporter* objects write the metrics of a running simulation
+    (see :meth:`hplattice.MCSampler.MCSampler.get_metrics`) to a file that
+    monitoring tools can read while the simulation runs.
+
+    In ``'jsonl'`` format, each export appends one line containing a JSON
+    object, with arrays written as (nested) lists. In ``'prometheus'``
+    format, each export replaces the file with the current values in the
+    Prometheus text exposition format, which the node exporter's textfile
+    collector can scrape. Array metrics are labelled by ``replica``, ``temp``,
+    ``temp_i``/``temp_j`` or ``ham_i``/``ham_j`` index.
+
+    :param bool save_metrics: ``True`` if metrics should be saved to file.
+    :param str metrics_filename: write metrics to this path
+    :param str metrics_format: optional, ``'jsonl'`` or ``'prometheus'``
+    :param str prefix: optional, prefix of Prometheus metric names
+    """
+    def __init__(self, save_metrics, metrics_filename, metrics_format='jsonl',
+                 prefix='hplattice'):
+        if metrics_format not in ('jsonl', 'prometheus'):
+            raise ValueError("Unknown metrics format %s" % metrics_format)
+        self.save_metrics = save_metrics
+        self.metrics_filename = metrics_filename
+        self.metrics_format = metrics_format
+        self.prefix = prefix
+        if self.save_metrics and self.metrics_format == 'jsonl':
+            self.output_stream = open(self.metrics_filename, 'a')
+        else:
+            self.output_stream = None
+
+    def export(self, metrics):
+        """
+        Write one set of metrics.
+
+        :param dict metrics: metric names and values (numbers, strings or
+                             :class:`numpy.ndarray`)
+        """
+        if self.save_metrics:
+            if self.metrics_format == 'jsonl':
+                self.output_stream.write(format_json(metrics) + '\n')
+                self.output_stream.flush()
+            else:
+                tmp_filename = self.metrics_filename + '.tmp'
+                with open(tmp_filename, 'w') as f:
+                    f.write(format_prometheus(metrics, self.prefix))
+                os.rename(tmp_filename, self.metrics_filename)
+        else:
+            pass
+
+    def finalize(self):
+        """
+        Close any open output streams.
+        """
+        if self.output_stream:
+            self.output_stream.close()
+        else:
+            pass
+
+
+def format_json(metrics):
+    """
+    :param dict metrics: metric names and values
+    :return: the metrics as a single-line JSON object
+    :rtype: str
+    """
+    obj = {}
+    for name, value in metrics.iteritems():
+        if isinstance(value, ndarray):
+            value = value.tolist()
+        obj[name] = value
+    return json.dumps(obj, sort_keys=True)
+
+def format_prometheus(metrics, prefix='hplattice'):
+    """
+    :param dict metrics: metric names and values. String values are written
+                         as labels of every sample.
+    :param str prefix: prefix of metric names
+    :return: the numeric metrics in Prometheus text format
+    :rtype: str
+    """
+    common_labels = ['%s="%s"' % (name, value)
+                     for name, value in sorted(metrics.iteritems())
+                     if isinstance(value, basestring)]
+    lines = []
+    for name, value in sorted(metrics.iteritems()):
+        if isinstance(value, basestring):
+            continue
+        metric_name = '%s_%s' % (prefix, name)
+        lines.append('# TYPE %s gauge' % metric_name)
+        if isinstance(value, ndarray):
+            if name in ('temps', 'accepted_steps_at_T', 'histogram_change',
+                        'energy_ess'):
+                label_names = ['temp']
+            elif name.startswith('ham_swap'):
+                label_names = ['ham_i', 'ham_j']
+            elif value.ndim == 2:
+                label_names = ['temp_i', 'temp_j']
+            else:
+                label_names = ['replica']
+            for idx in ndindex(*value.shape):
+                labels = common_labels + \
+                    ['%s="%d"' % (l, i) for l, i in zip(label_names, idx)]
+                lines.append('%s{%s} %r' % \
+                             (metric_name, ','.join(labels), float(value[idx])))
+        else:
+            lines.append('%s{%s} %r' % \
+                         (metric_name, ','.join(common_labels), float(value)))
+    return '\n'.join(lines) + '\n'
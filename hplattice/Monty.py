@@ -1,9 +1,16 @@
 from random import random
-from math import floor, exp
+from math import floor, exp, log
 from numpy import array, int32
 
+from .util import DX, DY
+
 
 BOLTZ_CONST = 0.001987  # (kcal/K.mol) Boltzmann's constant
+# the values of moveseed that select each kind of move of moveset MS2:
+# three-bead flip, crankshaft and rigid rotation
+MS2_MOVESEEDS = (1.0 / 6.0, 0.5, 5.0 / 6.0)
+# the (dx, dy) step of each vector
+STEPS = zip(DX.tolist(), DY.tolist())
 
 
 class Monty(object):
@@ -16,9 +23,11 @@ class Monty(object):
     :param float temp: temperature (K)
     :param chain: do monte carlo on this chain
     :type chain: :class:`hplattice.Chain.Chain`
+    :param int hamfromrep: optional, the index of the Hamiltonian in
+                           ``config.HAMILTONIANS``
     """
 
-    def __init__(self, config, temp, chain):
+    def __init__(self, config, temp, chain, hamfromrep=0):
         # indices of hydrophic beads
         H_inds = [idx for idx, bead in enumerate(chain.hpstring) if bead == 'H']
         self.H_inds = array(H_inds, int32)
@@ -29,12 +38,43 @@ class Monty(object):
         self.temp = temp
         # The replica number with this temperature
         self.tempfromrep = config.REPLICATEMPS.index(temp)
+        # The energetic strength of a contact and the restraint
+        self.set_hamiltonian(config, hamfromrep)
+        self.lastenergy = self.potential(chain)
+        # the log of the ratio of the probabilities of proposing the reverse
+        # and the forward move, for moves that are not symmetric
+        self.log_bias = 0.0
+        # 1 for each H monomer, 0 for each P monomer
+        self.is_H = [bead == 'H' for bead in chain.hpstring]
+
+    def set_hamiltonian(self, config, hamfromrep):
+        """
+        Use the contact energy and restraint of one of the Hamiltonians in
+        the configuration.
+
+        :param config: configuration parameters
+        :type config: :class:`hplattice.Config.Config`
+        :param int hamfromrep: the index of the Hamiltonian in
+                               ``config.HAMILTONIANS``
+        """
+        params = config.get_hamiltonian(hamfromrep)
+        # The index of the Hamiltonian of this sampler
+        self.hamfromrep = hamfromrep
         # The energetic strength of a contact
-        self.epsilon = config.epsilon
+        self.epsilon = params['epsilon']
+        self.restraint = DistRestraint(params['RESTRAINED_STATE'],
+                                       params['KSPRING'])
 
-        # (both of these are copies from Config() )
-        self.restraint = DistRestraint(config.RESTRAINED_STATE, config.KSPRING)
-        self.lastenergy = self.energy(chain) + self.restraint.energy(chain)
+    def exchange_hamiltonian(self, other):
+        """
+        Swap Hamiltonians with another sampler.
+
+        :param other: the other sampler
+        :type other: :class:`Monty`
+        """
+        self.hamfromrep, other.hamfromrep = other.hamfromrep, self.hamfromrep
+        self.epsilon, other.epsilon = other.epsilon, self.epsilon
+        self.restraint, other.restraint = other.restraint, self.restraint
 
     def kT(self):
         """
@@ -175,6 +215,115 @@ class Monty(object):
   
         chain.do_rigid_rot(vecindex, direction)
 
+    def regrow(self, chain, max_length):
+        """
+        Delete a segment of the chain and regrow it one monomer at a time
+        with configurational bias (Siepmann and Frenkel, 1992): each monomer
+        goes on one of the free sites next to the previous one, chosen in
+        proportion to the Boltzmann factor of the contacts it makes. The
+        segment length is chosen at random between 1 and *max_length*, and
+        the segment at random along the chain. Segments at the ends of the
+        chain grow freely; a segment inside the chain only uses sites from
+        which it can still reach the monomer after it. The Rosenbluth weights
+        of the new segment and of the old one, retraced the same way, are
+        kept in :attr:`log_bias` for :meth:`metropolis`. A segment that grows
+        into a dead end is rejected.
+
+        :param chain: apply move to this chain
+        :type chain: :class:`hplattice.Chain.Chain`
+        :param int max_length: the largest number of monomers to regrow
+        """
+        n = chain.n
+        length = 1 + int(random() * min(max_length, n - 1))
+        first = int(random() * (n - length + 1))
+        last = first + length - 1
+        coords = [tuple(c) for c in chain.coords.as_npy_array().tolist()]
+        if first == 0:
+            # grow the start of the chain backwards
+            order = range(last, -1, -1)
+            target = None
+        elif last == n - 1:
+            order = range(first, n)
+            target = None
+        else:
+            order = range(first, last + 1)
+            target = last + 1
+        old = self._grow_segment(coords, order, target, coords)
+        new = self._grow_segment(coords, order, target)
+        if new is None:
+            self.log_bias = float('-inf')
+            return
+        old_log_W, old_energy, old_positions = old
+        new_log_W, new_energy, new_positions = new
+        kT = self.kT()
+        self.log_bias = (new_log_W + new_energy / kT) - \
+                        (old_log_W + old_energy / kT)
+        for bead in order:
+            coords[bead] = new_positions[bead]
+        lo = max(first - 1, 0)
+        hi = min(last + 1, n - 1)
+        vecs = [STEPS.index((coords[k + 1][0] - coords[k][0],
+                             coords[k + 1][1] - coords[k][1]))
+                for k in range(lo, hi)]
+        chain.do_segment_replace(lo, vecs)
+
+    def _grow_segment(self, coords, order, target, old_coords=None):
+        ### grow the monomers in order, or retrace them at old_coords;
+        ### return the log of the Rosenbluth weight, the energy of the new
+        ### contacts and the position of each monomer, or None at a dead end
+        # each monomer goes next to the one before it in order, or for the
+        # first monomer, next to its fixed neighbor along the chain; the
+        # start of the chain grows backwards
+        if order[-1] == 0:
+            step = 1
+        else:
+            step = -1
+        segment = set(order)
+        # sites occupied by the rest of the chain, {(x, y): monomer index}
+        sites = dict((xy, k) for k, xy in enumerate(coords)
+                     if k not in segment)
+        positions = {}
+        kT = self.kT()
+        log_W = 0.0
+        energy = 0.0
+        for bead in order:
+            x, y = positions.get(bead + step, coords[bead + step])
+            candidates = []
+            for dx, dy in STEPS:
+                site = (x + dx, y + dy)
+                if site in sites:
+                    continue
+                if target is not None and \
+                   abs(site[0] - coords[target][0]) + \
+                   abs(site[1] - coords[target][1]) > target - bead:
+                    continue
+                new_contacts = 0
+                if self.is_H[bead]:
+                    for ex, ey in STEPS:
+                        k = sites.get((site[0] + ex, site[1] + ey))
+                        if k is not None and self.is_H[k] and \
+                           abs(k - bead) > 2:
+                            new_contacts += 1
+                candidates.append((site, new_contacts))
+            if not candidates:
+                return None
+            weights = [exp(-c * self.epsilon / kT) for site, c in candidates]
+            total = sum(weights)
+            log_W += log(total)
+            if old_coords is not None:
+                idx = [site for site, c in candidates].index(old_coords[bead])
+            else:
+                r = random() * total
+                idx = 0
+                while idx < len(weights) - 1 and r >= weights[idx]:
+                    r -= weights[idx]
+                    idx += 1
+            site, new_contacts = candidates[idx]
+            energy += new_contacts * self.epsilon
+            sites[site] = bead
+            positions[bead] = site
+        return log_W, energy, positions
+
     def metropolis(self, replica):
         """
         Judge the next conformation of the chain according to Metropolis
@@ -186,24 +335,39 @@ class Monty(object):
         :rtype: bool
         """
         randnum = random()
+        chain = replica.chain
+
+        # make the proposed conformation current to compute its energy
+        chain.swap_buffers()
 
         # accept with Metroplis criterion
-        thisenergy = self.energy(replica.chain) + \
-                        self.restraint.energy(replica.chain)  
-        boltzfactor = exp( (thisenergy - self.lastenergy) / self.kT() )
+        thisenergy = self.potential(chain)
+        exponent = -(thisenergy - self.lastenergy) / self.kT() + self.log_bias
+        self.log_bias = 0.0
+        boltzfactor = exp(min(exponent, 0.0))
 
         if randnum < boltzfactor:
-            # update the chain
-            replica.chain.update_chain()
             # update the lastenergy
             self.lastenergy = thisenergy
-            return True
+            accepted = True
         else:
-            return False
+            # put the current conformation back
+            chain.swap_buffers()
+            accepted = False
+        chain.reset_proposal()
+        return accepted
 
     def energy(self, chain):
-        E, state = chain.energy(self.epsilon)
-        return E
+        return chain.contact_energy(self.epsilon)
+
+    def potential(self, chain):
+        """
+        :param chain: a chain
+        :type chain: :class:`hplattice.Chain.Chain`
+        :return: the contact energy plus the restraint energy of the chain
+        :rtype: float
+        """
+        return self.energy(chain) + self.restraint.energy(chain)
 
 
 class DistRestraint:
@@ -218,6 +382,10 @@ class DistRestraint:
     def __init__(self, contacts, kspring):
         self.contacts = contacts
         self.kspring = kspring # (J/[lattice space]^2)
+        # the first and second monomer of each contact
+        pairs = array(contacts, int32).reshape((len(contacts), 2))
+        self.first = pairs[:,0]
+        self.second = pairs[:,1]
 
     def energy(self, chain):
         """
@@ -239,12 +407,27 @@ class DistRestraint:
         :return: the sum of squared-distances over the selected contacts.
         :rtype: float
         """
-        D = 0.0
         coords = chain.get_coord_array()
-        for i in range(0, len(self.contacts)):
-            # print 'contact', i, self.contacts[i], chain.coords
-            c = self.contacts[i][0]
-            d = self.contacts[i][1]
-            D = D + (coords[c][0]-coords[d][0])**2
-            D = D + (coords[c][1]-coords[d][1])**2
-        return D
+        diff = coords[self.first] - coords[self.second]
+        return float((diff * diff).sum())
+
+
+def enumerate_moves(moveset, num_vecs):
+    """
+    List every move that a moveset can propose, with the probability that
+    a random move is that one.
+
+    :param str moveset: ``'MS1'``, ``'MS2'`` or ``'MS3'``
+    :param int num_vecs: the number of chain vectors
+    :return: ``(probability, move arguments)`` of each move, where the
+             arguments are keywords of :meth:`Monty.move1`,
+             :meth:`Monty.move2` or :meth:`Monty.move3`
+    :rtype: list
+    """
+    prob = 1.0 / (2 * num_vecs)
+    if moveset.strip() == 'MS2':
+        return [(prob / 3.0, {'vecindex': i, 'direction': d, 'moveseed': t})
+                for i in range(num_vecs) for d in (1, -1)
+                for t in MS2_MOVESEEDS]
+    return [(prob, {'vecindex': i, 'direction': d})
+            for i in range(num_vecs) for d in (1, -1)]
@@ -0,0 +1,231 @@
+from copy import deepcopy
+from random import random
+from math import exp, log, floor
+from collections import OrderedDict
+from bisect import bisect_right
+from numpy import zeros, int32
+
+from .Monty import enumerate_moves
+
+
+class MoveList(object):
+    """
+    The viable moves out of one conformation: the chain vectors, energy and
+    contacts of the conformation each move leads to, and the rate of each
+    move, the probability that one monte carlo step proposes and accepts
+    it. Moves that lead back to the same conformation are left out.
+
+    :param list vecs: chain vectors of the conformation of each move
+    :param list energies: the energy of the conformation of each move
+    :param list contacts: the contacts of the conformation of each move, as
+                          returned by
+                          :meth:`hplattice.Chain.Chain.contactstate`
+    :param list rates: the rate of each move
+    """
+    def __init__(self, vecs, energies, contacts, rates):
+        self.vecs = vecs
+        self.energies = energies
+        self.contacts = contacts
+        self.rates = rates
+        # cumulative rates, to pick a move in proportion to its rate
+        self.cumulative_rates = []
+        total = 0.0
+        for rate in rates:
+            total += rate
+            self.cumulative_rates.append(total)
+        # the probability that a monte carlo step leaves the conformation
+        self.total_rate = total
+
+    def __len__(self):
+        return len(self.vecs)
+
+    def pick(self, r):
+        """
+        :param float r: a random number between ``0`` and ``1``
+        :return: the index of a move, chosen in proportion to its rate
+        :rtype: int
+        """
+        idx = bisect_right(self.cumulative_rates, r * self.total_rate)
+        return min(idx, len(self.vecs) - 1)
+
+
+class NFoldWay(object):
+    """
+    *NFoldWay* objects run rejection-free (n-fold way) monte carlo of an HP
+    chain at constant temperature. Instead of proposing moves that are
+    mostly not viable or rejected at low temperatures, every step picks one
+    of the viable moves out of the current conformation in proportion to
+    its rate, and advances a clock by the number of ordinary monte carlo
+    steps the chain would have stayed put, drawn from the geometric
+    distribution. The conformations visited and the times spent in them are
+    distributed exactly like those of :class:`hplattice.Replica.Replica`
+    with the same moveset, so equilibrium averages weighted by residence
+    time and first passage times in monte carlo steps carry over.
+
+    The move list of a conformation costs one trial of every move of the
+    moveset. Move lists are kept for the *cache_size* most recently visited
+    conformations, so a chain that hops between a few low energy
+    conformations builds each list once. A list takes about a kilobyte per
+    move, some 25 kB for a 20-mer with moveset MS2, so the default of 2000
+    lists takes about 50 MB. Lists are kept by chain vectors, and the up to
+    eight rotations and reflections of a conformation have different
+    vectors, so each one the chain visits gets a list of its own.
+
+    :param lattice_factory: factory object that knows how to create replicas
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    :param float temp: optional, the temperature (K), the first of
+                       *REPLICATEMPS* by default
+    :param int cache_size: optional, the number of move lists to keep
+    """
+    def __init__(self, lattice_factory, config, temp=None, cache_size=2000):
+        if temp is None:
+            temp = config.REPLICATEMPS[0]
+        self.config = deepcopy(config)
+        self.config.update(REPLICATEMPS=[temp], HAMILTONIANS=[])
+        self.temp = temp
+        self.cache_size = cache_size
+        self.replica = lattice_factory.make_replica(lattice_factory,
+                                                    self.config, 0)
+        self.proposals = enumerate_moves(self.config.MOVESET,
+                                         len(self.config.HPSTRING) - 1)
+        # {chain vectors: MoveList}, least recently used first
+        self.move_lists = OrderedDict()
+        # the contacts of the current conformation
+        self.contacts = self.replica.chain.contactstate()
+        # monte carlo steps, and moves made
+        self.clock = 0
+        self.num_moves = 0
+
+    def _build_move_list(self):
+        ### try every move of the moveset on the current conformation
+        chain = self.replica.chain
+        mc = self.replica.mc
+        move = self.replica.mc_move_fcn
+        kT = mc.kT()
+        current = chain.vec.as_npy_array().tostring()
+        vecs = []
+        energies = []
+        contacts = []
+        rates = []
+        for prob, kwargs in self.proposals:
+            move(chain, **kwargs)
+            if chain.nextviable():
+                vec = chain.nextvec.as_npy_array()
+                if vec.tostring() != current:
+                    chain.swap_buffers()
+                    energy = mc.potential(chain)
+                    contacts.append(chain.contactstate())
+                    chain.swap_buffers()
+                    vecs.append(vec.copy())
+                    energies.append(energy)
+                    rates.append(prob * min(1.0, exp(-(energy - mc.lastenergy)
+                                                     / kT)))
+            chain.reset_proposal()
+        return MoveList(vecs, energies, contacts, rates)
+
+    def get_move_list(self):
+        """
+        :return: the viable moves out of the current conformation
+        :rtype: :class:`MoveList`
+        """
+        key = self.replica.chain.vec.as_npy_array().tostring()
+        move_list = self.move_lists.pop(key, None)
+        if move_list is None:
+            move_list = self._build_move_list()
+            if len(self.move_lists) >= self.cache_size:
+                self.move_lists.popitem(last=False)
+        self.move_lists[key] = move_list
+        return move_list
+
+    def _set_conformation(self, move_list, idx):
+        ### make the conformation of a move current
+        chain = self.replica.chain
+        vec = move_list.vecs[idx]
+        chain.vec.set(vec.copy())
+        chain.vec2coords()
+        chain.nextvec.set(vec.copy())
+        chain.nextcoords.vec2coords(chain.nextvec)
+        chain.reset_proposal()
+        self.replica.mc.lastenergy = move_list.energies[idx]
+        self.contacts = move_list.contacts[idx]
+
+    def residence_time(self, total_rate):
+        """
+        Draw the number of monte carlo steps up to and including the step
+        that leaves a conformation.
+
+        :param float total_rate: the probability that a step leaves the
+                                 conformation
+        :return: the number of steps, at least ``1``
+        :rtype: int
+        """
+        if total_rate >= 1.0:
+            return 1
+        return 1 + int(floor(log(1.0 - random()) / log(1.0 - total_rate)))
+
+    def step(self):
+        """
+        Make one move, chosen in proportion to the rates of the viable moves
+        out of the current conformation, and advance the clock.
+
+        :return: the number of monte carlo steps the move took
+        :rtype: int
+        :raises ValueError: if no move leaves the current conformation
+        """
+        move_list = self.get_move_list()
+        if move_list.total_rate <= 0.0:
+            raise ValueError("No viable moves out of %s" % \
+                             self.replica.get_vec())
+        dt = self.residence_time(move_list.total_rate)
+        idx = move_list.pick(random())
+        self._set_conformation(move_list, idx)
+        self.clock += dt
+        self.num_moves += 1
+        return dt
+
+    def run(self, max_steps, native_contacts=None):
+        """
+        Make moves until the clock reaches *max_steps* monte carlo steps, or
+        until the chain is native.
+
+        :param int max_steps: the length of the run, in monte carlo steps
+        :param list native_contacts: optional, native contacts as a list of
+                                     tuples. The run stops as soon as the
+                                     contacts of the chain match them.
+        :return: the monte carlo steps (``'steps'``) and moves
+                 (``'moves'``) of the run; the number of steps spent with
+                 each number of contacts (``'contact_histogram'``) and the
+                 mean energy weighted by the steps spent in each
+                 conformation (``'mean_energy'``); and the first step at
+                 which the chain was native (``'first_passage'``), ``-1`` if
+                 it was not, or if *native_contacts* is not given.
+        :rtype: dict
+        """
+        start_clock = self.clock
+        start_moves = self.num_moves
+        histogram = zeros(len(self.config.HPSTRING) + 1, int32)
+        weighted_energy = 0.0
+        first_passage = -1
+        while True:
+            elapsed = self.clock - start_clock
+            if native_contacts is not None and \
+               self.contacts == native_contacts:
+                first_passage = elapsed
+                break
+            if elapsed >= max_steps:
+                break
+            num_contacts = len(self.contacts)
+            energy = self.replica.mc.lastenergy
+            # the chain stays put for dt - 1 steps and moves on step dt;
+            # the run ends part way through a stay at max_steps
+            dt = min(self.step(), max_steps - elapsed)
+            histogram[num_contacts] += dt
+            weighted_energy += dt * energy
+        steps = min(self.clock - start_clock, max_steps)
+        return {'steps': steps,
+                'moves': self.num_moves - start_moves,
+                'contact_histogram': histogram,
+                'mean_energy': weighted_energy / max(steps, 1),
+                'first_passage': first_passage}
@@ -0,0 +1,190 @@
+import os
+import json
+import sqlite3
+from ast import literal_eval
+from argparse import ArgumentParser
+
+
+class NativeDatabase(object):
+    """
+    *NativeDatabase* objects keep the native state of many sequences in a
+    single SQLite file, indexed by sequence: the native contact list, the
+    number of conformations in the native state (degeneracy), the ground
+    state energy and, optionally, the chain vectors of a native
+    conformation. One file replaces a directory of ``.clist`` files, and
+    contact lists are stored as JSON, so reading them needs no ``eval``.
+
+    :param str filename: path to the database file, created if needed
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS natives ('
+            'hpstring TEXT PRIMARY KEY, contacts TEXT NOT NULL, '
+            'degeneracy INTEGER, energy REAL, vec TEXT)')
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM natives').fetchone()[0]
+
+    def close(self):
+        """
+        Close the database file.
+        """
+        self.connection.close()
+
+    def put(self, hpstring, contacts, degeneracy=None, energy=None, vec=None,
+            commit=True):
+        """
+        Add or replace the native state of a sequence.
+
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :param list contacts: native contacts as a list of tuples, example
+                              ``[(0, 4), (1, 6)]``
+        :param int degeneracy: optional, the number of native conformations
+        :param float energy: optional, the ground state energy
+        :param list vec: optional, the chain vectors of a native
+                         conformation
+        :param bool commit: optional, ``False`` to leave the change
+                            uncommitted, for bulk imports
+        """
+        if vec is not None:
+            vec = json.dumps([int(v) for v in vec])
+        self.connection.execute(
+            'INSERT OR REPLACE INTO natives VALUES (?, ?, ?, ?, ?)',
+            (hpstring, json.dumps([list(c) for c in contacts]), degeneracy,
+             energy, vec))
+        if commit:
+            self.connection.commit()
+
+    def get(self, hpstring):
+        """
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :return: the native state of the sequence, ``'contacts'``,
+                 ``'degeneracy'``, ``'energy'`` and ``'vec'``, or ``None`` if
+                 the sequence is not in the database. Fields that were not
+                 given are ``None``.
+        :rtype: dict
+        """
+        row = self.connection.execute(
+            'SELECT contacts, degeneracy, energy, vec FROM natives '
+            'WHERE hpstring = ?', (hpstring,)).fetchone()
+        if row is None:
+            return None
+        contacts, degeneracy, energy, vec = row
+        if vec is not None:
+            vec = json.loads(vec)
+        return {'contacts': [tuple(c) for c in json.loads(contacts)],
+                'degeneracy': degeneracy,
+                'energy': energy,
+                'vec': vec}
+
+    def get_contacts(self, hpstring):
+        """
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :return: the native contacts of the sequence
+        :rtype: list
+        :raises KeyError: if the sequence is not in the database
+        """
+        native = self.get(hpstring)
+        if native is None:
+            raise KeyError("%s is not in %s" % (hpstring, self.filename))
+        return native['contacts']
+
+    def import_clist_dir(self, directory):
+        """
+        Import every ``<HPSTRING>.clist`` file in a directory.
+
+        :param str directory: path to a directory of ``.clist`` files
+        :return: the number of sequences imported
+        :rtype: int
+        """
+        num_imported = 0
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.clist'):
+                continue
+            hpstring = name[:-len('.clist')]
+            contacts = read_clist(os.path.join(directory, name))
+            self.put(hpstring, contacts, commit=False)
+            num_imported += 1
+        self.connection.commit()
+        return num_imported
+
+    def add_enumeration(self, hpstring, result, epsilon):
+        """
+        Add the native state of a sequence from the result of
+        :meth:`hplattice.Enumerator.Enumerator.enumerate_states`. The native
+        state is the contact state with the most contacts; sequences with
+        more than one such contact state have no native state and are not
+        added.
+
+        :param str hpstring: the sequence, example ``PHPPHP``
+        :param dict result: the enumeration result
+        :param float epsilon: the energy of one contact
+        :return: ``True`` if the sequence was added
+        :rtype: bool
+        """
+        max_contacts = max(result['contacts'].keys())
+        ground_states = [literal_eval(state)
+                         for state in result['contact_states'].keys()
+                         if len(literal_eval(state)) == max_contacts]
+        if len(ground_states) != 1:
+            return False
+        self.put(hpstring, ground_states[0],
+                 degeneracy=result['contacts'][max_contacts],
+                 energy=max_contacts * epsilon)
+        return True
+
+
+def read_clist(filename):
+    """
+    Read the native contacts from the first line of a ``.clist`` file.
+
+    :param str filename: path to ``.clist`` file
+    :return: native contacts as a list of tuples
+    :rtype: list
+    """
+    with open(filename, 'r') as f:
+        return [tuple(c) for c in literal_eval(f.readline().strip())]
+
+def load_native_contacts(config):
+    """
+    Load the native contacts of the sequence of a configuration from the
+    database *NATIVEDB* if it is set, or else from the ``.clist`` file of
+    the sequence in *NATIVEDIR*.
+
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    :return: native contacts as a list of tuples
+    :rtype: list
+    """
+    if config.NATIVEDB:
+        db = NativeDatabase(config.NATIVEDB)
+        try:
+            return db.get_contacts(config.HPSTRING)
+        finally:
+            db.close()
+    return read_clist(os.path.join(config.NATIVEDIR,
+                                   config.HPSTRING + '.clist'))
+
+def main(argv=None):
+    """
+    Command line interface. Example::
+
+        python -m hplattice.NativeDatabase natives.db clist/hp10 clist/hp13
+    """
+    parser = ArgumentParser(description='Import directories of .clist files '
+                                        'into a native contact database.')
+    parser.add_argument('database', help='path to database file')
+    parser.add_argument('directories', nargs='+',
+                        help='directories of .clist files')
+    args = parser.parse_args(argv)
+    db = NativeDatabase(args.database)
+    for directory in args.directories:
+        print directory, db.import_clist_dir(directory)
+    db.close()
+
+if __name__ == '__main__':
+    main()
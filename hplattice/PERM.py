@@ -0,0 +1,168 @@
+import random
+from math import exp
+
+from .Monty import BOLTZ_CONST, STEPS
+
+
+class PERMSampler(object):
+    """
+    *PERMSampler* objects sample conformations of an HP chain with the
+    pruned-enriched Rosenbluth method (Grassberger, 1997). Chains are grown
+    one monomer at a time with :meth:`hplattice.Chain.Chain.grow`, each new
+    monomer placed on a randomly chosen free site next to the end of the
+    chain. A chain carries the Rosenbluth weight
+    :math:`W = \\prod_k m_k e^{-\\Delta E_k / kT}`, where :math:`m_k` is the
+    number of free sites at step :math:`k`. Chains whose weight rises above
+    *enrich* times the current estimate of the partition function at their
+    length are copied, each copy taking half the weight; chains whose weight
+    falls below *prune* times the estimate are killed with probability one
+    half, the survivors taking twice the weight. The weights of complete
+    chains estimate the density of states, and the lowest energy
+    conformation found is kept, for chains much longer than can be
+    enumerated.
+
+    Conformations are counted with the first monomer at the origin and
+    every orientation of the chain distinct, so the estimated total is
+    about eight times the number of conformations counted by
+    :class:`hplattice.Enumerator.Enumerator`.
+
+    :param lattice_factory: factory object that knows how to create chains
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    """
+    def __init__(self, lattice_factory, config):
+        self.lattice_factory = lattice_factory
+        self.config = config
+        self.n = len(config.HPSTRING)
+        self.is_H = [bead == 'H' for bead in config.HPSTRING]
+
+    def run(self, num_tours, temp=None, prune=0.3, enrich=3.0):
+        """
+        Grow chains from scratch *num_tours* times.
+
+        :param int num_tours: the number of tours, each of which grows one
+                              chain and all of its enriched copies
+        :param float temp: optional, the temperature (K) of the Boltzmann
+                           factor in the weights, *T* of the configuration
+                           by default. Lower temperatures favor low energy
+                           conformations.
+        :param float prune: optional, the pruning threshold, relative to the
+                            estimated partition function
+        :param float enrich: optional, the enrichment threshold, relative to
+                             the estimated partition function
+        :return: the estimated density of states as
+                 ``{number of contacts: number of conformations}``
+                 (``'contacts'``), the estimated number of conformations
+                 (``'nconfs'``), the number of complete chains grown
+                 (``'chains'``), the lowest energy found (``'min_energy'``)
+                 and its chain vectors (``'min_vec'``).
+        :rtype: dict
+        """
+        if temp is None:
+            temp = self.config.T
+        self.beta = 1.0 / (BOLTZ_CONST * temp)
+        self.epsilon = self.config.epsilon
+        self.prune = prune
+        self.enrich = enrich
+        # sums of the weights of the chains that reached each length
+        self.weight_sums = [0.0] * (self.n + 1)
+        # sums of the weights of complete chains, by number of contacts
+        self.contact_weights = {}
+        self.num_chains = 0
+        self.min_energy = None
+        self.min_vec = None
+
+        # every tour starts from the first bond, and growth undoes itself,
+        # so one chain is enough
+        self.chain = self.lattice_factory.make_chain(self.config.HPSTRING, [0])
+        # sites occupied by the chain, {(x, y): monomer index}
+        self.sites = {(0, 0): 0, (0, 1): 1}
+        for tour in xrange(1, num_tours + 1):
+            self.tour = tour
+            # the first vector is fixed to point up, so every chain stands
+            # for the four rotations of its first bond
+            self._grow(2, 4.0, 0)
+
+        # reweight complete chains to remove the Boltzmann factor
+        contacts = {}
+        for ncontacts, W in self.contact_weights.iteritems():
+            contacts[ncontacts] = \
+                W * exp(self.beta * ncontacts * self.epsilon) / num_tours
+        return {'contacts': contacts,
+                'nconfs': sum(contacts.values()),
+                'chains': self.num_chains,
+                'min_energy': self.min_energy,
+                'min_vec': self.min_vec}
+
+    def _grow(self, length, W, ncontacts):
+        ### continue a chain of the given length, weight and contacts
+        self.weight_sums[length] += W
+        if length == self.n:
+            self._record(W, ncontacts)
+            return
+        Z = self.weight_sums[length] / self.tour
+        copies = 1
+        if W > self.enrich * Z:
+            copies = 2
+            W = W / 2.0
+        elif W < self.prune * Z:
+            if random.random() < 0.5:
+                return
+            W = W * 2.0
+
+        for copy in range(copies):
+            candidates = self._free_sites(length)
+            if not candidates:
+                # the chain is trapped
+                return
+            direction, site, new_contacts = \
+                candidates[int(random.random() * len(candidates))]
+            dE = new_contacts * self.epsilon
+            new_W = W * len(candidates) * exp(-self.beta * dE)
+            self._add_monomer(length, direction, site)
+            self._grow(length + 1, new_W, ncontacts + new_contacts)
+            self._remove_monomer(site)
+
+    def _free_sites(self, length):
+        ### (direction, site, number of new contacts) for each free site
+        ### next to the last monomer
+        x, y = self.chain.coords.get(length - 1).tolist()
+        candidates = []
+        for direction in range(4):
+            site = (x + STEPS[direction][0], y + STEPS[direction][1])
+            if site in self.sites:
+                continue
+            new_contacts = 0
+            if self.is_H[length]:
+                for k in range(4):
+                    idx = self.sites.get((site[0] + STEPS[k][0],
+                                          site[1] + STEPS[k][1]))
+                    if idx is not None and idx < length - 1 and \
+                       self.is_H[idx]:
+                        new_contacts += 1
+            candidates.append((direction, site, new_contacts))
+        return candidates
+
+    def _add_monomer(self, length, direction, site):
+        ### grow the chain and point the new vector at the site
+        self.chain.grow()
+        self.chain.vec.set_idx(length - 1, direction)
+        self.chain.coords.set(site, length)
+        self.sites[site] = length
+
+    def _remove_monomer(self, site):
+        ### undo _add_monomer
+        self.chain.vec.pop()
+        self.chain.coords.pop()
+        del self.sites[site]
+
+    def _record(self, W, ncontacts):
+        ### tally a complete chain
+        self.num_chains += 1
+        self.contact_weights[ncontacts] = \
+            self.contact_weights.get(ncontacts, 0.0) + W
+        E = ncontacts * self.epsilon
+        if self.min_energy is None or E < self.min_energy:
+            self.min_energy = E
+            self.min_vec = self.chain.vec.as_npy_array().copy()
@@ -0,0 +1,227 @@
+import random
+from multiprocessing import Pool
+from numpy import array, zeros, empty, arange, exp, log, cumsum, \
+                  searchsorted, int32, float64
+
+from .Monty import BOLTZ_CONST
+
+
+class PopulationAnnealer(object):
+    """
+    *PopulationAnnealer* objects run population annealing (Hukushima and
+    Iba, 2003; Machta, 2010) of an HP chain. A population of *POPULATION*
+    chains is stepped down the temperatures in *REPLICATEMPS*, from the
+    highest to the lowest. At each temperature every chain makes
+    *ANNEALSTEPS* monte carlo moves with the moveset of the configuration.
+    Between temperatures the population is resampled: each chain is copied
+    in proportion to its Boltzmann weight
+    :math:`e^{-(\\beta_{k+1} - \\beta_k) E}`, which keeps the population in
+    equilibrium at the new temperature and gives the free energy difference
+    between the two temperatures from the mean weight.
+
+    Unlike replica exchange, the chains never interact during the monte
+    carlo steps. The population is kept as arrays of chain vectors and
+    energies, split into chunks of *chunk_size* chains for the monte carlo
+    steps at each temperature. The chunks are spread over a local pool of
+    processes, each of which runs its chains one at a time through a single
+    :class:`hplattice.Replica.Replica`, and are merged back into the arrays
+    before resampling. Each chunk seeds the random number generator with a
+    seed drawn from the generator of this process, so the results do not
+    depend on the number of processes.
+
+    :param lattice_factory: factory object that knows how to create replicas
+    :type lattice_factory: :class:`hplattice.LatticeFactory`
+    :param config: configuration parameters
+    :type config: :class:`hplattice.Config.Config`
+    :param int num_processes: optional, number of worker processes. Chains
+                              are run in this process when ``1``.
+    :param int chunk_size: optional, the number of chains in each job
+    """
+    def __init__(self, lattice_factory, config, num_processes=1,
+                 chunk_size=100):
+        self.lattice_factory = lattice_factory
+        self.config = config
+        self.num_processes = num_processes
+        self.chunk_size = chunk_size
+        # the annealing schedule, from the highest temperature to the lowest
+        self.temps = sorted(config.REPLICATEMPS, reverse=True)
+        # a replica that holds the monte carlo stats of the whole population
+        self.replica = lattice_factory.make_replica(lattice_factory, config, 0)
+        self.replica.init_mc_stats()
+        size = config.POPULATION
+        self.vecs = zeros((size, len(config.INITIALVEC)), int32)
+        self.vecs[:] = config.INITIALVEC
+        self.energies = zeros(size, float64)
+        self.energies[:] = self.replica.mc.lastenergy
+
+    def _load(self, idx):
+        ### put member idx of the population into the replica's chain
+        chain = self.replica.chain
+        chain.vec.set(self.vecs[idx].copy())
+        chain.vec2coords()
+        chain.nextvec.set(self.vecs[idx].copy())
+        chain.nextcoords.vec2coords(chain.nextvec)
+        chain.reset_proposal()
+        self.replica.mc.lastenergy = self.energies[idx]
+
+    def make_jobs(self, temp):
+        """
+        Split the population into jobs for the monte carlo steps at one
+        temperature.
+
+        :param float temp: the temperature (K)
+        :return: list of ``(lattice_factory, config, temp, vecs, energies,
+                 seed)`` tuples, one per chunk of the population
+        :rtype: list
+        """
+        jobs = []
+        for start in xrange(0, len(self.vecs), self.chunk_size):
+            stop = start + self.chunk_size
+            jobs.append((self.lattice_factory, self.config, temp,
+                         self.vecs[start:stop], self.energies[start:stop],
+                         random.getrandbits(32)))
+        return jobs
+
+    def _run_members(self, temp, pool=None):
+        ### do ANNEALSTEPS monte carlo moves on every member at temp
+        jobs = self.make_jobs(temp)
+        if pool is None:
+            results = map(run_members, jobs)
+        else:
+            results = pool.map(run_members, jobs, chunksize=1)
+        r = self.replica
+        start = 0
+        for vecs, energies, steps, viablesteps, acceptedsteps in results:
+            self.vecs[start:start + len(vecs)] = vecs
+            self.energies[start:start + len(vecs)] = energies
+            start += len(vecs)
+            r.steps += steps
+            r.viablesteps += viablesteps
+            r.acceptedsteps += acceptedsteps
+
+    def resample(self, temp_from, temp_to):
+        """
+        Resample the population from one temperature to the next with
+        systematic resampling, keeping the population size fixed.
+
+        :param float temp_from: the temperature of the current population
+        :param float temp_to: the next temperature
+        :return: the log of the mean Boltzmann weight of the population,
+                 :math:`\\ln(Z_{to} / Z_{from})`, and the effective
+                 population size :math:`(\\sum w)^2 / \\sum w^2`.
+        :rtype: (float, float)
+        """
+        dbeta = 1.0 / (BOLTZ_CONST * temp_to) - \
+                1.0 / (BOLTZ_CONST * temp_from)
+        log_w = -dbeta * self.energies
+        log_w_max = log_w.max()
+        w = exp(log_w - log_w_max)
+        log_Q = log_w_max + log(w.mean())
+        effective_size = w.sum()**2 / (w * w).sum()
+
+        size = len(w)
+        bounds = cumsum(w)
+        bounds /= bounds[-1]
+        positions = (random.random() + arange(size)) / size
+        parents = searchsorted(bounds, positions).clip(0, size - 1)
+        self.vecs = self.vecs[parents]
+        self.energies = self.energies[parents]
+        return log_Q, effective_size
+
+    def run(self, ground_energy=None):
+        """
+        Anneal the population from the highest to the lowest temperature.
+
+        :param float ground_energy: optional, the energy of the ground state,
+                                    if known. Otherwise the lowest energy
+                                    found during the run is used.
+        :return: arrays with one value per temperature of the schedule:
+                 ``'temps'``, the free energy :math:`\\beta F` relative to
+                 the first temperature (``'beta_free_energy'``), the mean
+                 and lowest energy of the population (``'mean_energy'``,
+                 ``'min_energy'``), the number of chains in the ground state
+                 (``'ground_state_hits'``) and the effective population size
+                 before resampling to that temperature
+                 (``'effective_size'``); and ``'ground_energy'`` and the
+                 fraction of viable moves that were accepted
+                 (``'mc_acceptance'``).
+        :rtype: dict
+        """
+        num_temps = len(self.temps)
+        size = len(self.vecs)
+        beta_free_energy = zeros(num_temps)
+        effective_size = zeros(num_temps)
+        effective_size[0] = size
+        energies = empty((num_temps, size), float64)
+        if self.num_processes > 1:
+            pool = Pool(processes=self.num_processes)
+        else:
+            pool = None
+        try:
+            for k, temp in enumerate(self.temps):
+                if k > 0:
+                    log_Q, effective_size[k] = \
+                        self.resample(self.temps[k - 1], temp)
+                    beta_free_energy[k] = beta_free_energy[k - 1] - log_Q
+                self._run_members(temp, pool)
+                energies[k] = self.energies
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if ground_energy is None:
+            ground_energy = energies.min()
+        self.replica.compute_mc_acceptance()
+        return {'temps': array(self.temps),
+                'beta_free_energy': beta_free_energy,
+                'mean_energy': energies.mean(axis=1),
+                'min_energy': energies.min(axis=1),
+                'ground_state_hits':
+                    (energies <= ground_energy + 1e-9).sum(axis=1),
+                'effective_size': effective_size,
+                'ground_energy': ground_energy,
+                'mc_acceptance': self.replica.acceptance}
+
+
+def run_members(job):
+    """
+    Run the monte carlo steps of one chunk of the population, built by
+    :meth:`PopulationAnnealer.make_jobs`. This is a module-level function
+    so that it can be sent to worker processes. The state of the random
+    number generator is restored afterwards, so that running a job in the
+    calling process does not change the random numbers it draws next.
+
+    :param tuple job: ``(lattice_factory, config, temp, vecs, energies,
+                      seed)``
+    :return: the chain vectors and energies of the chains after
+             *ANNEALSTEPS* moves each, and the number of steps, viable steps
+             and accepted steps
+    :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, int, int, int)
+    """
+    lattice_factory, config, temp, vecs, energies, seed = job
+    rng_state = random.getstate()
+    random.seed(seed)
+    r = lattice_factory.make_replica(lattice_factory, config, 0)
+    r.init_mc_stats()
+    r.mc.temp = temp
+    chain = r.chain
+    vecs = vecs.copy()
+    energies = energies.copy()
+    for idx in xrange(len(vecs)):
+        chain.vec.set(vecs[idx].copy())
+        chain.vec2coords()
+        chain.nextvec.set(vecs[idx].copy())
+        chain.nextcoords.vec2coords(chain.nextvec)
+        chain.reset_proposal()
+        r.mc.lastenergy = energies[idx]
+        for step in xrange(config.ANNEALSTEPS):
+            move_is_viable = r.propose_move()
+            if move_is_viable:
+                move_is_accepted = r.metropolis_accept_move()
+            else:
+                move_is_accepted = False
+            r.record_stats(move_is_viable, move_is_accepted)
+        vecs[idx] = chain.vec.as_npy_array()
+        energies[idx] = r.mc.lastenergy
+    random.setstate(rng_state)
+    return vecs, energies, r.steps, r.viablesteps, r.acceptedsteps
@@ -0,0 +1,150 @@
+from timeit import default_timer
+
+
+# The phases of a monte carlo step, in report order
+PHASES = ['move', 'viability', 'energy', 'metropolis', 'stats', 'native',
+          'swap', 'io']
+
+
+def _phase_targets(sampler, trajectories, energy_log):
+    ### (phase, object, method name) for every method that is timed
+    targets = []
+    for r in sampler.replicas:
+        targets.append(('move', r, 'mc_move_fcn'))
+        targets.append(('viability', r.chain, 'nextviable'))
+        targets.append(('energy', r.mc, 'energy'))
+        targets.append(('energy', r.mc.restraint, 'energy'))
+        targets.append(('metropolis', r.mc, 'metropolis'))
+        targets.append(('stats', r, 'record_stats'))
+        targets.append(('native', r, 'is_native'))
+    targets.append(('swap', sampler, '_attempt_swaps'))
+    for traj in trajectories:
+        targets.append(('io', traj, 'snapshot'))
+    targets.append(('io', energy_log, 'record'))
+    return targets
+
+
+class PhaseProfiler(object):
+    """
+    *PhaseProfiler* objects measure where the time of a monte carlo
+    simulation goes. :meth:`instrument` replaces the methods that make up each
+    phase of a step (move proposal, viability check, energy, Metropolis
+    criterion, stats, native check, swaps and trajectory/energy output) with
+    timed wrappers on the instances of one simulation, and :meth:`restore`
+    puts the original methods back. Nothing is wrapped unless profiling is
+    enabled with the *PROFILE* configuration parameter, so there is no cost
+    when it is disabled.
+
+    Times are exclusive: while a phase calls another timed phase (the
+    Metropolis criterion calls the energy function, for example) the time
+    is charged to the inner phase only.
+    """
+    def __init__(self):
+        self.times = dict((phase, 0.0) for phase in PHASES)
+        self.calls = dict((phase, 0) for phase in PHASES)
+        self.total_time = 0.0
+        self.num_steps = 0
+        self._stack = []
+        self._originals = []
+        self._start_time = None
+
+    def _enter(self, phase):
+        ### pause the enclosing phase and start timing this one
+        now = default_timer()
+        if self._stack:
+            self.times[self._stack[-1][0]] += now - self._stack[-1][1]
+        self._stack.append([phase, now])
+        self.calls[phase] += 1
+
+    def _exit(self):
+        ### stop timing the current phase and resume the enclosing one
+        now = default_timer()
+        phase, start = self._stack.pop()
+        self.times[phase] += now - start
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def wrap(self, phase, fcn):
+        """
+        :param str phase: charge the time spent in *fcn* to this phase
+        :param callable fcn: the function to time
+        :return: a function that calls *fcn* and records its time
+        :rtype: callable
+        """
+        def timed_fcn(*args, **kwargs):
+            self._enter(phase)
+            try:
+                return fcn(*args, **kwargs)
+            finally:
+                self._exit()
+        return timed_fcn
+
+    def instrument(self, sampler, trajectories, energy_log):
+        """
+        Replace the methods of each phase with timed wrappers and start the
+        clock for the whole simulation.
+
+        :param sampler: the sampler to profile
+        :type sampler: :class:`hplattice.MCSampler.MCSampler`
+        :param list trajectories: the trajectories of the simulation
+        :param energy_log: the energy log of the simulation
+        :type energy_log: :class:`hplattice.EnergyLog.EnergyLog`
+        """
+        for phase, obj, name in _phase_targets(sampler, trajectories,
+                                               energy_log):
+            # remember whether the instance had its own attribute, so that
+            # restore() can tell bound methods from instance attributes
+            self._originals.append((obj, name, obj.__dict__.get(name)))
+            setattr(obj, name, self.wrap(phase, getattr(obj, name)))
+        self._start_time = default_timer()
+
+    def restore(self, num_steps):
+        """
+        Put the original methods back and stop the clock.
+
+        :param int num_steps: the number of monte carlo steps that were run
+        """
+        self.total_time += default_timer() - self._start_time
+        self.num_steps += num_steps
+        for obj, name, original in reversed(self._originals):
+            if original is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, original)
+        self._originals = []
+
+    def get_profile(self):
+        """
+        :return: ``{phase: (calls, seconds)}`` for each phase, plus
+                 ``'other'`` for time outside the timed phases (loop
+                 overhead, status updates and checkpoints).
+        :rtype: dict
+        """
+        profile = dict((phase, (self.calls[phase], self.times[phase]))
+                       for phase in PHASES)
+        other = self.total_time - sum(self.times.values())
+        profile['other'] = (0, other)
+        return profile
+
+    def report(self):
+        """
+        :return: a table of the calls, total time, time per call, time per
+                 monte carlo step and fraction of the total time for each
+                 phase.
+        :rtype: str
+        """
+        lines = ['%-12s %-12s %-12s %-14s %-14s %-8s' % \
+                 ('phase', 'calls', 'time (s)', 'us/call', 'us/step',
+                  'fraction')]
+        profile = self.get_profile()
+        for phase in PHASES + ['other']:
+            calls, seconds = profile[phase]
+            per_call = 1e6 * seconds / calls if calls > 0 else 0.0
+            per_step = 1e6 * seconds / self.num_steps \
+                if self.num_steps > 0 else 0.0
+            fraction = seconds / self.total_time \
+                if self.total_time > 0 else 0.0
+            lines.append('%-12s %-12d %-12.4f %-14.3f %-14.3f %-8.3f' % \
+                         (phase, calls, seconds, per_call, per_step, fraction))
+        lines.append('%-12s %-12s %-12.4f' % ('total', '', self.total_time))
+        return '\n'.join(lines)
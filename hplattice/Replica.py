@@ -7,7 +7,10 @@ class Replica(object):
     Each *Replica* is a container for a chain and a monte carlo sampler.
     During replica exchange simulations, the replicas attempt to swap
     temperatures at regular intervals. The success of a swap depends on
-    the energies and temperatures of the replicas.
+    the energies and temperatures of the replicas. In Hamiltonian replica
+    exchange simulations, replicas are laid out on a grid of
+    ``HAMILTONIANS`` by ``REPLICATEMPS`` and also attempt to swap
+    Hamiltonians with their neighbors at the same temperature.
 
     :param lattice_factory: factory object that knows how to create chains and
                             monty samplers.
@@ -18,13 +21,20 @@ class Replica(object):
                              example ``[(0, 4), (1, 6)]``
     """
     def __init__(self, lattice_factory, config, repnum, nativeclist=None):
-        T = config.REPLICATEMPS[repnum]
+        num_temps = len(config.REPLICATEMPS)
+        T = config.REPLICATEMPS[repnum % num_temps]
+        hamfromrep = repnum // num_temps
         self.repnum = repnum
         self.nativeclist = nativeclist
         self.chain = \
             lattice_factory.make_chain(config.HPSTRING, config.INITIALVEC)
-        self.mc = lattice_factory.make_monty(config, T, self.chain)
+        self.mc = lattice_factory.make_monty(config, T, self.chain,
+                                             hamfromrep)
         self.mc_move_fcn = self._select_move(config.MOVESET.strip())
+        # the probability of a regrowth move instead of a move of the
+        # moveset, and the longest segment to regrow
+        self.regrow_prob = config.REGROWPROB
+        self.regrow_length = config.REGROWLENGTH
 
     def init_mc_stats(self):
         """
@@ -87,13 +97,21 @@ class Replica(object):
 
     def propose_move(self):
         """
-        Do a monte carlo move to produce a new conformation of the chain.
+        Do a monte carlo move to produce a new conformation of the chain:
+        a configurational-bias regrowth with probability *REGROWPROB*, or a
+        move of the moveset. A conformation that is not viable is discarded.
 
         :return: ``True`` if new conformation is viable.
         :rtype: bool
         """
-        self.mc_move_fcn(self.chain)
-        return self.chain.nextviable()
+        if self.regrow_prob > 0 and random() < self.regrow_prob:
+            self.mc.regrow(self.chain, self.regrow_length)
+        else:
+            self.mc_move_fcn(self.chain)
+        move_is_viable = self.chain.nextviable()
+        if not move_is_viable:
+            self.chain.reset_proposal()
+        return move_is_viable
 
     def metropolis_accept_move(self):
         """
@@ -151,6 +169,16 @@ class Replica(object):
         """
         return self.mc.energy(self.chain)
 
+    def potential(self):
+        """
+        Compute the energy of the current chain conformation under the
+        Hamiltonian of this replica, restraint included.
+
+        :return: energy
+        :rtype: float
+        """
+        return self.mc.potential(self.chain)
+
     def kT(self):
         """
         :return: :math:`k_b * T`
@@ -194,7 +222,89 @@ def attemptswap(swap_method, replicas):
                 
     else:
         print 'Swap method', swap_method, 'unknown.'
- 
+
+    swap_success = _attempt_pair_swap(replicas[i], replicas[j])
+    return i, j, swap_success
+
+def attempt_even_odd_swaps(replicas, parity):
+    """
+    Attempt swaps between all non-overlapping pairs of replicas that are
+    neighbors on the temperature ladder. The ladder order is the order of
+    ``REPLICATEMPS``; with several Hamiltonians, each Hamiltonian has its
+    own ladder. When *parity* is ``0``, the pairs are
+    ``(T0, T1), (T2, T3), ...``; when *parity* is ``1``, the pairs are
+    ``(T1, T2), (T3, T4), ...``. Alternating the parity from one exchange
+    round to the next lets every temperature pair attempt a swap every
+    other round.
+
+    :param list replicas: list of :class:`Replica` objects
+    :param int parity: ``0`` for even pairs, ``1`` for odd pairs
+    :return: list of ``(i, j, swap_success)`` tuples, one per attempted pair,
+             where ``i`` and ``j`` are replica indices.
+    :rtype: list
+    """
+    swap_results = []
+    for ladder in _ladders(replicas, 'hamfromrep', 'tempfromrep'):
+        for k in range(parity, len(ladder) - 1, 2):
+            i = ladder[k]
+            j = ladder[k + 1]
+            swap_success = _attempt_pair_swap(replicas[i], replicas[j])
+            swap_results.append((i, j, swap_success))
+    return swap_results
+
+def attempt_hamiltonian_swaps(replicas, parity):
+    """
+    Attempt swaps of Hamiltonians between all non-overlapping pairs of
+    replicas that are at the same temperature and neighbors on the
+    Hamiltonian ladder, the order of ``HAMILTONIANS``. Pairs are chosen by
+    *parity* as in :func:`attempt_even_odd_swaps`. A swap between
+    replicas ``i`` and ``j`` is accepted with probability
+    :math:`\min(1, e^{-\Delta})`, where
+    :math:`\Delta = [u_i(x_j) - u_i(x_i) + u_j(x_i) - u_j(x_j)] / k_b T`.
+
+    :param list replicas: list of :class:`Replica` objects
+    :param int parity: ``0`` for even pairs, ``1`` for odd pairs
+    :return: list of ``(i, j, swap_success)`` tuples, one per attempted pair,
+             where ``i`` and ``j`` are replica indices.
+    :rtype: list
+    """
+    swap_results = []
+    for ladder in _ladders(replicas, 'tempfromrep', 'hamfromrep'):
+        for k in range(parity, len(ladder) - 1, 2):
+            i = ladder[k]
+            j = ladder[k + 1]
+            swap_success = \
+                _attempt_hamiltonian_pair_swap(replicas[i], replicas[j])
+            swap_results.append((i, j, swap_success))
+    return swap_results
+
+def _ladders(replicas, group_attr, order_attr):
+    ### replica indices grouped by one index of the grid, ordered by the other
+    ladders = {}
+    for idx, r in enumerate(replicas):
+        ladders.setdefault(getattr(r.mc, group_attr), []).append(idx)
+    return [sorted(ladders[key],
+                   key=lambda idx: getattr(replicas[idx].mc, order_attr))
+            for key in sorted(ladders)]
+
+def _attempt_hamiltonian_pair_swap(replica_i, replica_j):
+    ### attempt to swap the Hamiltonians of a pair of replicas
+    mc_i = replica_i.mc
+    mc_j = replica_j.mc
+    u_ii = mc_i.potential(replica_i.chain)
+    u_ij = mc_i.potential(replica_j.chain)
+    u_jj = mc_j.potential(replica_j.chain)
+    u_ji = mc_j.potential(replica_i.chain)
+    delta = (u_ij - u_ii) / mc_i.kT() + (u_ji - u_jj) / mc_j.kT()
+    if delta <= 0.0 or random() < exp(-delta):
+        mc_i.exchange_hamiltonian(mc_j)
+        mc_i.lastenergy = u_ji
+        mc_j.lastenergy = u_ij
+        return True
+    return False
+
+def _attempt_pair_swap(replica_i, replica_j):
+    ### attempt to swap the temperatures of a pair of replicas
     randnum = random()
 
     ### if proposing i-->j, 
@@ -203,30 +313,30 @@ def attemptswap(swap_method, replicas):
     ###
     ### (see Hansmann 1997)
 
-    boltzfactor = _compute_boltz_factor(replicas[i], replicas[j])
+    boltzfactor = _compute_boltz_factor(replica_i, replica_j)
 
     if randnum < boltzfactor:
 
         # swap the ***temperatures***
-        temp_i = replicas[i].mc.temp
-        temp_j = replicas[j].mc.temp
-        tempfromrep_i = replicas[i].mc.tempfromrep
-        tempfromrep_j = replicas[j].mc.tempfromrep
-        replicas[i].mc.temp = temp_j
-        replicas[j].mc.temp = temp_i
-        replicas[i].mc.tempfromrep = tempfromrep_j
-        replicas[j].mc.tempfromrep = tempfromrep_i
+        temp_i = replica_i.mc.temp
+        temp_j = replica_j.mc.temp
+        tempfromrep_i = replica_i.mc.tempfromrep
+        tempfromrep_j = replica_j.mc.tempfromrep
+        replica_i.mc.temp = temp_j
+        replica_j.mc.temp = temp_i
+        replica_i.mc.tempfromrep = tempfromrep_j
+        replica_j.mc.tempfromrep = tempfromrep_i
         
         swap_success = True
         
     else:
         swap_success = False
 
-    return i, j, swap_success
+    return swap_success
 
 def _compute_boltz_factor(replica_i, replica_j):
     ### compute boltzmann factor for a pair of replicas
     delfactor = (1. / replica_j.kT()) - (1. / replica_i.kT())
-    delfactor = delfactor * (replica_j.energy() - replica_i.energy())
+    delfactor = delfactor * (replica_j.potential() - replica_i.potential())
     boltzfactor = exp(delfactor)
     return boltzfactor
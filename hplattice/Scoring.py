@@ -0,0 +1,129 @@
+from numpy import asarray, array, zeros, empty, cumsum, sort, sqrt, \
+                  packbits, unpackbits, nonzero, int32, float64, bool_
+
+from .util.numpy_kernels import DX, DY
+
+
+def vecs_to_coords(vecs):
+    """
+    Convert many sets of chain vectors to coordinates at once.
+
+    :param vecs: 2D array of vectors, one row per conformation
+    :type vecs: :class:`numpy.ndarray`
+    :return: 3D array of coordinates, shape (conformations, monomers, 2),
+             with the first monomer of every conformation at the origin
+    :rtype: :class:`numpy.ndarray`
+    """
+    vecs = asarray(vecs, int32)
+    M, num_vecs = vecs.shape
+    coords = zeros((M, num_vecs + 1, 2), int32)
+    cumsum(DX[vecs], axis=1, out=coords[:,1:,0])
+    cumsum(DY[vecs], axis=1, out=coords[:,1:,1])
+    return coords
+
+def contact_pairs(hpstring):
+    """
+    List the pairs of ``H`` monomers that can form a contact: pairs at least
+    three positions apart along the chain, with one monomer at an even and
+    one at an odd position (monomers with indices of the same parity are
+    never neighbors on the square lattice).
+
+    :param str hpstring: example ``PHPPHP``
+    :return: 2D array of ``(idx1, idx2)`` pairs, in the order that
+             :meth:`hplattice.Chain.Chain.energy` reports contacts
+    :rtype: :class:`numpy.ndarray`
+    """
+    H_inds = [idx for idx, bead in enumerate(hpstring) if bead == 'H']
+    pairs = [(c, d) for c in H_inds for d in H_inds
+             if d - c >= 3 and (d - c) % 2 == 1]
+    return array(pairs, int32).reshape((len(pairs), 2))
+
+def score_conformations(hpstring, vecs=None, coords=None, epsilon=-1.0,
+                        chunk_size=65536):
+    """
+    Compute the energy and other properties of many conformations of one
+    sequence with vectorized array operations, without creating
+    :class:`hplattice.Chain.Chain` objects. Give either *vecs* or *coords*.
+    Conformations are processed *chunk_size* at a time to bound memory use.
+
+    :param str hpstring: the sequence, example ``PHPPHP``
+    :param vecs: optional, 2D array of chain vectors, shape
+                 (conformations, monomers - 1)
+    :type vecs: :class:`numpy.ndarray`
+    :param coords: optional, 3D array of coordinates, shape
+                   (conformations, monomers, 2)
+    :type coords: :class:`numpy.ndarray`
+    :param float epsilon: optional, the energy of one hydrophobic contact
+    :param int chunk_size: optional, the number of conformations to process
+                           at once
+    :return: for each conformation, the contact energy (``'energy'``), the
+             number of contacts (``'ncontacts'``), a bitmask of the contacts
+             that are formed (``'contacts'``, one row of
+             :func:`numpy.packbits` bytes per conformation, bit ``k`` for
+             ``'pairs'[k]``), ``True`` if the chain does not overlap
+             itself (``'viable'``) and the radius of gyration (``'rg'``);
+             and the candidate contacts from :func:`contact_pairs`
+             (``'pairs'``). Properties of conformations that are not viable
+             are computed all the same.
+    :rtype: dict
+    """
+    if coords is None:
+        coords = vecs_to_coords(vecs)
+    else:
+        coords = asarray(coords, int32)
+    M, n = coords.shape[:2]
+    if n != len(hpstring):
+        raise ValueError("Conformations have %d monomers, sequence has %d" % \
+                         (n, len(hpstring)))
+    pairs = contact_pairs(hpstring)
+    num_bytes = (len(pairs) + 7) // 8
+    results = {'energy': empty(M, float64),
+               'ncontacts': empty(M, int32),
+               'contacts': zeros((M, num_bytes), 'uint8'),
+               'viable': empty(M, bool_),
+               'rg': empty(M, float64),
+               'pairs': pairs}
+    for start in xrange(0, M, chunk_size):
+        stop = min(start + chunk_size, M)
+        _score_chunk(coords[start:stop], pairs, epsilon, results, start)
+    return results
+
+def _score_chunk(coords, pairs, epsilon, results, start):
+    ### fill rows start to start+len(coords) of results
+    stop = start + len(coords)
+    n = coords.shape[1]
+    x = coords[:,:,0]
+    y = coords[:,:,1]
+
+    # contacts are pairs of monomers one lattice space apart
+    dx = x[:,pairs[:,0]] - x[:,pairs[:,1]]
+    dy = y[:,pairs[:,0]] - y[:,pairs[:,1]]
+    formed = (abs(dx) + abs(dy)) == 1
+    ncontacts = formed.sum(axis=1)
+    results['ncontacts'][start:stop] = ncontacts
+    results['energy'][start:stop] = ncontacts * epsilon
+    if len(pairs) > 0:
+        results['contacts'][start:stop] = packbits(formed, axis=1)
+
+    # a chain is viable if no two monomers occupy the same lattice site
+    keys = sort((x + n) * (2 * n + 1) + (y + n), axis=1)
+    results['viable'][start:stop] = ~(keys[:,1:] == keys[:,:-1]).any(axis=1)
+
+    xc = x - x.mean(axis=1)[:,None]
+    yc = y - y.mean(axis=1)[:,None]
+    results['rg'][start:stop] = sqrt((xc * xc + yc * yc).mean(axis=1))
+
+def unpack_contacts(results, idx):
+    """
+    Convert the contact bitmask of one conformation scored by
+    :func:`score_conformations` to a list of contacts.
+
+    :param dict results: returned by :func:`score_conformations`
+    :param int idx: the index of a conformation
+    :return: list of ``(idx1, idx2)`` contacts (tuples), the same list that
+             :meth:`hplattice.Chain.Chain.energy` returns
+    :rtype: list
+    """
+    pairs = results['pairs']
+    formed = unpackbits(results['contacts'][idx])[:len(pairs)]
+    return [tuple(p) for p in pairs[nonzero(formed)[0]].tolist()]
@@ -1,10 +1,31 @@
-def open_file_stream(filename):
+from threading import Thread
+from Queue import Queue, Empty
+
+
+def open_file_stream(filename, mode='w'):
     """
     Helper function to open a file for writing.
 
     :param str filename: open this path for writing
+    :param str mode: optional, ``'w'`` to overwrite or ``'a'`` to append
     """
-    return open(filename, 'w')
+    return open(filename, mode)
+
+def format_xyz_frame(hp_string, coord_array, frame_num):
+    """
+    Format chain coordinates as one frame of an xyz file.
+
+    :param str hp_string: example ``HPHPHPPPHHP``
+    :param coord_array: 2D array of monomer coordinates
+    :type coord_array: :class:`numpy.ndarray`
+    :param int frame_num: frame number, written on the comment line
+    :return: the formatted frame
+    :rtype: str
+    """
+    coord_strings = \
+        ["%s\t%.1f\t%.1f\t%.1f\n" % (hp, row[0], row[1], 0.0) for hp, row in zip(hp_string, coord_array)]
+    num_atoms = coord_array.shape[0]
+    return "%d\nFrame %d\n%s" % (num_atoms, frame_num, "".join(coord_strings))
 
 
 class Trajectory(object):
@@ -17,13 +38,20 @@ class Trajectory(object):
     :param str trajectory_filename: write trajectory to this path
     :param open_stream_fcn: optional, call this function to open an output stream
     :type open_stream_fcn: callable
+    :param bool append: optional, ``True`` to append to an existing
+                        trajectory instead of overwriting it, for example
+                        when restarting a simulation from a checkpoint.
     """
     def __init__(self, save_trajectory, trajectory_filename,
-                 open_stream_fcn=open_file_stream):
+                 open_stream_fcn=open_file_stream, append=False):
         self.save_trajectory = save_trajectory
         self.trajectory_filename = trajectory_filename
         if self.save_trajectory:
-            self.output_stream = open_stream_fcn(self.trajectory_filename)
+            if append:
+                self.output_stream = \
+                    open_stream_fcn(self.trajectory_filename, 'a')
+            else:
+                self.output_stream = open_stream_fcn(self.trajectory_filename)
         else:
             self.output_stream = None
         self.frame_num = 0
@@ -37,18 +65,41 @@ class Trajectory(object):
         """
         if self.save_trajectory:
             # save chain coords in xyz format
-            hp_string = chain.get_hp_string()
-            coord_array = chain.get_coord_array()
-            coord_strings = \
-                ["%s\t%.1f\t%.1f\t%.1f\n" % (hp, row[0], row[1], 0.0) for hp, row in zip(hp_string, coord_array)]
-            coord_str = "".join(coord_strings)
-            num_atoms = coord_array.shape[0]
-            self.output_stream.write("%d\nFrame %d\n" % (num_atoms, self.frame_num))
-            self.output_stream.write(coord_str)
+            self.output_stream.write(
+                format_xyz_frame(chain.get_hp_string(),
+                                 chain.get_coord_array(), self.frame_num))
             self.frame_num += 1
         else:
             pass
 
+    def get_position(self):
+        """
+        Flush the output stream and report how much has been written so far,
+        so that the trajectory can later be rewound to this point with
+        :meth:`set_position`.
+
+        :return: ``(frame_num, byte_offset)``
+        :rtype: tuple
+        """
+        if self.output_stream:
+            self.output_stream.flush()
+            return self.frame_num, self.output_stream.tell()
+        else:
+            return self.frame_num, 0
+
+    def set_position(self, frame_num, byte_offset):
+        """
+        Discard anything written after a position reported by
+        :meth:`get_position`, and continue frame numbering from there.
+
+        :param int frame_num: number of the next frame to write
+        :param int byte_offset: truncate the output stream to this size
+        """
+        self.frame_num = frame_num
+        if self.output_stream:
+            self.output_stream.truncate(byte_offset)
+            self.output_stream.seek(0, 2)
+
     def finalize(self):
         """
         Close any open output streams.
@@ -57,3 +108,115 @@ class Trajectory(object):
             self.output_stream.close()
         else:
             pass
+
+
+class BufferedTrajectory(Trajectory):
+    """
+    A :class:`Trajectory` that keeps formatting and disk I/O off the
+    simulation thread. :meth:`snapshot` copies the chain coordinates once and
+    puts them on a bounded queue. A background thread takes frames off the
+    queue, formats them, and writes them in batches. Use it in place of
+    :class:`Trajectory` by passing it to the lattice factory::
+
+        lattice_factory = LatticeFactory(trajectory_cls=BufferedTrajectory)
+
+    :param bool save_trajectory: ``True`` if trajectory should be saved to
+                                 output stream.
+    :param str trajectory_filename: write trajectory to this path
+    :param open_stream_fcn: optional, call this function to open an output stream
+    :type open_stream_fcn: callable
+    :param bool append: optional, ``True`` to append to an existing trajectory
+    :param int max_queued_frames: optional, :meth:`snapshot` blocks when this
+                                  many frames are waiting to be written.
+    :param int frames_per_write: optional, the largest number of frames
+                                 joined into a single write.
+    """
+    def __init__(self, save_trajectory, trajectory_filename,
+                 open_stream_fcn=open_file_stream, append=False,
+                 max_queued_frames=1000, frames_per_write=100):
+        super(BufferedTrajectory, self).__init__(
+            save_trajectory, trajectory_filename, open_stream_fcn, append)
+        self.frames_per_write = frames_per_write
+        self.writer_error = None
+        if self.save_trajectory:
+            self.frame_queue = Queue(maxsize=max_queued_frames)
+            self.writer_thread = Thread(target=self._write_frames)
+            self.writer_thread.daemon = True
+            self.writer_thread.start()
+        else:
+            self.frame_queue = None
+            self.writer_thread = None
+
+    def _write_frames(self):
+        ### runs on the background thread until it receives None
+        done = False
+        while not done:
+            frames = [self.frame_queue.get()]
+            while len(frames) < self.frames_per_write:
+                try:
+                    frames.append(self.frame_queue.get_nowait())
+                except Empty:
+                    break
+            if frames[-1] is None:
+                frames.pop()
+                done = True
+            try:
+                if self.writer_error is None:
+                    self.output_stream.write(
+                        "".join([format_xyz_frame(*f) for f in frames]))
+            except Exception, e:
+                self.writer_error = e
+            for i in range(len(frames) + done):
+                self.frame_queue.task_done()
+
+    def _check_writer(self):
+        ### re-raise errors from the background thread on this thread
+        if self.writer_error is not None:
+            raise self.writer_error
+
+    def snapshot(self, chain):
+        """
+        Queue coordinates of chain to be written to output stream.
+
+        :param chain: Save coords of this chain.
+        :type chain: :class:`hplattice.Chain.Chain`
+        """
+        if self.save_trajectory:
+            self._check_writer()
+            frame = (chain.get_hp_string(), chain.get_coord_array().copy(),
+                     self.frame_num)
+            self.frame_queue.put(frame)
+            self.frame_num += 1
+        else:
+            pass
+
+    def flush(self):
+        """
+        Wait until every queued frame has been written.
+        """
+        if self.save_trajectory:
+            self.frame_queue.join()
+            self._check_writer()
+
+    def get_position(self):
+        """
+        Write all queued frames, then report the position as in
+        :meth:`Trajectory.get_position`.
+
+        :return: ``(frame_num, byte_offset)``
+        :rtype: tuple
+        """
+        self.flush()
+        return super(BufferedTrajectory, self).get_position()
+
+    def finalize(self):
+        """
+        Write all queued frames, stop the background thread, and close the
+        output stream.
+        """
+        if self.writer_thread is not None:
+            self.frame_queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+        super(BufferedTrajectory, self).finalize()
+        self._check_writer()
@@ -0,0 +1,141 @@
+from numpy import asarray, arange, zeros, log, exp, isfinite, \
+                  newaxis, dot, inf, float64, errstate
+
+from .Monty import BOLTZ_CONST
+
+
+def logsumexp(a, axis):
+    """
+    Compute :math:`\log \sum e^a` along an axis without overflow.
+
+    :param a: array of exponents, may contain ``-inf``
+    :type a: :class:`numpy.ndarray`
+    :param int axis: sum along this axis
+    :rtype: :class:`numpy.ndarray`
+    """
+    amax = a.max(axis=axis)
+    amax[~isfinite(amax)] = 0.0
+    if axis == 0:
+        shifted = a - amax[newaxis, :]
+    else:
+        shifted = a - amax[:, newaxis]
+    # levels that are never sampled give log(0) = -inf
+    with errstate(divide='ignore'):
+        return log(exp(shifted).sum(axis=axis)) + amax
+
+
+class WHAM(object):
+    """
+    Combine energy histograms sampled at several temperatures into one
+    estimate of the density of states with the weighted histogram analysis
+    method (Ferrenberg and Swendsen, 1989), then reweight it to compute
+    thermodynamic averages at any temperature.
+
+    The energies of an HP chain are discrete (a whole number of contacts
+    times :math:`\epsilon`), so the histograms are exact and no binning is
+    involved. In that case the WHAM solution is identical to the MBAR
+    solution for the same samples. The histograms must be sampled without a
+    distance restraint (*KSPRING* = 0), because they only record the
+    contact energy.
+
+    :param list temps: temperature (K) of each histogram
+    :param counts: 2D array of counts, one row per temperature and one column
+                   per energy level
+    :type counts: :class:`numpy.ndarray`
+    :param energies: energy of each level (kcal/mol)
+    :type energies: :class:`numpy.ndarray`
+    """
+    def __init__(self, temps, counts, energies):
+        self.temps = asarray(temps, float64)
+        self.counts = asarray(counts, float64)
+        self.energies = asarray(energies, float64)
+        self.log_g = None
+        self.f = None
+        self.num_iterations = 0
+
+    def solve(self, tol=1e-10, max_iterations=100000):
+        """
+        Iterate the WHAM equations until the dimensionless free energies of
+        the temperatures change by less than *tol*. Each iteration is a pair
+        of vectorized log-sum-exp reductions over the
+        (temperatures :math:`\\times` energy levels) grid.
+
+        :param float tol: optional, convergence threshold
+        :param int max_iterations: optional, give up after this many iterations
+        :return: the log of the density of states, relative to the first
+                 sampled energy level. Unsampled levels are ``-inf``.
+        :rtype: :class:`numpy.ndarray`
+        """
+        # only temperatures with samples contribute
+        sampled = self.counts.sum(axis=1) > 0
+        counts = self.counts[sampled]
+        beta = 1.0 / (BOLTZ_CONST * self.temps[sampled])
+        log_N = log(counts.sum(axis=1))
+        H = counts.sum(axis=0)
+        log_H = zeros(len(H))
+        log_H[H > 0] = log(H[H > 0])
+        log_H[H == 0] = -inf
+        beta_E = beta[:, newaxis] * self.energies[newaxis, :]
+
+        f = zeros(len(beta))
+        for i in xrange(max_iterations):
+            log_g = log_H - logsumexp(log_N[:, newaxis] + f[:, newaxis] -
+                                      beta_E, axis=0)
+            new_f = -logsumexp(log_g[newaxis, :] - beta_E, axis=1)
+            new_f -= new_f[0]
+            delta = abs(new_f - f).max()
+            f = new_f
+            if delta < tol:
+                break
+        self.num_iterations = i + 1
+
+        log_g = log_g - log_g[H > 0][0]
+        self.log_g = log_g
+        self.f = zeros(len(self.temps))
+        self.f[sampled] = f
+        return self.log_g
+
+    def thermodynamics(self, temps):
+        """
+        Reweight the density of states to arbitrary temperatures. Calls
+        :meth:`solve` first if necessary.
+
+        :param list temps: temperatures (K)
+        :return: for each temperature, the mean energy (``'energy'``), the
+                 heat capacity in kcal/mol/K (``'heat_capacity'``), the free
+                 energy relative to an arbitrary constant (``'free_energy'``),
+                 and the probability of each energy level
+                 (``'populations'``, one row per temperature).
+        :rtype: dict
+        """
+        if self.log_g is None:
+            self.solve()
+        temps = asarray(temps, float64)
+        kT = BOLTZ_CONST * temps
+        log_w = self.log_g[newaxis, :] - \
+                self.energies[newaxis, :] / kT[:, newaxis]
+        log_Z = logsumexp(log_w, axis=1)
+        populations = exp(log_w - log_Z[:, newaxis])
+        U = dot(populations, self.energies)
+        U2 = dot(populations, self.energies**2)
+        return {'energy': U,
+                'heat_capacity': (U2 - U**2) / (BOLTZ_CONST * temps**2),
+                'free_energy': -kT * log_Z,
+                'populations': populations}
+
+
+def wham_from_sampler(sampler):
+    """
+    Build a :class:`WHAM` object from the energy histograms that an
+    :class:`hplattice.MCSampler.MCSampler` collected during its most recent
+    run. Only replicas with the first Hamiltonian contribute to the
+    histograms.
+
+    :param sampler: a sampler that has run :meth:`do_mc_sampling`
+    :type sampler: :class:`hplattice.MCSampler.MCSampler`
+    :rtype: :class:`WHAM`
+    """
+    counts = sampler.energy_histograms
+    epsilon = sampler.config.get_hamiltonian(0)['epsilon']
+    energies = arange(counts.shape[1]) * epsilon
+    return WHAM(sampler.config.REPLICATEMPS, counts, energies)
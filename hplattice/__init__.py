@@ -1,8 +1,10 @@
 from .Chain import Chain
 from .Config import Config
-from .Trajectory import Trajectory
+from .Trajectory import Trajectory, BufferedTrajectory
 from .Monty import Monty
 from .Replica import Replica
+from .EnergyLog import EnergyLog
+from .Metrics import MetricsExporter
 
 
 class LatticeFactory(object):
@@ -16,15 +18,21 @@ class LatticeFactory(object):
     :param callable monty_cls: optional, monte carlo sampler class
     :param callable trajectory_cls: optional, trajectory class
     :param callable conf_cls: optional, HP configuration class
+    :param callable energy_log_cls: optional, energy log class
+    :param callable metrics_exporter_cls: optional, metrics exporter class
 
     """
     def __init__(self, chain_cls=Chain, replica_cls=Replica, monty_cls=Monty,
-                 trajectory_cls=Trajectory, conf_cls=Config):
+                 trajectory_cls=Trajectory, conf_cls=Config,
+                 energy_log_cls=EnergyLog,
+                 metrics_exporter_cls=MetricsExporter):
         self.chain_cls = chain_cls
         self.replica_cls = replica_cls
         self.monty_cls = monty_cls
         self.trajectory_cls = trajectory_cls
         self.conf_cls = conf_cls
+        self.energy_log_cls = energy_log_cls
+        self.metrics_exporter_cls = metrics_exporter_cls
 
     def make_chain(self, *args, **kwargs):
         """
@@ -55,3 +63,15 @@ class LatticeFactory(object):
         Make a configuration object.
         """
         return self.conf_cls(*args, **kwargs)
+
+    def make_energy_log(self, *args, **kwargs):
+        """
+        Make an energy log object.
+        """
+        return self.energy_log_cls(*args, **kwargs)
+
+    def make_metrics_exporter(self, *args, **kwargs):
+        """
+        Make a metrics exporter object.
+        """
+        return self.metrics_exporter_cls(*args, **kwargs)
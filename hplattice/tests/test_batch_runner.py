@@ -0,0 +1,50 @@
+import pytest
+from .. import LatticeFactory
+from ..BatchRunner import BatchRunner
+
+
+@pytest.fixture
+def lattice_factory():
+    return LatticeFactory()
+
+@pytest.fixture
+def conf(lattice_factory):
+    conf = lattice_factory.make_configuration()
+    conf.STOPATNATIVE = False
+    conf.MCSTEPS = 200
+    conf.SWAPEVERY = 10
+    conf.PRINTEVERY = 100
+    return conf
+
+def test_overrides_are_applied_to_each_job(lattice_factory, conf):
+    runner = BatchRunner(lattice_factory, conf)
+    jobs = runner.make_jobs(['HPPH', 'HHPPHH'],
+                            overrides={'eps': -3.0,
+                                       'REPLICATEMPS': [300.0, 400.0]})
+    assert len(jobs) == 2
+    mode, factory, job_conf, seed = jobs[1]
+    assert job_conf.HPSTRING == 'HHPPHH'
+    assert job_conf.INITIALVEC == [0, 0, 0, 0, 0]
+    assert job_conf.NREPLICAS == 2
+    assert job_conf.epsilon == -3.0 * conf.k * conf.T
+    assert seed == conf.randseed + 1
+    # the base configuration is unchanged
+    assert conf.NREPLICAS == 8
+
+def test_enumerate_batch_counts_conformations(lattice_factory, conf):
+    runner = BatchRunner(lattice_factory, conf, mode='enumerate')
+    rows = runner.run(['HPPH', 'HHPPHH'])
+    assert [row['hpstring'] for row in rows] == ['HPPH', 'HHPPHH']
+    assert rows[0]['max_contacts'] == 1
+    assert rows[0]['ground_state_degeneracy'] == 1
+    assert rows[1]['max_contacts'] == 2
+
+def test_seeded_runs_are_reproducible_across_processes(lattice_factory, conf):
+    serial = BatchRunner(lattice_factory, conf, num_processes=1)
+    parallel = BatchRunner(lattice_factory, conf, num_processes=2)
+    hp_strings = ['HHPPHH', 'HPHPPHPH']
+    serial_rows = serial.run(hp_strings)
+    parallel_rows = parallel.run(hp_strings)
+    for row1, row2 in zip(serial_rows, parallel_rows):
+        assert row1['mc_acceptance'] == row2['mc_acceptance']
+        assert row1['min_energy'] == row2['min_energy']
@@ -80,3 +80,24 @@ def test_leading0_first_turn1_is_nonsymmetric(chain1, chain2, chain3):
     assert not chain1.nonsym()
     assert not chain2.nonsym()
     assert chain3.nonsym()
+
+def test_update_chain_swaps_buffers(chain2):
+    proposal = chain2.nextvec
+    chain2.do_three_bead_flip(1)
+    chain2.nextviable()
+    chain2.update_chain()
+    assert chain2.vec is proposal
+    assert chain2.nextvec.as_npy_array().tolist() == [1, 3, 2]
+    assert (chain2.nextcoords.as_npy_array() ==
+            chain2.coords.as_npy_array()).all()
+
+def test_reset_proposal_discards_move(chain1):
+    vec = chain1.vec.as_npy_array().tolist()
+    coords = chain1.coords.as_npy_array().copy()
+    chain1.do_rigid_rot(vecindex=3, direction=1)
+    chain1.do_crankshaft(0)
+    chain1.nextviable()
+    chain1.reset_proposal()
+    assert chain1.vec.as_npy_array().tolist() == vec
+    assert chain1.nextvec.as_npy_array().tolist() == vec
+    assert (chain1.nextcoords.as_npy_array() == coords).all()
@@ -0,0 +1,66 @@
+import pytest
+import numpy
+from ..Convergence import effective_sample_size, histogram_change, \
+                          BlockedSeries, ConvergenceMonitor
+
+
+def test_effective_sample_size_of_correlated_series():
+    rng = numpy.random.RandomState(0)
+    noise = rng.normal(size=20000)
+    assert effective_sample_size(noise) == pytest.approx(20000, rel=0.1)
+    # AR(1) with phi = 0.9 has tau = (1 + phi) / (1 - phi) = 19
+    x = numpy.zeros(20000)
+    for k in range(1, len(x)):
+        x[k] = 0.9 * x[k - 1] + noise[k]
+    assert effective_sample_size(x) == pytest.approx(20000 / 19.0, rel=0.25)
+    assert effective_sample_size([3] * 100) == 0.0
+
+def test_blocked_series_keeps_effective_sample_size_in_bounded_memory():
+    rng = numpy.random.RandomState(0)
+    noise = rng.normal(size=50000)
+    x = numpy.zeros(50000)
+    for k in range(1, len(x)):
+        x[k] = 0.9 * x[k - 1] + noise[k]
+    series = BlockedSeries(max_blocks=512)
+    for value in x:
+        series.append(value)
+    assert len(series) == 50000
+    assert len(series.blocks) < 512
+    assert series.effective_sample_size() == \
+           pytest.approx(50000 / 19.0, rel=0.25)
+    constant = BlockedSeries(max_blocks=4)
+    for k in range(100):
+        constant.append(3)
+    assert constant.effective_sample_size() == 0.0
+
+def test_histogram_change_is_total_variation_distance():
+    old = numpy.array([[2, 2, 0], [0, 0, 0]])
+    new = numpy.array([[1, 2, 1], [1, 0, 0]])
+    assert histogram_change(old, new).tolist() == [0.25, 1.0]
+
+def test_monitor_requires_every_rule_that_is_on():
+    monitor = ConvergenceMonitor(1, round_trips=2, histogram_tolerance=0.1)
+    hist = numpy.array([[5, 5]])
+    # the first check has no earlier histogram to compare with
+    assert not monitor.check(3, hist)
+    assert monitor.check(3, hist * 2)
+    assert not monitor.check(1, hist * 3)
+
+def test_monitor_compares_disjoint_halves():
+    monitor = ConvergenceMonitor(1, histogram_tolerance=0.1)
+    # ten checks in one bin, then ten in another: the cumulative histogram
+    # hardly changes between the last two checks, but the halves differ
+    for k in range(1, 11):
+        monitor.check(0, numpy.array([[10 * k, 0]]))
+    for k in range(1, 11):
+        assert not monitor.check(0, numpy.array([[100, 10 * k]]))
+    assert monitor.histogram_change.tolist() == [1.0]
+    # only a bounded number of checks is kept
+    for k in range(11, 200):
+        monitor.check(0, numpy.array([[100, 10 * k]]))
+    assert len(monitor.checked_histograms) <= monitor.max_checks
+    # both halves sample both bins alike
+    monitor = ConvergenceMonitor(1, histogram_tolerance=0.1)
+    for k in range(1, 5):
+        monitor.check(0, numpy.array([[5 * k, 5 * k]]))
+    assert monitor.check(0, numpy.array([[25, 25]]))
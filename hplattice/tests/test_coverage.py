@@ -0,0 +1,39 @@
+import pytest
+import numpy
+from ..Chain import Chain
+from ..Coverage import canonical_vec, conformation_key, VisitedSet
+
+
+@pytest.fixture
+def vec():
+    return numpy.array([2, 2, 3, 0, 3, 2, 1, 2], numpy.int32)
+
+def _symmetric_images(vec):
+    ### the four rotations of vec and of its mirror image
+    images = []
+    for v in (vec, (4 - vec) % 4):
+        for rotation in range(4):
+            images.append((v + rotation) % 4)
+    return images
+
+def test_symmetric_conformations_have_the_same_key(vec):
+    keys = set([conformation_key(v) for v in _symmetric_images(vec)])
+    assert len(keys) == 1
+    assert conformation_key(vec) != conformation_key(vec[::-1])
+
+def test_canonical_conformation_is_nonsymmetric(vec):
+    for v in _symmetric_images(vec):
+        chain = Chain('H' * (len(v) + 1), canonical_vec(v).tolist())
+        assert chain.nonsym()
+
+def test_visited_set_estimates_count_beyond_cap():
+    visited = VisitedSet(max_exact=1000)
+    for i in range(1000):
+        visited.add(i)
+        visited.add(i)
+    assert visited.is_exact()
+    assert visited.count() == 1000
+    for i in range(20000):
+        visited.add(str(i))
+    assert not visited.is_exact()
+    assert abs(visited.count() - 21000) < 0.05 * 21000
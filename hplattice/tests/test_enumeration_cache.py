@@ -0,0 +1,40 @@
+import os
+import pytest
+from .. import LatticeFactory
+from ..Enumerator import Enumerator
+from ..EnumerationCache import EnumerationCache
+
+
+@pytest.fixture
+def conf(tmpdir):
+    conf = LatticeFactory().make_configuration()
+    conf.HPSTRING = 'HPHPPHHPH'
+    conf.INITIALVEC = [0] * 8
+    conf.ENUMCACHEDIR = str(tmpdir.join('cache'))
+    return conf
+
+def test_second_enumeration_is_read_from_cache(conf, monkeypatch):
+    lattice_factory = LatticeFactory()
+    first = Enumerator(lattice_factory, conf).enumerate_states()
+    en = Enumerator(lattice_factory, conf)
+    def fail():
+        raise AssertionError('enumerated again')
+    monkeypatch.setattr(en, 'conformations', fail)
+    assert en.enumerate_states() == first
+    # other sequences are not hits
+    conf.HPSTRING = 'HPHPPHHPP'
+    assert Enumerator(lattice_factory, conf).cache.get(conf.HPSTRING) is None
+
+def test_least_recently_used_results_are_evicted(tmpdir):
+    cache = EnumerationCache(str(tmpdir), max_bytes=10**6)
+    for idx, hpstring in enumerate(['HPPH', 'HHPH', 'HPHH']):
+        cache.put(hpstring, {'nconfs': idx})
+        path = cache._path(cache.get_key(hpstring))
+        os.utime(path, (idx, idx))
+    assert cache.get('HPPH') == {'nconfs': 0}
+    size = os.path.getsize(path)
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert cache.get('HHPH') is None
+    assert cache.get('HPPH') == {'nconfs': 0}
+    assert cache.get('HPHH') == {'nconfs': 2}
@@ -0,0 +1,36 @@
+import pytest
+from .. import LatticeFactory
+from ..FoldingTimes import FoldingTimes, summarize_first_passage
+
+
+@pytest.fixture
+def lattice_factory():
+    return LatticeFactory()
+
+@pytest.fixture
+def conf(lattice_factory):
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HHPPHH'
+    conf.INITIALVEC = [0] * 5
+    conf.MCSTEPS = 2000
+    conf.MOVESET = 'MS2'
+    return conf
+
+def test_first_passage_times_do_not_depend_on_processes(lattice_factory,
+                                                        conf):
+    native = [(0, 5), (1, 4)]
+    ft = FoldingTimes(lattice_factory, conf, native)
+    results = ft.run(12, temp=275.0)
+    times = results['first_passage']
+    assert len(times) == 12
+    assert results['fraction_folded'] > 0.5
+    assert results['ci'][0] <= results['mean'] <= results['ci'][1]
+    ft = FoldingTimes(lattice_factory, conf, native, num_processes=2)
+    assert (ft.run(12, temp=275.0)['first_passage'] == times).all()
+
+def test_summary_accounts_for_unfolded_trajectories():
+    results = summarize_first_passage([10, 30, -1, -1], 100)
+    assert results['fraction_folded'] == 0.5
+    assert results['mean'] == 20.0
+    assert results['mle_mean'] == 120.0
+    assert summarize_first_passage([-1], 100)['mean'] is None
@@ -0,0 +1,66 @@
+import pytest
+import numpy
+from .. import util
+from ..util import numpy_kernels
+
+
+@pytest.fixture
+def vecs():
+    rng = numpy.random.RandomState(7)
+    vecs = [numpy.array(v, numpy.int32) for v in
+            ([0, 0, 1, 2, 1], [1, 2, 3], [0, 1, 2], [0, 0, 0], [0, 0, 3],
+             [1, 1, 1, 0, 3, 3, 3, 0, 1, 1, 1, 0, 3, 3, 3],
+             [0, 1, 2, 2, 3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 2])]
+    vecs += [rng.randint(0, 4, size=11).astype(numpy.int32)
+             for i in range(50)]
+    return vecs
+
+def _all_pairs_energy(epsilon, coords, H_inds):
+    ### reference: check every pair of H monomers
+    contacts = []
+    for i, h1 in enumerate(H_inds):
+        for h2 in H_inds[i+1:]:
+            d = ((coords[h1] - coords[h2])**2).sum()
+            if h2 - h1 >= 3 and d == 1:
+                contacts.append((h1, h2))
+    return len(contacts) * epsilon, contacts
+
+@pytest.fixture
+def backend(request):
+    ### run a test with each available backend, then restore the default
+    if request.param not in util.available_backends():
+        pytest.skip('%s backend not available' % request.param)
+    previous = util.get_backend()
+    util.set_backend(request.param)
+    yield request.param
+    util.set_backend(previous)
+
+@pytest.mark.parametrize('backend', util.BACKENDS, indirect=True)
+def test_kernels_match_numpy_implementation(backend, vecs):
+    for vec in vecs:
+        n = len(vec) + 1
+        coords = util.vec2coords(vec, numpy.zeros((n, 2), numpy.int32))
+        expected = numpy_kernels.vec2coords(vec,
+                                            numpy.zeros((n, 2), numpy.int32))
+        assert (coords == expected).all()
+        assert util.check_viability(coords) == \
+            numpy_kernels.viability(expected)
+        assert util.is_nonsym(vec) == numpy_kernels.is_nonsym(vec)
+        if util.check_viability(coords):
+            H_inds = numpy.arange(0, n, dtype=numpy.int32)
+            assert util.compute_energy(-2.0, coords, H_inds) == \
+                _all_pairs_energy(-2.0, coords, H_inds)
+
+@pytest.mark.parametrize('backend', util.BACKENDS, indirect=True)
+def test_shift_increments_last_vec(backend):
+    vec = numpy.array([0, 1, 1], numpy.int32)
+    coords = util.vec2coords(vec, numpy.zeros((4, 2), numpy.int32))
+    is_done, vec, coords = util.do_shift(vec, coords)
+    assert not is_done
+    assert vec.tolist() == [0, 1, 2]
+    assert coords[-1].tolist() == [1, 0]
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        util.set_backend('fortran')
+    assert util.get_backend() in util.BACKENDS
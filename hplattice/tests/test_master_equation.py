@@ -0,0 +1,64 @@
+import pytest
+import numpy
+from .. import LatticeFactory
+from ..Monty import BOLTZ_CONST
+
+pytest.importorskip('scipy')
+from ..MasterEquation import MasterEquation
+
+
+@pytest.fixture(params=['MS1', 'MS2'])
+def master_equation(request):
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHH'
+    conf.MOVESET = request.param
+    return MasterEquation(lattice_factory, conf, temp=300.0)
+
+def _degeneracy(vec):
+    ### the number of distinct rotations and reflections of a conformation
+    images = set()
+    for v in (vec, (4 - vec) % 4):
+        for r in range(4):
+            images.add(tuple((v + r) % 4))
+    return len(images)
+
+def test_transition_matrix_is_stochastic(master_equation):
+    P = master_equation.transition_matrix
+    assert P.shape[0] == len(master_equation.vecs)
+    assert numpy.allclose(P * numpy.ones(P.shape[0]), 1.0)
+    assert P.min() >= 0.0
+
+def test_equilibrium_populations_are_boltzmann(master_equation):
+    pi = master_equation.equilibrium_populations()
+    kT = BOLTZ_CONST * master_equation.temp
+    weights = numpy.array([_degeneracy(v) for v in master_equation.vecs]) * \
+        numpy.exp(-master_equation.energies / kT)
+    assert numpy.allclose(pi, weights / weights.sum())
+    eigenvalues, times = master_equation.relaxation_spectrum(5)
+    assert eigenvalues[0] == pytest.approx(1.0)
+    assert (numpy.diff(eigenvalues) <= 1e-12).all()
+    assert numpy.isinf(times[0]) and (times[1:] > 0).all()
+
+def test_mean_first_passage_times_to_native(master_equation):
+    ground = master_equation.energies.argmin()
+    native = master_equation.find_states(
+        master_equation.contact_states[ground])
+    assert len(native) > 0
+    mfpt = master_equation.mean_first_passage_times(native)
+    assert (mfpt[native] == 0).all()
+    start = master_equation.get_state([0] * 7)
+    assert mfpt[start] > 1.0
+    # one step of the chain: m_i = 1 + sum_j P_ij m_j off the targets
+    P = master_equation.transition_matrix
+    others = [i for i in range(len(mfpt)) if i not in native]
+    assert numpy.allclose((1.0 + P * mfpt)[others], mfpt[others])
+
+def test_moveset_that_splits_states_is_rejected():
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHPH'
+    conf.MOVESET = 'MS1'
+    with pytest.raises(ValueError) as excinfo:
+        MasterEquation(lattice_factory, conf, temp=300.0)
+    assert 'MS1' in str(excinfo.value)
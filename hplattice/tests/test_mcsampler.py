@@ -0,0 +1,242 @@
+import pytest
+import random
+import json
+import numpy
+from mock import Mock
+from .. import LatticeFactory
+from ..MCSampler import MCSampler
+from ..EnergyLog import read_energy_log
+
+
+@pytest.fixture
+def lattice_factory():
+    return LatticeFactory()
+
+@pytest.fixture
+def conf(lattice_factory):
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHPHH'
+    conf.INITIALVEC = [0] * 9
+    conf.NREPLICAS = 4
+    conf.REPLICATEMPS = [275.0, 300.0, 350.0, 450.0]
+    conf.STOPATNATIVE = False
+    conf.MCSTEPS = 400
+    conf.SWAPEVERY = 10
+    conf.PRINTEVERY = 50
+    conf.TRJEVERY = 50
+    conf.ENEEVERY = 10
+    return conf
+
+def _final_state(sampler):
+    return ([r.get_vec().as_npy_array().tolist() for r in sampler.replicas],
+            [r.get_T() for r in sampler.replicas],
+            [r.acceptedsteps for r in sampler.replicas],
+            sampler.swaps.tolist(), sampler.accepted_steps_at_T.tolist(),
+            sampler.round_trips.tolist())
+
+def test_restart_from_checkpoint_matches_uninterrupted_run(
+        lattice_factory, conf, tmpdir):
+    traj_name = 'traj.xyz'
+    random.seed(1)
+    s = MCSampler(lattice_factory, conf)
+    with tmpdir.as_cwd():
+        s.do_mc_sampling(save_trajectory=True,
+                         trajectory_filename='full_' + traj_name,
+                         energy_filename='full_energies.dat')
+    full_state = _final_state(s)
+    full_traj = tmpdir.join('000_full_' + traj_name).read()
+    full_energies = tmpdir.join('full_energies.dat').read('rb')
+
+    # stop half way through, then restart from the checkpoint
+    random.seed(1)
+    chk = str(tmpdir.join('run.chk.npz'))
+    conf.MCSTEPS = 200
+    s = MCSampler(lattice_factory, conf)
+    with tmpdir.as_cwd():
+        s.do_mc_sampling(save_trajectory=True, trajectory_filename=traj_name,
+                         checkpoint_filename=chk,
+                         energy_filename='energies.dat')
+    conf.MCSTEPS = 400
+    random.seed(2)
+    s = MCSampler(lattice_factory, conf)
+    with tmpdir.as_cwd():
+        s.do_mc_sampling(save_trajectory=True, trajectory_filename=traj_name,
+                         checkpoint_filename=chk, restart=True,
+                         energy_filename='energies.dat')
+    assert _final_state(s) == full_state
+    assert tmpdir.join('000_' + traj_name).read() == full_traj
+    assert tmpdir.join('energies.dat').read('rb') == full_energies
+
+def test_restart_keeps_coverage(lattice_factory, conf, tmpdir):
+    conf.TRACKCOVERAGE = True
+    conf.COVERAGECAP = 20
+    random.seed(1)
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    full_metrics = s.get_metrics(conf.MCSTEPS - 1)
+
+    random.seed(1)
+    chk = str(tmpdir.join('run.chk.npz'))
+    conf.MCSTEPS = 200
+    MCSampler(lattice_factory, conf).do_mc_sampling(checkpoint_filename=chk)
+    conf.MCSTEPS = 400
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling(checkpoint_filename=chk, restart=True)
+    metrics = s.get_metrics(conf.MCSTEPS - 1)
+    # a cap of 20 switches some counts to the sketch
+    assert not all([cov.conformations.is_exact() for cov in s.coverage])
+    for name in ('distinct_conformations', 'distinct_contact_states'):
+        assert metrics[name].tolist() == full_metrics[name].tolist()
+
+def test_energy_log_records_every_replica_at_eneevery(
+        lattice_factory, conf, tmpdir):
+    s = MCSampler(lattice_factory, conf)
+    filename = str(tmpdir.join('energies.dat'))
+    s.do_mc_sampling(energy_filename=filename)
+    log = read_energy_log(filename)
+    assert len(log) == conf.NREPLICAS * conf.MCSTEPS / conf.ENEEVERY
+    assert log['step'][:conf.NREPLICAS].tolist() == [0] * conf.NREPLICAS
+    assert log['step'][-1] == conf.MCSTEPS - conf.ENEEVERY
+    assert log['replica'][:conf.NREPLICAS].tolist() == range(conf.NREPLICAS)
+    assert (log['energy'] == log['ncontacts'] * conf.epsilon).all()
+    # no native contacts were loaded, so no replica is native
+    assert not log['native'].any()
+
+def test_round_trip_is_counted_after_visiting_highest_temperature(
+        lattice_factory, conf):
+    s = MCSampler(lattice_factory, conf)
+    s._init_mc_stats()
+    r = s.replicas[0]
+    for step, temp_index in [(10, 1), (20, 3), (30, 2), (40, 0)]:
+        r.mc.tempfromrep = temp_index
+        s._update_round_trips(step)
+    assert s.round_trips[0] == 1
+    assert s.round_trip_steps[0] == 40
+    assert s.round_trips[1:].sum() == 0
+
+def test_metrics_export_as_json_lines_and_prometheus(
+        lattice_factory, conf, tmpdir):
+    s = MCSampler(lattice_factory, conf)
+    jsonl_filename = str(tmpdir.join('metrics.jsonl'))
+    s.do_mc_sampling(metrics_filename=jsonl_filename)
+    lines = tmpdir.join('metrics.jsonl').readlines()
+    assert len(lines) == conf.MCSTEPS / conf.PRINTEVERY
+    metrics = json.loads(lines[-1])
+    assert metrics['step'] == conf.MCSTEPS - conf.PRINTEVERY
+    assert len(metrics['swap_acceptance']) == conf.NREPLICAS
+    assert len(metrics['move_acceptance']) == conf.NREPLICAS
+
+    prom_filename = str(tmpdir.join('metrics.prom'))
+    s.do_mc_sampling(metrics_filename=prom_filename,
+                     metrics_format='prometheus')
+    prom = tmpdir.join('metrics.prom').read()
+    assert 'hplattice_steps{hpstring="%s",replica="3"} %r' % \
+        (conf.HPSTRING, float(conf.MCSTEPS - conf.PRINTEVERY + 1)) in prom
+    assert 'hplattice_swap_acceptance{hpstring="%s",temp_i="0",temp_j="1"}' % \
+        conf.HPSTRING in prom
+
+def test_profiler_counts_phases_and_restores_methods(lattice_factory, conf):
+    conf.PROFILE = True
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    profile = s.profiler.get_profile()
+    calls, seconds = profile['move']
+    assert calls == conf.NREPLICAS * conf.MCSTEPS
+    calls, seconds = profile['swap']
+    assert calls == conf.MCSTEPS / conf.SWAPEVERY
+    # viable moves evaluate both the contact and the restraint energy,
+    # and swaps evaluate the contact energy
+    calls, seconds = profile['energy']
+    assert calls >= 2 * profile['metropolis'][0]
+    assert 'nextviable' not in s.replicas[0].chain.__dict__
+    assert '_attempt_swaps' not in s.__dict__
+
+def test_profiler_restores_methods_when_sampling_is_interrupted(
+        lattice_factory, conf):
+    conf.PROFILE = True
+    s = MCSampler(lattice_factory, conf)
+    interrupt = Mock(side_effect=KeyboardInterrupt)
+    s.replicas[0].record_stats = interrupt
+    with pytest.raises(KeyboardInterrupt):
+        s.do_mc_sampling()
+    assert s.replicas[0].record_stats is interrupt
+    assert 'nextviable' not in s.replicas[0].chain.__dict__
+    assert '_attempt_swaps' not in s.__dict__
+
+def test_single_replica_skips_swaps(lattice_factory, conf):
+    conf.SWAPMETHOD = 'random pair'
+    conf.NREPLICAS = 1
+    conf.REPLICATEMPS = [300.0]
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    assert s.swaps.sum() == 0
+    assert s.last_step == conf.MCSTEPS - 1
+
+def test_coverage_counts_distinct_states(lattice_factory, conf):
+    conf.TRACKCOVERAGE = True
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    metrics = s.get_metrics(conf.MCSTEPS - 1)
+    nconfs = metrics['distinct_conformations']
+    nstates = metrics['distinct_contact_states']
+    assert (nconfs > 1).all()
+    assert (nstates <= nconfs).all()
+    assert (nconfs <= 1 + s.accepted_steps_at_T.sum()).all()
+
+def test_hamiltonian_exchange_keeps_energies_consistent(lattice_factory, conf):
+    random.seed(3)
+    conf.NREPLICAS = 8
+    conf.RESTRAINED_STATE = [(0, 5), (2, 7)]
+    conf.HAMILTONIANS = [{'KSPRING': 0.0}, {'KSPRING': 0.1}]
+    conf.SWAPMETHOD = 'even odd'
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    assert s.H_swaps[0, 1] > 0
+    for r in s.replicas:
+        assert r.mc.lastenergy == pytest.approx(r.potential())
+    # each temperature holds each Hamiltonian once
+    grid = sorted((r.mc.tempfromrep, r.mc.hamfromrep) for r in s.replicas)
+    assert grid == [(t, h) for t in range(4) for h in range(2)]
+    metrics = s.get_metrics(conf.MCSTEPS - 1)
+    assert metrics['ham_swap_attempts'].shape == (2, 2)
+
+def test_hamiltonian_grid_must_match_nreplicas(lattice_factory, conf):
+    conf.HAMILTONIANS = [{}, {}]
+    conf.SWAPMETHOD = 'even odd'
+    with pytest.raises(ValueError):
+        MCSampler(lattice_factory, conf)
+
+def test_transition_counts_are_saved(lattice_factory, conf, tmpdir):
+    conf.MSMSTATES = 'contacts'
+    conf.MSMLAG = 5
+    s = MCSampler(lattice_factory, conf)
+    msm_name = str(tmpdir.join('msm.npz'))
+    s.do_mc_sampling(msm_filename=msm_name)
+    msm = numpy.load(msm_name)
+    assert int(msm['lag']) == 5
+    assert 0 < msm['counts'].sum() <= conf.NREPLICAS * (conf.MCSTEPS - 5)
+    assert msm['rows'].max() < int(msm['num_states'])
+    assert len(msm['state_keys']) == int(msm['num_states'])
+
+def test_run_stops_when_round_trips_are_reached(lattice_factory, conf):
+    random.seed(2)
+    conf.MCSTEPS = 5000
+    conf.SWAPMETHOD = 'even odd'
+    conf.STOPROUNDTRIPS = 2
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    results = s.get_results()
+    assert results['converged']
+    assert s.round_trips.sum() >= 2
+    assert results['steps'] < conf.MCSTEPS - 1
+    assert results['steps'] % conf.PRINTEVERY == 0
+    metrics = s.get_metrics(results['steps'])
+    assert metrics['energy_ess'].shape == (4,)
+
+def test_run_continues_until_energies_are_sampled(lattice_factory, conf):
+    random.seed(2)
+    conf.STOPESS = 1e6
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    assert not s.get_results()['converged']
+    assert s.last_step == conf.MCSTEPS - 1
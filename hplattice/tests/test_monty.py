@@ -1,6 +1,11 @@
 import pytest
+import random
+import itertools
+import numpy
 from mock import Mock
 from .. import LatticeFactory
+from ..Monty import DistRestraint, BOLTZ_CONST
+from ..Scoring import score_conformations
 
 
 @pytest.fixture
@@ -69,3 +74,49 @@ def test_move3_does_rigid_rotation(replica, mock_chain):
     direction = -1
     replica.mc.move3(mock_chain, vecindex=vecindex, direction=direction)
     mock_chain.do_rigid_rot.assert_called_once_with(vecindex, direction)
+
+def test_metropolis_judges_proposed_conformation(replica):
+    # rotating the last bond down forms the second native contact
+    replica.mc.move3(replica.chain, vecindex=4, direction=1)
+    assert replica.chain.nextviable()
+    assert replica.metropolis_accept_move()
+    assert replica.is_native()
+    assert replica.mc.lastenergy == replica.energy()
+    assert replica.chain.nextvec.as_npy_array().tolist() == [0, 0, 1, 2, 2]
+
+def test_restraint_distance_sums_squared_contact_distances():
+    lattice_factory = LatticeFactory()
+    chain = lattice_factory.make_chain('HHPPHH', [1,0,1,2,1])
+    restraint = DistRestraint([(0, 5), (1, 4), (0, 2)], 1.0)
+    coords = chain.get_coord_array()
+    expected = sum(((coords[c] - coords[d])**2).sum()
+                   for c, d in [(0, 5), (1, 4), (0, 2)])
+    assert restraint.D(chain) == expected
+    assert DistRestraint([], 1.0).D(chain) == 0.0
+
+@pytest.mark.parametrize('regrow_prob, regrow_length', [(1.0, 7), (0.5, 3)])
+def test_regrowth_samples_boltzmann_distribution(regrow_prob, regrow_length):
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHH'
+    conf.INITIALVEC = [0] * 7
+    conf.REPLICATEMPS = [350.0]
+    conf.NREPLICAS = 1
+    conf.REGROWPROB = regrow_prob
+    conf.REGROWLENGTH = regrow_length
+    vecs = numpy.array(list(itertools.product(range(4), repeat=7)))
+    scores = score_conformations(conf.HPSTRING, vecs=vecs)
+    ncontacts = scores['ncontacts'][scores['viable']]
+    weights = numpy.exp(-conf.epsilon * ncontacts / (BOLTZ_CONST * 350.0))
+    expected = numpy.bincount(ncontacts, weights=weights) / weights.sum()
+    random.seed(6)
+    r = lattice_factory.make_replica(lattice_factory, conf, 0)
+    observed = numpy.zeros(len(expected))
+    num_steps = 40000
+    for step in xrange(num_steps):
+        if r.propose_move():
+            r.metropolis_accept_move()
+        observed[len(r.contactstate())] += 1
+    assert r.chain.is_viable()
+    assert r.mc.lastenergy == pytest.approx(r.potential())
+    assert numpy.allclose(observed / num_steps, expected, atol=0.03)
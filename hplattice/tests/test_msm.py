@@ -0,0 +1,43 @@
+import pytest
+from mock import Mock
+from .. import LatticeFactory
+from ..MSM import TransitionCounter, contact_state_mapper, native_count_mapper
+
+
+def _replica(key, tempfromrep, hamfromrep=0):
+    r = Mock()
+    r.chain = key
+    r.mc.tempfromrep = tempfromrep
+    r.mc.hamfromrep = hamfromrep
+    return r
+
+def test_transitions_are_counted_at_lag_within_one_temperature():
+    counter = TransitionCounter(1, 2, 2, mapper=lambda chain: chain)
+    trajectory = [('a', 0), ('b', 0), ('c', 0), ('a', 0), ('b', 1), ('c', 1),
+                  ('a', 1)]
+    for step, (key, t) in enumerate(trajectory):
+        counter.record(step, [_replica(key, t)])
+    assert counter.state_keys == ['a', 'b', 'c']
+    # a->c and b->a at T0; the temperature change hides c->b and a->c
+    assert counter.counts[0] == {(0, 2): 1, (1, 0): 1}
+    rows, cols, counts = counter.get_counts(1)
+    assert (rows.tolist(), cols.tolist(), counts.tolist()) == \
+        ([1], [0], [1])
+
+def test_hamiltonian_swaps_restart_the_lag():
+    counter = TransitionCounter(1, 1, 1, mapper=lambda chain: chain)
+    trajectory = [('a', 0), ('b', 0), ('c', 1), ('a', 1), ('b', 0),
+                  ('c', 0)]
+    for step, (key, h) in enumerate(trajectory):
+        counter.record(step, [_replica(key, 0, h)])
+    # the first b->c and the second a->b cross a Hamiltonian swap, and c->a
+    # is at the second Hamiltonian
+    assert counter.counts[0] == {(0, 1): 1, (1, 2): 1}
+
+def test_mappers_label_contact_states():
+    chain = LatticeFactory().make_chain('HHPPHH', [1,1,2,3,3])
+    assert native_count_mapper([(0, 5), (1, 4), (0, 3)])(chain) == 2
+    straight = LatticeFactory().make_chain('HHPPHH', [0] * 5)
+    mapper = contact_state_mapper('HHPPHH')
+    assert mapper(straight) == 0
+    assert bin(mapper(chain)).count('1') == 2
@@ -0,0 +1,50 @@
+import pytest
+from .. import LatticeFactory
+from ..Enumerator import Enumerator
+from ..MCSampler import MCSampler
+from ..NativeDatabase import NativeDatabase, load_native_contacts
+
+
+@pytest.fixture
+def db(tmpdir):
+    db = NativeDatabase(str(tmpdir.join('natives.db')))
+    yield db
+    db.close()
+
+def test_import_clist_dir(db, tmpdir):
+    clist_dir = tmpdir.mkdir('hp06')
+    clist_dir.join('HHPPHH.clist').write('[(0, 5), (1, 4)]\n')
+    clist_dir.join('HPPHPH.clist').write('[(0, 3)]\n')
+    clist_dir.join('README').write('not a clist file\n')
+    assert db.import_clist_dir(str(clist_dir)) == 2
+    assert len(db) == 2
+    assert db.get_contacts('HHPPHH') == [(0, 5), (1, 4)]
+    assert db.get('HHHHHH') is None
+    with pytest.raises(KeyError):
+        db.get_contacts('HHHHHH')
+    db.put('HPPHPH', [(0, 3)], degeneracy=2, energy=-1.0, vec=[1, 0, 3, 3, 2])
+    assert db.get('HPPHPH') == {'contacts': [(0, 3)], 'degeneracy': 2,
+                                'energy': -1.0, 'vec': [1, 0, 3, 3, 2]}
+
+def test_add_enumeration_and_load_for_sampler(db):
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHPPHH'
+    conf.INITIALVEC = [0] * 9
+    result = Enumerator(lattice_factory, conf).enumerate_states()
+    assert db.add_enumeration(conf.HPSTRING, result, conf.epsilon)
+    native = db.get(conf.HPSTRING)
+    assert native['degeneracy'] == result['contacts'][len(native['contacts'])]
+    assert repr(native['contacts']) in result['contact_states']
+    # two contact states share the most contacts, so there is no native
+    degenerate = {'contacts': {0: 1, 1: 2},
+                  'contact_states': {'[]': 1, '[(0, 5)]': 1, '[(1, 4)]': 1}}
+    assert not db.add_enumeration('HHPPHH', degenerate, conf.epsilon)
+    assert db.get('HHPPHH') is None
+
+    conf.NATIVEDB = db.filename
+    conf.REPLICATEMPS = [275.0]
+    conf.NREPLICAS = 1
+    assert load_native_contacts(conf) == native['contacts']
+    s = MCSampler(lattice_factory, conf)
+    assert s.replicas[0].nativeclist == native['contacts']
@@ -0,0 +1,66 @@
+import pytest
+import random
+import itertools
+import numpy
+from .. import LatticeFactory
+from ..Monty import BOLTZ_CONST
+from ..NFoldWay import NFoldWay
+from ..Scoring import score_conformations
+
+
+@pytest.fixture
+def lattice_factory():
+    return LatticeFactory()
+
+@pytest.fixture
+def conf(lattice_factory):
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHH'
+    conf.INITIALVEC = [0] * 7
+    conf.MOVESET = 'MS2'
+    return conf
+
+def test_rates_match_master_equation(lattice_factory, conf):
+    pytest.importorskip('scipy')
+    from ..MasterEquation import MasterEquation
+    master_equation = MasterEquation(lattice_factory, conf, temp=300.0)
+    P = master_equation.transition_matrix
+    for vec in master_equation.vecs[::50]:
+        conf.INITIALVEC = vec.tolist()
+        move_list = NFoldWay(lattice_factory, conf, temp=300.0).get_move_list()
+        i = master_equation.get_state(vec)
+        # the master equation lumps rotations and reflections into one state
+        leave = sum([rate for v, rate in zip(move_list.vecs, move_list.rates)
+                     if master_equation.get_state(v) != i])
+        assert leave == pytest.approx(1.0 - P[i, i])
+
+def test_contact_histogram_is_boltzmann(lattice_factory, conf):
+    n = len(conf.HPSTRING)
+    vecs = numpy.array(list(itertools.product(range(4), repeat=n - 1)))
+    scores = score_conformations(conf.HPSTRING, vecs=vecs)
+    ncontacts = scores['ncontacts'][scores['viable']]
+    temp = 350.0
+    weights = numpy.exp(-conf.epsilon * ncontacts / (BOLTZ_CONST * temp))
+    expected = numpy.bincount(ncontacts, weights=weights) / weights.sum()
+    random.seed(5)
+    nfold = NFoldWay(lattice_factory, conf, temp=temp)
+    results = nfold.run(2000000)
+    assert results['steps'] == 2000000
+    assert results['contact_histogram'].sum() == 2000000
+    # far fewer moves than monte carlo steps
+    assert results['moves'] < results['steps'] / 10
+    observed = results['contact_histogram'][:len(expected)] / 2000000.0
+    assert numpy.allclose(observed, expected, atol=0.03)
+
+def test_run_stops_at_native(lattice_factory, conf):
+    n = len(conf.HPSTRING)
+    vecs = numpy.array(list(itertools.product(range(4), repeat=n - 1)))
+    scores = score_conformations(conf.HPSTRING, vecs=vecs)
+    ground = numpy.argmax(scores['ncontacts'] * scores['viable'])
+    native = lattice_factory.make_chain(conf.HPSTRING,
+                                        vecs[ground].tolist()).contactstate()
+    random.seed(2)
+    nfold = NFoldWay(lattice_factory, conf, temp=300.0)
+    results = nfold.run(10**6, native_contacts=native)
+    assert results['first_passage'] == results['steps'] == nfold.clock
+    assert nfold.replica.contactstate() == native
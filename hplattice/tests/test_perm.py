@@ -0,0 +1,42 @@
+import pytest
+import random
+import itertools
+import numpy
+from .. import LatticeFactory
+from ..PERM import PERMSampler
+from ..Scoring import score_conformations
+
+
+@pytest.fixture
+def lattice_factory():
+    return LatticeFactory()
+
+@pytest.fixture
+def conf(lattice_factory):
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHPH'
+    return conf
+
+def test_density_of_states_matches_exhaustive_count(lattice_factory, conf):
+    n = len(conf.HPSTRING)
+    vecs = numpy.array(list(itertools.product(range(4), repeat=n - 1)))
+    scores = score_conformations(conf.HPSTRING, vecs=vecs)
+    ncontacts = scores['ncontacts'][scores['viable']]
+    random.seed(4)
+    results = PERMSampler(lattice_factory, conf).run(5000, temp=1000.0)
+    assert results['nconfs'] == pytest.approx(len(ncontacts), rel=0.05)
+    for k in range(ncontacts.max() + 1):
+        assert results['contacts'][k] == \
+            pytest.approx((ncontacts == k).sum(), rel=0.15)
+
+def test_lowest_energy_conformation_is_viable(lattice_factory, conf):
+    conf.HPSTRING = 'HPHPPHHPHPPHPHHPPHPH' * 3
+    random.seed(9)
+    results = PERMSampler(lattice_factory, conf).run(200)
+    assert results['chains'] > 0
+    chain = lattice_factory.make_chain(conf.HPSTRING,
+                                       results['min_vec'].tolist())
+    assert chain.is_viable()
+    E, state = chain.energy(conf.epsilon)
+    assert E == pytest.approx(results['min_energy'])
+    assert len(state) > 10
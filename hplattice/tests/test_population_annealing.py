@@ -0,0 +1,63 @@
+import pytest
+import random
+from numpy import exp, log
+from .. import LatticeFactory
+from ..PopulationAnnealing import PopulationAnnealer
+from ..Monty import BOLTZ_CONST
+
+
+@pytest.fixture
+def conf():
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HPHPPHHPHH'
+    conf.INITIALVEC = [0] * 9
+    conf.REPLICATEMPS = [275.0, 300.0, 350.0, 450.0]
+    conf.POPULATION = 200
+    conf.ANNEALSTEPS = 20
+    return conf
+
+def test_resampling_keeps_size_and_favors_low_energy(conf):
+    random.seed(2)
+    pa = PopulationAnnealer(LatticeFactory(), conf)
+    pa.energies[:100] = -1.0
+    pa.energies[100:] = 0.0
+    pa.vecs[:100, 0] = 1
+    log_Q, effective_size = pa.resample(450.0, 275.0)
+    assert len(pa.vecs) == conf.POPULATION
+    dbeta = 1.0 / (BOLTZ_CONST * 275.0) - 1.0 / (BOLTZ_CONST * 450.0)
+    w = exp(dbeta)
+    assert log_Q == pytest.approx(log((w + 1.0) / 2.0))
+    # low energy chains get a share w / (w + 1) of the population
+    assert (pa.energies == -1.0).sum() == \
+        pytest.approx(conf.POPULATION * w / (w + 1.0), abs=1)
+    assert ((pa.vecs[:, 0] == 1) == (pa.energies == -1.0)).all()
+    assert 0 < effective_size < conf.POPULATION
+
+def test_annealing_finds_low_energy_states(conf):
+    random.seed(5)
+    pa = PopulationAnnealer(LatticeFactory(), conf)
+    results = pa.run()
+    assert results['temps'].tolist() == [450.0, 350.0, 300.0, 275.0]
+    assert results['beta_free_energy'][0] == 0.0
+    assert results['mean_energy'][-1] < results['mean_energy'][0]
+    assert results['ground_state_hits'][-1] > 0
+    # every member of the population is a viable chain with its energy
+    for idx in range(len(pa.vecs)):
+        pa._load(idx)
+        assert pa.replica.chain.is_viable()
+        assert pa.replica.mc.potential(pa.replica.chain) == pa.energies[idx]
+
+def test_annealing_does_not_depend_on_processes(conf):
+    conf.POPULATION = 60
+    results = []
+    for num_processes in (1, 2):
+        random.seed(7)
+        pa = PopulationAnnealer(LatticeFactory(), conf,
+                                num_processes=num_processes, chunk_size=16)
+        results.append((pa.run(), pa.vecs.tolist(), pa.replica.steps))
+    (serial, serial_vecs, serial_steps), (parallel, parallel_vecs,
+                                          parallel_steps) = results
+    assert serial_vecs == parallel_vecs
+    assert serial_steps == parallel_steps == 4 * 60 * conf.ANNEALSTEPS
+    assert serial['mean_energy'].tolist() == parallel['mean_energy'].tolist()
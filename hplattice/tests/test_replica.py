@@ -1,6 +1,7 @@
 import pytest
 from .. import LatticeFactory
-from ..Replica import _compute_boltz_factor
+from ..Replica import _compute_boltz_factor, attempt_even_odd_swaps, \
+                      attempt_hamiltonian_swaps
 
 
 @pytest.fixture
@@ -65,3 +66,46 @@ def test_compute_boltz_factor(replica, replica2):
     '''
     bf = _compute_boltz_factor(replica, replica2)
     assert bf >= 1
+
+@pytest.fixture
+def replica_ladder():
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HHPPHH'
+    conf.INITIALVEC = [1,0,1,2,1]
+    conf.NREPLICAS = 5
+    conf.REPLICATEMPS = [275.0, 300.0, 325.0, 350.0, 400.0]
+    return [lattice_factory.make_replica(lattice_factory, conf, i)
+            for i in range(conf.NREPLICAS)]
+
+def test_even_odd_swaps_attempt_all_neighbor_pairs(replica_ladder):
+    # identical conformations, so every swap should be accepted
+    even_results = attempt_even_odd_swaps(replica_ladder, 0)
+    assert [(i, j) for i, j, s in even_results] == [(0, 1), (2, 3)]
+    assert all(s for i, j, s in even_results)
+    temps = [r.mc.tempfromrep for r in replica_ladder]
+    assert temps == [1, 0, 3, 2, 4]
+    # odd pairs are chosen by temperature, not by replica index
+    odd_results = attempt_even_odd_swaps(replica_ladder, 1)
+    assert [(i, j) for i, j, s in odd_results] == [(0, 3), (2, 4)]
+    temps = [r.mc.tempfromrep for r in replica_ladder]
+    assert temps == [2, 0, 4, 1, 3]
+
+def test_hamiltonian_swaps_pair_replicas_at_each_temperature():
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.HPSTRING = 'HHPPHH'
+    conf.INITIALVEC = [1,0,1,2,1]
+    conf.RESTRAINED_STATE = [(0, 5)]
+    conf.update(REPLICATEMPS=[275.0, 300.0],
+                HAMILTONIANS=[{}, {}, {'KSPRING': 0.0}])
+    assert conf.NREPLICAS == 6
+    replicas = [lattice_factory.make_replica(lattice_factory, conf, i)
+                for i in range(conf.NREPLICAS)]
+    assert [r.mc.hamfromrep for r in replicas] == [0, 0, 1, 1, 2, 2]
+    # identical Hamiltonians, so every swap should be accepted
+    results = attempt_hamiltonian_swaps(replicas, 0)
+    assert [(i, j) for i, j, s in results] == [(0, 2), (1, 3)]
+    assert all(s for i, j, s in results)
+    assert [r.mc.hamfromrep for r in replicas] == [1, 1, 0, 0, 2, 2]
+    assert [r.mc.tempfromrep for r in replicas] == [0, 1, 0, 1, 0, 1]
@@ -0,0 +1,48 @@
+import pytest
+import numpy
+from ..Chain import Chain
+from ..Scoring import vecs_to_coords, contact_pairs, score_conformations, \
+                      unpack_contacts
+
+
+@pytest.fixture
+def hpstring():
+    return 'PHPPHPHPPHH'
+
+@pytest.fixture
+def vecs():
+    rng = numpy.random.RandomState(3)
+    vecs = rng.randint(0, 4, size=(200, 10)).astype(numpy.int32)
+    vecs[0] = [0, 0, 3, 0, 0, 0, 0, 0, 0, 0]
+    vecs[1] = [0, 1, 2, 1, 0, 1, 2, 2, 3, 3]
+    return vecs
+
+def test_only_opposite_parity_pairs_can_form_contacts(hpstring):
+    pairs = contact_pairs(hpstring)
+    assert ((pairs[:,1] - pairs[:,0]) % 2 == 1).all()
+    assert ((pairs[:,1] - pairs[:,0]) >= 3).all()
+
+def test_batch_scores_match_chain(hpstring, vecs):
+    results = score_conformations(hpstring, vecs=vecs, epsilon=-2.0,
+                                  chunk_size=64)
+    coords = vecs_to_coords(vecs)
+    for idx, vec in enumerate(vecs):
+        chain = Chain(hpstring, vec.tolist())
+        assert (chain.get_coord_array() == coords[idx]).all()
+        assert results['viable'][idx] == chain.is_viable()
+        if chain.is_viable():
+            E, state = chain.energy(-2.0)
+            assert results['energy'][idx] == E
+            assert results['ncontacts'][idx] == len(state)
+            assert unpack_contacts(results, idx) == state
+        c = chain.get_coord_array()
+        rg = numpy.sqrt(((c - c.mean(axis=0))**2).sum(axis=1).mean())
+        assert abs(results['rg'][idx] - rg) < 1e-12
+
+def test_coordinates_and_vectors_give_same_scores(hpstring, vecs):
+    from_vecs = score_conformations(hpstring, vecs=vecs)
+    from_coords = score_conformations(hpstring, coords=vecs_to_coords(vecs))
+    for key in ('energy', 'contacts', 'viable', 'rg'):
+        assert (from_vecs[key] == from_coords[key]).all()
+    with pytest.raises(ValueError):
+        score_conformations(hpstring[:-1], vecs=vecs)
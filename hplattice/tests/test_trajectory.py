@@ -2,7 +2,7 @@ import pytest
 from mock import Mock
 
 from ..Chain import Chain
-from ..Trajectory import Trajectory
+from ..Trajectory import Trajectory, BufferedTrajectory
 
 
 @pytest.fixture
@@ -18,6 +18,26 @@ def test_write_coords_to_trajectory(chain):
     traj = Trajectory(save_trajectory=True, trajectory_filename='temp.txt',
                    open_stream_fcn=mock_stream_factory)
     traj.snapshot(chain)
-    assert mock_stream.write.call_count == 2
+    assert mock_stream.write.call_count == 1
+    frame = mock_stream.write.call_args[0][0]
+    assert frame.startswith('11\nFrame 0\nP\t0.0\t0.0\t0.0\n')
     traj.finalize()
     assert mock_stream.close.called
+
+def test_buffered_trajectory_matches_unbuffered(chain, tmpdir):
+    filename = str(tmpdir.join('traj.xyz'))
+    buffered_filename = str(tmpdir.join('buffered_traj.xyz'))
+    traj = Trajectory(save_trajectory=True, trajectory_filename=filename)
+    buffered_traj = BufferedTrajectory(save_trajectory=True,
+                                       trajectory_filename=buffered_filename,
+                                       max_queued_frames=2,
+                                       frames_per_write=3)
+    for i in range(10):
+        chain.do_rigid_rot(i % 10, 1)
+        chain.nextviable()
+        chain.update_chain()
+        traj.snapshot(chain)
+        buffered_traj.snapshot(chain)
+    traj.finalize()
+    buffered_traj.finalize()
+    assert open(buffered_filename).read() == open(filename).read()
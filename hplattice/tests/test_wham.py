@@ -0,0 +1,48 @@
+import pytest
+from numpy import array, exp, log, arange, isfinite, allclose
+from .. import LatticeFactory
+from ..MCSampler import MCSampler
+from ..Monty import BOLTZ_CONST
+from ..WHAM import WHAM, wham_from_sampler
+
+
+@pytest.fixture
+def exact_histograms():
+    # expected histograms for a known density of states
+    g = array([100., 40., 8., 1.])
+    energies = arange(4) * -2.0
+    temps = [300.0, 400.0, 600.0]
+    counts = []
+    for T in temps:
+        w = g * exp(-energies / (BOLTZ_CONST * T))
+        counts.append(1000. * w / w.sum())
+    return g, energies, temps, array(counts)
+
+def test_wham_recovers_density_of_states(exact_histograms):
+    g, energies, temps, counts = exact_histograms
+    wham = WHAM(temps, counts, energies)
+    log_g = wham.solve()
+    assert allclose(log_g, log(g / g[0]))
+
+def test_reweighted_populations_match_exact(exact_histograms):
+    g, energies, temps, counts = exact_histograms
+    wham = WHAM(temps, counts, energies)
+    T = 350.0
+    w = g * exp(-energies / (BOLTZ_CONST * T))
+    thermo = wham.thermodynamics([T])
+    assert allclose(thermo['populations'][0], w / w.sum())
+    assert allclose(thermo['energy'][0], (energies * w).sum() / w.sum())
+
+def test_wham_from_sampler_histograms():
+    lattice_factory = LatticeFactory()
+    conf = lattice_factory.make_configuration()
+    conf.STOPATNATIVE = False
+    conf.MCSTEPS = 500
+    conf.SWAPEVERY = 10
+    conf.ENEEVERY = 5
+    s = MCSampler(lattice_factory, conf)
+    s.do_mc_sampling()
+    assert s.energy_histograms.sum() == \
+        conf.NREPLICAS * conf.MCSTEPS / conf.ENEEVERY
+    thermo = wham_from_sampler(s).thermodynamics([280.0, 320.0, 500.0])
+    assert isfinite(thermo['heat_capacity']).all()
@@ -1,4 +1,100 @@
-from .vec2coords import vec2coords
-from .vec2coords import shift as do_shift
-from .viability import viability as check_viability, is_nonsym
-from .energy import energy as compute_energy
+"""
+Kernels for the inner loops of the lattice model: converting vectors to
+coordinates, enumeration shifts, viability and symmetry checks, and finding
+contacts. Each kernel has three interchangeable implementations, or
+backends:
+
+``'cython'``
+    compiled extensions, built with ``python setup.py build_ext --inplace``
+    in this directory. The fastest.
+``'numba'``
+    compiled at run time with numba, if it is installed.
+``'numpy'``
+    pure Python and NumPy, always available.
+
+The first backend in :data:`BACKENDS` that can be imported is used, unless
+the *HPLATTICE_BACKEND* environment variable names another one. The active
+backend can be reported with :func:`get_backend` and changed at any time with
+:func:`set_backend`. Use the kernels through this module, for example
+``util.vec2coords(vec, coords)``, so that a change of backend takes effect.
+
+Every backend steps along the lattice the same way: vector ``v`` moves by
+``(DX[v], DY[v])``.
+"""
+import os
+
+from .numpy_kernels import DX, DY
+
+
+# backends, in order of preference
+BACKENDS = ['cython', 'numba', 'numpy']
+KERNELS = ['vec2coords', 'do_shift', 'check_viability', 'is_nonsym',
+           'find_contacts', 'compute_energy']
+
+_backend = None
+
+
+def _load_kernels(backend):
+    ### import the kernels of one backend, ImportError if it is unavailable
+    if backend == 'cython':
+        from .vec2coords import vec2coords, shift
+        from .viability import viability, is_nonsym
+        from .energy import find_contacts, energy
+    elif backend == 'numba':
+        from .numba_kernels import vec2coords, shift, viability, is_nonsym, \
+                                   find_contacts, energy
+    elif backend == 'numpy':
+        from .numpy_kernels import vec2coords, shift, viability, is_nonsym, \
+                                   find_contacts, energy
+    else:
+        raise ValueError("Unknown kernel backend %s" % backend)
+    return {'vec2coords': vec2coords, 'do_shift': shift,
+            'check_viability': viability, 'is_nonsym': is_nonsym,
+            'find_contacts': find_contacts, 'compute_energy': energy}
+
+def available_backends():
+    """
+    :return: the backends that can be used here, in order of preference
+    :rtype: list
+    """
+    available = []
+    for backend in BACKENDS:
+        try:
+            _load_kernels(backend)
+        except ImportError:
+            continue
+        available.append(backend)
+    if _backend is not None:
+        # importing a Cython module for the first time binds its name in
+        # this package, which hides the kernel of the same name
+        globals().update(_load_kernels(_backend))
+    return available
+
+def get_backend():
+    """
+    :return: the name of the active backend
+    :rtype: str
+    """
+    return _backend
+
+def set_backend(backend=None):
+    """
+    Select the implementation of the kernels.
+
+    :param str backend: optional, one of :data:`BACKENDS`. The first
+                        available backend is selected if no value is
+                        specified.
+    :return: the name of the selected backend
+    :rtype: str
+    :raises ImportError: if *backend* cannot be used here
+    :raises ValueError: if *backend* is unknown
+    """
+    global _backend
+    if backend is None:
+        backend = available_backends()[0]
+    kernels = _load_kernels(backend)
+    globals().update(kernels)
+    _backend = backend
+    return _backend
+
+set_backend(os.environ.get('HPLATTICE_BACKEND') or None)
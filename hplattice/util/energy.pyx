@@ -1,6 +1,7 @@
 import numpy as N
 cimport numpy as N
 import cython
+from libc.stdlib cimport malloc, free
 
 DTYPE = N.int32
 ctypedef N.int32_t DTYPE_t
@@ -12,22 +13,96 @@ ctypedef N.int32_t DTYPE_t
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
-cpdef energy(double epsilon, N.ndarray[DTYPE_t, ndim=2] coords, N.ndarray[DTYPE_t, ndim=1] H_inds):
-    """Calculate potential energy of the chain."""
-    cdef int i, j, d, h1, h2
-    cdef double E
+cpdef int find_contacts(N.ndarray[DTYPE_t, ndim=2] coords, N.ndarray[DTYPE_t, ndim=1] H_inds, N.ndarray[DTYPE_t, ndim=2] contacts) except -1:
+    """Write the (h1, h2) contacts of the chain to the rows of contacts,
+       ordered by h1 then h2, and return the number of contacts.
+       Monomers are placed on a grid that covers the chain, and only the
+       four sites next to each H monomer are inspected, so the cost is
+       linear in the chain length. The chain is assumed to be viable.
+       contacts must have at least 4 * len(H_inds) rows."""
+    cdef int i, j, k, m, h1, h2, tmp, site
+    cdef int xmin, xmax, ymin, ymax, height, grid_size
     cdef int nc = 0
+    cdef int n = coords.shape[0]
     cdef int h_max = H_inds.shape[0]
-    contacts = []
+    cdef int nb[4]
+    cdef int *grid
+    cdef char *is_H
+
+    if n == 0:
+        return 0
+
+    # bounding box of the chain, plus an empty border
+    xmin = coords[0,0]
+    xmax = coords[0,0]
+    ymin = coords[0,1]
+    ymax = coords[0,1]
+    for i in range(1, n):
+        if coords[i,0] < xmin:
+            xmin = coords[i,0]
+        elif coords[i,0] > xmax:
+            xmax = coords[i,0]
+        if coords[i,1] < ymin:
+            ymin = coords[i,1]
+        elif coords[i,1] > ymax:
+            ymax = coords[i,1]
+    xmin = xmin - 1
+    ymin = ymin - 1
+    height = ymax - ymin + 2
+    grid_size = (xmax - xmin + 2) * height
+    grid = <int *>malloc(grid_size * sizeof(int))
+    is_H = <char *>malloc(n * sizeof(char))
+    if grid == NULL or is_H == NULL:
+        free(grid)
+        free(is_H)
+        raise MemoryError()
+    for i in range(grid_size):
+        grid[i] = -1
+    for i in range(n):
+        grid[(coords[i,0] - xmin) * height + coords[i,1] - ymin] = i
+        is_H[i] = 0
+    for i in range(h_max):
+        if H_inds[i] < n:
+            is_H[H_inds[i]] = 1
 
     for i in range(h_max):
-        for j in range(i+1, h_max):
-            h2 = H_inds[j]
-            h1 = H_inds[i]
-            if (h2 - h1) >= 3:
-                d = (coords[h1,0] - coords[h2,0])**2 + (coords[h1,1] - coords[h2,1])**2
-                if d == 1:
-                    contacts.append((h1,h2))
-                    nc += 1
-    E = nc * epsilon
-    return E, contacts
+        h1 = H_inds[i]
+        if h1 >= n:
+            break
+        site = (coords[h1,0] - xmin) * height + coords[h1,1] - ymin
+        nb[0] = grid[site - height]
+        nb[1] = grid[site - 1]
+        nb[2] = grid[site + 1]
+        nb[3] = grid[site + height]
+        # keep H neighbors at least three positions further along the chain
+        m = 0
+        for k in range(4):
+            h2 = nb[k]
+            if (h2 - h1) >= 3 and is_H[h2]:
+                nb[m] = h2
+                m += 1
+        # sort the (at most three) neighbors
+        for k in range(1, m):
+            tmp = nb[k]
+            j = k
+            while j > 0 and nb[j-1] > tmp:
+                nb[j] = nb[j-1]
+                j -= 1
+            nb[j] = tmp
+        for k in range(m):
+            contacts[nc,0] = h1
+            contacts[nc,1] = nb[k]
+            nc += 1
+    free(grid)
+    free(is_H)
+    return nc
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def energy(double epsilon, N.ndarray[DTYPE_t, ndim=2] coords, N.ndarray[DTYPE_t, ndim=1] H_inds):
+    """Calculate potential energy of the chain."""
+    cdef N.ndarray[DTYPE_t, ndim=2] contacts = \
+        N.empty((4 * H_inds.shape[0], 2), dtype=DTYPE)
+    cdef int k
+    cdef int nc = find_contacts(coords, H_inds, contacts)
+    return nc * epsilon, [(contacts[k,0], contacts[k,1]) for k in range(nc)]
@@ -0,0 +1,140 @@
+"""
+Versions of the Cython kernels compiled at run time with numba, for when the
+extensions in this directory have not been built but numba is installed.
+Each function has the same arguments and return values as its Cython
+counterpart. Importing this module raises :class:`ImportError` if numba is
+not available.
+"""
+from numpy import zeros, ones, empty, int32
+from numba import njit
+
+
+@njit(cache=True)
+def vec2coords(chain_vecs, coords):
+    """Convert an array of chain vectors to a 2d array of
+       coordinates."""
+    x = 0
+    y = 0
+    coords[0,0] = x
+    coords[0,1] = y
+    for i in range(chain_vecs.shape[0]):
+        if chain_vecs[i] == 0:
+            y = y + 1
+        elif chain_vecs[i] == 1:
+            x = x + 1
+        elif chain_vecs[i] == 2:
+            y = y - 1
+        elif chain_vecs[i] == 3:
+            x = x - 1
+        coords[i+1,0] = x
+        coords[i+1,1] = y
+    return coords
+
+@njit(cache=True)
+def _shift(vec, coords):
+    ### increment the last vector in place, return 1 if vec is empty
+    vmax = vec.shape[0]
+    if vmax == 0:
+        return 1
+    i = vmax - 1
+    if vec[i] == 0:
+        coords[i+1,0] += 1
+        coords[i+1,1] -= 1
+    elif vec[i] == 1:
+        coords[i+1,0] -= 1
+        coords[i+1,1] -= 1
+    else:
+        coords[i+1,0] -= 1
+        coords[i+1,1] += 1
+    vec[i] += 1
+    return 0
+
+def shift(vec, coords):
+    """Increment the last vector of the chain and rotate the last monomer
+       to match. See :meth:`hplattice.Chain.Chain.shift`.
+
+       RETURN VALUES
+        returns 1 if its the last possible "shift" --> i.e. if it's all
+        3's, the search is done
+        returns 0 otherwise
+    """
+    return _shift(vec, coords), vec, coords
+
+@njit(cache=True)
+def viability(coords):
+    """Return 1 if the chain coordinates are self-avoiding,
+           0 if not."""
+    row_max = coords.shape[0]
+    for i in range(row_max):
+        for j in range(i+1, row_max):
+            if coords[i,0] == coords[j,0] and coords[i,1] == coords[j,1]:
+                return 0
+    return 1
+
+@njit(cache=True)
+def is_nonsym(vec):
+    """Many of the conformations are related by rotations and reflections.
+       We define a "non-symmetric" conformation to have the first
+       direction '0' and the first turn be a '1' (right turn)
+       nonsym() returns 1 if the vec list is non-symmetric, 0 otherwise
+    """
+    vmax = vec.shape[0]
+    if vmax > 0:
+        i = 0
+        v = vec[0]
+        while (v == 0) and (i < (vmax - 1)):
+            i = i + 1
+            v = vec[i]
+        if vec[0] == 0:
+            if (vec[i] == 1) or (vec[i] == 0):
+                return 1
+    return 0
+
+@njit(cache=True)
+def find_contacts(coords, H_inds, contacts):
+    """Write the (h1, h2) contacts of the chain to the rows of contacts,
+       ordered by h1 then h2, and return the number of contacts.
+       Monomers are placed on a grid that covers the chain, and only the
+       four sites next to each H monomer are inspected. The chain is
+       assumed to be viable. contacts must have at least 4 * len(H_inds)
+       rows."""
+    n = coords.shape[0]
+    if n == 0:
+        return 0
+    # bounding box of the chain, plus an empty border
+    xmin = coords[:,0].min() - 1
+    ymin = coords[:,1].min() - 1
+    height = coords[:,1].max() - ymin + 2
+    grid = -ones((coords[:,0].max() - xmin + 2) * height, int32)
+    for i in range(n):
+        grid[(coords[i,0] - xmin) * height + coords[i,1] - ymin] = i
+    is_H = zeros(n, int32)
+    for i in range(H_inds.shape[0]):
+        if H_inds[i] < n:
+            is_H[H_inds[i]] = 1
+
+    nb = zeros(4, int32)
+    nc = 0
+    for i in range(H_inds.shape[0]):
+        h1 = H_inds[i]
+        if h1 >= n:
+            break
+        site = (coords[h1,0] - xmin) * height + coords[h1,1] - ymin
+        nb[0] = grid[site - height]
+        nb[1] = grid[site - 1]
+        nb[2] = grid[site + 1]
+        nb[3] = grid[site + height]
+        nb.sort()
+        for k in range(4):
+            h2 = nb[k]
+            if (h2 - h1) >= 3 and is_H[h2]:
+                contacts[nc,0] = h1
+                contacts[nc,1] = h2
+                nc += 1
+    return nc
+
+def energy(epsilon, coords, H_inds):
+    """Calculate potential energy of the chain."""
+    contacts = empty((4 * len(H_inds), 2), int32)
+    nc = find_contacts(coords, H_inds, contacts)
+    return nc * float(epsilon), [tuple(c) for c in contacts[:nc].tolist()]
@@ -0,0 +1,110 @@
+"""
+Pure Python/NumPy versions of the Cython kernels, for when the extensions in
+this directory have not been built. Each function has the same arguments and
+return values as its Cython counterpart.
+"""
+from numpy import array, empty, zeros, full, arange, column_stack, cumsum, \
+                  sort, nonzero, int32, bool_
+
+
+# change in x and y for vectors 0 (up), 1 (right), 2 (down) and 3 (left)
+DX = array([0, 1, 0, -1], int32)
+DY = array([1, 0, -1, 0], int32)
+
+
+def vec2coords(chain_vecs, coords):
+    """Convert an array of chain vectors to a 2d array of
+       coordinates."""
+    coords[0,:] = 0
+    cumsum(DX[chain_vecs], out=coords[1:,0])
+    cumsum(DY[chain_vecs], out=coords[1:,1])
+    return coords
+
+def shift(vec, coords):
+    """Increment the last vector of the chain and rotate the last monomer
+       to match. See :meth:`hplattice.Chain.Chain.shift`.
+
+       RETURN VALUES
+        returns 1 if its the last possible "shift" --> i.e. if it's all
+        3's, the search is done
+        returns 0 otherwise
+    """
+    vmax = vec.shape[0]
+    if vmax == 0:
+        return 1, vec, coords
+
+    i = vmax - 1 # the last vec index
+    if vec[i] == 0:
+        # rotate "up" to "right"
+        coords[i+1,0] += 1
+        coords[i+1,1] -= 1
+    elif vec[i] == 1:
+        # rotate "right" to "down"
+        coords[i+1,0] -= 1
+        coords[i+1,1] -= 1
+    else:
+        # rotate "down" to "left"
+        coords[i+1,0] -= 1
+        coords[i+1,1] += 1
+    vec[i] += 1
+    return 0, vec, coords
+
+def viability(coords):
+    """Return 1 if the chain coordinates are self-avoiding,
+           0 if not."""
+    n = coords.shape[0]
+    # give every lattice site within reach of the chain a unique key
+    keys = sort((coords[:,0] + n) * (2 * n + 1) + (coords[:,1] + n))
+    if (keys[1:] == keys[:-1]).any():
+        return 0
+    return 1
+
+def is_nonsym(vec):
+    """Many of the conformations are related by rotations and reflections.
+       We define a "non-symmetric" conformation to have the first
+       direction '0' and the first turn be a '1' (right turn)
+       nonsym() returns 1 if the vec list is non-symmetric, 0 otherwise
+    """
+    vmax = vec.shape[0]
+    if vmax > 0 and vec[0] == 0:
+        turns = nonzero(vec)[0]
+        if len(turns) == 0 or vec[turns[0]] == 1:
+            return 1
+    return 0
+
+def find_contacts(coords, H_inds, contacts):
+    """Write the (h1, h2) contacts of the chain to the rows of contacts,
+       ordered by h1 then h2, and return the number of contacts.
+       Monomers are placed on a grid that covers the chain, and only the
+       four sites next to each H monomer are inspected. The chain is
+       assumed to be viable. contacts must have at least 4 * len(H_inds)
+       rows."""
+    n = coords.shape[0]
+    H_inds = H_inds[H_inds < n]
+    if n == 0 or len(H_inds) == 0:
+        return 0
+    # grid with an empty border around the chain
+    x = coords[:,0] - coords[:,0].min() + 1
+    y = coords[:,1] - coords[:,1].min() + 1
+    grid = full((x.max() + 2, y.max() + 2), -1, int32)
+    grid[x, y] = arange(n)
+    is_H = zeros(n + 1, bool_)
+    is_H[H_inds] = True
+    xH = x[H_inds]
+    yH = y[H_inds]
+    neighbors = column_stack((grid[xH - 1, yH], grid[xH, yH - 1],
+                              grid[xH, yH + 1], grid[xH + 1, yH]))
+    neighbors.sort(axis=1)
+    # is_H[-1] is False, so empty sites are never contacts
+    formed = ((neighbors - H_inds[:,None]) >= 3) & is_H[neighbors]
+    i, k = nonzero(formed)
+    nc = len(i)
+    contacts[:nc,0] = H_inds[i]
+    contacts[:nc,1] = neighbors[i, k]
+    return nc
+
+def energy(epsilon, coords, H_inds):
+    """Calculate potential energy of the chain."""
+    contacts = empty((4 * len(H_inds), 2), int32)
+    nc = find_contacts(coords, H_inds, contacts)
+    return nc * float(epsilon), [tuple(c) for c in contacts[:nc].tolist()]